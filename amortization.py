@@ -0,0 +1,145 @@
+"""等额本息还款计划计算
+
+一次为一笔或多笔贷款计算完整的还款计划：每期还款额、本金、利息和剩余本金。
+金额在内部以分（int64）计算：每期还款额取整到分，利息按期初余额计算后取整到分，
+最后一期的本金等于此前未还的全部本金，因此各期本金之和恰好等于贷款金额，剩余本金最后为 0。
+还款日为每月 1 号，按日历月份递增。
+"""
+from datetime import datetime
+
+import numpy as np
+
+
+def annuity_factor(annual_rate, term):
+    """年金系数：每 1 元本金的等额本息每期还款额，参数可以是标量或数组；月利率为 0 时为 1 / 期数"""
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12
+    term = np.asarray(term, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + monthly_rate) ** term
+        factor = monthly_rate * growth / (growth - 1)
+    return np.where(monthly_rate == 0, 1 / term, factor)
+
+
+def annuity_payment(principal, annual_rate, term):
+    """等额本息每期还款额（未取整），参数可以是标量或数组"""
+    return np.asarray(principal, dtype=np.float64) * annuity_factor(annual_rate, term)
+
+
+def first_due_month(start):
+    """首期还款月份：start 为 1 号时当月 1 号还款，否则下个月 1 号还款"""
+    month = np.datetime64(start.strftime('%Y-%m'), 'M')
+    return month if start.day == 1 else month + 1
+
+
+def due_dates(start, term):
+    """从 start 开始的 term 个还款日（每月 1 号零点），返回 datetime 列表"""
+    months = first_due_month(start) + np.arange(term)
+    return months.astype('datetime64[D]').astype('datetime64[s]').tolist()
+
+
+class AmortizationSchedule:
+    """一笔或多笔贷款的还款计划
+
+    金额数组的形状为 (贷款数, 最长期数)，单位为元；超出某笔贷款期数的位置为 0。
+    """
+
+    def __init__(self, terms, installment, payment, principal, interest, remaining, due_dates):
+        self.terms = terms
+        self.installment = installment
+        self.payment = payment
+        self.principal = principal
+        self.interest = interest
+        self.remaining = remaining
+        self.due_dates = due_dates
+
+    def __len__(self):
+        return len(self.terms)
+
+    @property
+    def total_interest(self):
+        """各笔贷款的总利息"""
+        return np.round(self.interest.sum(axis=1), 2)
+
+    def rows(self, i=0):
+        """第 i 笔贷款的各期明细，字段名与 Bill 模型一致"""
+        for k in range(int(self.terms[i])):
+            yield {
+                'period': k + 1,
+                'due_date': self.due_dates[k],
+                'amount': float(self.payment[i, k]),
+                'principal': float(self.principal[i, k]),
+                'interest': float(self.interest[i, k]),
+                'remaining_principal': float(self.remaining[i, k]),
+            }
+
+    def records(self, loan_ids):
+        """全部贷款的各期明细，按 (贷款, 期数) 顺序展开为字典列表，每条带上对应的 loan_id，可直接批量插入 Bill"""
+        loan_index, period_index = np.nonzero(np.arange(self.payment.shape[1]) < self.terms[:, None])
+        loan_ids = np.asarray(loan_ids)[loan_index].tolist()
+        due_dates = [self.due_dates[k] for k in period_index.tolist()]
+        columns = zip(loan_ids, (period_index + 1).tolist(), due_dates,
+                      self.payment[loan_index, period_index].tolist(),
+                      self.principal[loan_index, period_index].tolist(),
+                      self.interest[loan_index, period_index].tolist(),
+                      self.remaining[loan_index, period_index].tolist())
+        return [
+            {'loan_id': loan_id, 'period': period, 'due_date': due_date, 'amount': amount,
+             'principal': principal, 'interest': interest, 'remaining_principal': remaining}
+            for loan_id, period, due_date, amount, principal, interest, remaining in columns
+        ]
+
+
+def amortize(principal, annual_rate, term, start=None, installment=None):
+    """计算一笔或多笔贷款的等额本息还款计划
+
+    principal、annual_rate、term 可以是标量或等长数组；start 为计算还款日的起始时间，默认为当前 UTC 时间。
+    installment 为已经算好的每期还款额（元，取整到分），不传时按 annuity_payment 计算。
+    期初余额先用闭式公式 B_k = P(1+r)^k - A((1+r)^k - 1)/r 一次算出（A 为取整后的每期还款额），
+    本金和剩余本金用累加得到，结果与逐期取整利息的计算方式完全一致，但不需要按期循环。
+    """
+    principal = np.atleast_1d(np.asarray(principal, dtype=np.float64))
+    annual_rate = np.broadcast_to(np.asarray(annual_rate, dtype=np.float64), principal.shape)
+    terms = np.broadcast_to(np.asarray(term, dtype=np.int64), principal.shape)
+    if (terms < 1).any():
+        raise ValueError("贷款期限必须至少为 1 期")
+    max_term = int(terms.max())
+    monthly_rate = (annual_rate / 12)[:, None]
+
+    principal_cents = np.round(principal * 100).astype(np.int64)
+    if installment is None:
+        installment = annuity_payment(principal, annual_rate, terms)
+    installment_cents = np.round(np.broadcast_to(installment, principal.shape) * 100).astype(np.int64)
+
+    # 第 k+1 期的期初余额（以分为单位，未取整）
+    k = np.arange(max_term)
+    growth = (1 + monthly_rate) ** k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balance = principal_cents[:, None] * growth - installment_cents[:, None] * (growth - 1) / monthly_rate
+    balance = np.where(monthly_rate == 0, principal_cents[:, None] - installment_cents[:, None] * k, balance)
+
+    active = k < terms[:, None]
+    last = k == (terms[:, None] - 1)
+    interest_cents = np.where(active, np.round(balance * monthly_rate), 0).astype(np.int64)
+    # 闭式余额没有计入利息取整的误差，用实际余额重新计算利息，直到不再变化。
+    # 第 j 轮之后前 j 期一定与逐期计算的结果相同，通常两三轮即可收敛
+    for _ in range(max_term):
+        principal_part = np.where(active & ~last, installment_cents[:, None] - interest_cents, 0)
+        # 最后一期还清剩余本金，吸收每期取整带来的差额
+        principal_part = np.where(last, (principal_cents - principal_part.sum(axis=1))[:, None], principal_part)
+        remaining_cents = principal_cents[:, None] - np.cumsum(principal_part, axis=1)
+        opening = np.concatenate([principal_cents[:, None], remaining_cents[:, :-1]], axis=1)
+        actual_interest = np.where(active, np.round(opening * monthly_rate), 0).astype(np.int64)
+        if np.array_equal(actual_interest, interest_cents):
+            break
+        interest_cents = actual_interest
+    remaining_cents = np.where(active, remaining_cents, 0)
+
+    return AmortizationSchedule(
+        terms=terms,
+        installment=installment_cents / 100,
+        payment=(principal_part + interest_cents) / 100,
+        principal=principal_part / 100,
+        interest=interest_cents / 100,
+        remaining=remaining_cents / 100,
+        due_dates=due_dates(start or datetime.utcnow(), max_term),
+    )
@@ -2,22 +2,52 @@ from flask import Flask, request, jsonify, render_template, session, redirect, u
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from models import db, User, LoanApplication, RepaymentRecord, Notification, Bill
 from risk_assessment import RiskAssessmentService
+from model_registry import RegistryError
+from scoring_cache import TTLCache, make_key
+from risk_batcher import RiskBatcher
+from rescoring import rescore_applications, DEFAULT_CHUNK_SIZE, DEFAULT_CHECKPOINT_PATH
+from amortization import amortize
+from loan_pricing import interest_rate as pricing_rate, quote_grid, MAX_GRID_CELLS
 from notification_service import NotificationService
+from bill_scheduler import DueDateScheduler
+from scheduler_leader import SchedulerLeader
+from bill_jobs import run_overdue_job, run_reminder_job, backfill_reminder_ledger
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
+import atexit
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from logging.handlers import RotatingFileHandler
 from decimal import Decimal
 import math
 from functools import wraps
 from apscheduler.schedulers.background import BackgroundScheduler
+import click
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.urandom(24)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///loan.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['RISK_BATCH_MAX_SIZE'] = 10000  # 批量风险评估单次最大条数
+app.config['RISK_COALESCE_ENABLED'] = True  # 是否合并并发的 /assess_risk 请求
+app.config['RISK_COALESCE_WINDOW_MS'] = 2  # 合并窗口（毫秒）
+app.config['RISK_COALESCE_MAX_ROWS'] = 64  # 单次合并的最大条数
+app.config['SCORING_TRACE_ENABLED'] = False  # 是否记录评分各阶段耗时
+app.config['SCORING_TRACE_SAMPLE_RATE'] = 0.0  # 输出明细日志的请求采样比例
+# full：每次请求都运行模型；fast：只算显式公式，模型影子运行。默认 full，需要时用环境变量 RISK_SCORING_MODE=fast 开启
+app.config['RISK_SCORING_MODE'] = os.environ.get('RISK_SCORING_MODE', 'full')
+app.config['RISK_SHADOW_SAMPLE_RATE'] = 0.01  # fast 模式下在后台运行模型的请求比例
+app.config['BILL_REMINDER_DAYS'] = 3  # 还款日前几天发送还款提醒
+app.config['BILL_RECONCILE_HOUR'] = 0  # 每日账单对账的时间（UTC 小时）
+app.config['BILL_NEW_BILLS_CHECK_SECONDS'] = 60  # leader 检查其他进程新生成账单的间隔（秒）
+app.config['BILL_JOB_CHUNK_SIZE'] = 1000  # 账单任务每段处理的账单数，每段单独提交
+app.config['BILL_JOB_PAUSE_MS'] = 50  # 账单任务两段之间的暂停（毫秒），让前台请求获得写锁
+app.config['SCHEDULER_LOCK_PATH'] = 'scheduler.lock'  # 定时任务选主的锁文件，持有锁的进程运行定时任务
+app.config['SCHEDULER_LEADER_RETRY_SECONDS'] = 15  # 未当选的进程重试获取锁的间隔（秒）
+# 以 WSGI 服务（如 gunicorn）导入本模块时，设置环境变量 RUN_SCHEDULER=1 才参与定时任务选主；
+# python app.py 总是参与，flask 命令行（rescore-applications 等）默认不参与
+app.config['RUN_SCHEDULER'] = os.environ.get('RUN_SCHEDULER') == '1'
 
 # 配置日志
 if not os.path.exists('logs'):
@@ -31,6 +61,11 @@ app.logger.addHandler(file_handler)
 app.logger.setLevel(logging.INFO)
 app.logger.info('应用启动')
 
+# 风险评估服务的日志也写入应用日志文件
+risk_logger = logging.getLogger('risk_assessment')
+risk_logger.addHandler(file_handler)
+risk_logger.setLevel(logging.INFO)
+
 # 初始化 Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -48,36 +83,14 @@ scheduler = BackgroundScheduler()
 def check_upcoming_bills():
     """检查即将到期的账单并发送通知"""
     with app.app_context():
-        # 获取3天后到期的账单
-        three_days_later = datetime.utcnow().date() + timedelta(days=3)
-        upcoming_bills = Bill.query.filter(
-            Bill.status == 'pending',
-            Bill.due_date >= three_days_later,
-            Bill.due_date < three_days_later + timedelta(days=1)
-        ).all()
-
-        for bill in upcoming_bills:
-            # 检查是否已经发送过通知
-            existing_notification = Notification.query.filter_by(
-                user_id=bill.loan.user_id,
-                content=f"请于 {bill.due_date.strftime('%Y-%m-%d')} 前还款 {bill.amount:.2f} 元。"
-            ).first()
-            
-            if not existing_notification:
-                # 创建新通知
-                notification = Notification(
-                    user_id=bill.loan.user_id,
-                    title="还款提醒",
-                    content=f"请于 {bill.due_date.strftime('%Y-%m-%d')} 前还款 {bill.amount:.2f} 元。",
-                    type='repayment_reminder',
-                    is_read=False,
-                    created_at=datetime.utcnow()
-                )
-                db.session.add(notification)
-        
         try:
-            db.session.commit()
-            app.logger.info("成功提交还款提醒通知")
+            # BILL_REMINDER_DAYS 天内到期、还没有提醒过的账单，按主键分段生成通知并逐段提交
+            cursor = run_reminder_job(
+                app.config['BILL_REMINDER_DAYS'],
+                chunk_size=app.config['BILL_JOB_CHUNK_SIZE'],
+                pause_seconds=app.config['BILL_JOB_PAUSE_MS'] / 1000
+            )
+            app.logger.info(f"成功提交还款提醒通知: {cursor['processed']} 条，{cursor['chunks']} 段")
         except Exception as e:
             app.logger.error(f"提交还款提醒通知失败: {str(e)}")
             db.session.rollback()
@@ -85,35 +98,48 @@ def check_upcoming_bills():
 def update_overdue_bills():
     """更新逾期账单状态"""
     with app.app_context():
-        overdue_bills = Bill.query.filter(
-            Bill.status == 'pending',
-            Bill.due_date < datetime.utcnow().date()
-        ).all()
-        
-        for bill in overdue_bills:
-            bill.status = 'overdue'
-
-            # 创建逾期通知
-            notification = Notification(
-                user_id=bill.loan.user_id,
-                title="账单逾期提醒",
-                content=f"您的账单已逾期，请尽快还款 {bill.amount:.2f} 元。",
-                type='overdue_reminder',
-                is_read=False,
-                created_at=datetime.utcnow()
-            )
-            db.session.add(notification)
-        
         try:
-            db.session.commit()
-            app.logger.info("成功提交逾期提醒通知")
+            # 每段的逾期通知和状态更新在同一个事务中提交，中断后下次从断点继续
+            cursor = run_overdue_job(
+                chunk_size=app.config['BILL_JOB_CHUNK_SIZE'],
+                pause_seconds=app.config['BILL_JOB_PAUSE_MS'] / 1000
+            )
+            app.logger.info(f"成功提交逾期提醒通知: {cursor['processed']} 条，{cursor['chunks']} 段")
         except Exception as e:
             app.logger.error(f"提交逾期提醒通知失败: {str(e)}")
             db.session.rollback()
 
-# 添加定时任务，每分钟执行一次
-scheduler.add_job(check_upcoming_bills, 'interval', seconds=10)
-scheduler.add_job(update_overdue_bills, 'interval', seconds=10)
+# 只在还款日边界（提醒窗口开始、逾期）上运行账单任务，另外每天全量对账一次
+bill_scheduler = DueDateScheduler(
+    scheduler, app, check_upcoming_bills, update_overdue_bills,
+    reminder_days=app.config['BILL_REMINDER_DAYS'],
+    reconcile_hour=app.config['BILL_RECONCILE_HOUR'],
+    new_bills_check_seconds=app.config['BILL_NEW_BILLS_CHECK_SECONDS']
+)
+
+def start_scheduler():
+    """当选为定时任务 leader 后注册账单任务并启动调度器"""
+    bill_scheduler.start()
+    if not scheduler.running:
+        scheduler.start()
+
+def stop_scheduler():
+    """放弃定时任务 leader 时停止调度器，等待正在运行的任务结束"""
+    if scheduler.running:
+        scheduler.shutdown(wait=True)
+
+# 多个服务进程（如 gunicorn worker）中只有持有锁文件的一个运行定时任务，leader 退出后由其他进程接管
+scheduler_leader = SchedulerLeader(
+    start_scheduler,
+    on_demoted=stop_scheduler,
+    lock_path=app.config['SCHEDULER_LOCK_PATH'],
+    retry_seconds=app.config['SCHEDULER_LEADER_RETRY_SECONDS']
+)
+
+def start_scheduler_election():
+    """参与定时任务选主，进程退出时停止调度器、释放锁并结束重试线程"""
+    scheduler_leader.start()
+    atexit.register(scheduler_leader.stop)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -122,10 +148,18 @@ def load_user(user_id):
 # 创建数据库表
 with app.app_context():
     db.create_all()
-    
-    # 启动调度器
-    if not scheduler.running:
-        scheduler.start()
+    # create_all 不会给已存在的表补建索引
+    for index in Bill.__table__.indexes | Notification.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    # 提醒台账为空时，把台账上线前已发送的还款提醒补记进去，定时任务不会为这些账单再提醒一次
+    backfilled = backfill_reminder_ledger(db.session)
+    db.session.commit()
+    if backfilled:
+        app.logger.info(f"提醒台账补记已提醒的账单: {backfilled} 张")
+
+# 以 WSGI 服务导入时按 RUN_SCHEDULER 参与选主；python app.py 在下面的入口处参与
+if __name__ != '__main__' and app.config['RUN_SCHEDULER']:
+    start_scheduler_election()
 
 # 用户认证装饰器
 def login_required(f):
@@ -151,9 +185,24 @@ def role_required(roles):
     return decorator
 
 # 初始化风险评估服务和通知服务
-risk_service = RiskAssessmentService()
+risk_service = RiskAssessmentService(
+    trace_enabled=app.config['SCORING_TRACE_ENABLED'],
+    trace_sample_rate=app.config['SCORING_TRACE_SAMPLE_RATE'],
+    scoring_mode=app.config['RISK_SCORING_MODE'],
+    shadow_sample_rate=app.config['RISK_SHADOW_SAMPLE_RATE']
+)
 notification_service = NotificationService()
 
+# 并发评估请求合并器
+risk_batcher = RiskBatcher(
+    risk_service,
+    window_ms=app.config['RISK_COALESCE_WINDOW_MS'],
+    max_batch_size=app.config['RISK_COALESCE_MAX_ROWS']
+)
+
+# 贷款报价缓存
+quote_cache = TTLCache()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -231,13 +280,38 @@ def assess_risk():
         # 获取申请数据
         data = request.get_json()
         
-        # 进行风险评估
-        assessment = risk_service.assess_loan_application(data)
+        # 进行风险评估，并发请求合并为一批统一评估
+        if app.config['RISK_COALESCE_ENABLED']:
+            assessment = risk_batcher.submit(data)
+        else:
+            assessment = risk_service.assess_loan_application(data)
         
         return jsonify(assessment)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/assess_risk_batch', methods=['POST'])
+@login_required
+@role_required(['manager', 'president'])
+def assess_risk_batch():
+    """批量风险评估（网点导入、审计重评）"""
+    try:
+        data = request.get_json()
+
+        # 支持直接传列表或 {"applications": [...]}
+        applications = data.get('applications') if isinstance(data, dict) else data
+        if not isinstance(applications, list) or not all(isinstance(item, dict) for item in applications):
+            return jsonify({'error': '请求体必须是申请数据列表'}), 400
+        if len(applications) > app.config['RISK_BATCH_MAX_SIZE']:
+            return jsonify({'error': f'单次最多评估 {app.config["RISK_BATCH_MAX_SIZE"]} 条申请'}), 400
+
+        # 一次构建特征矩阵并批量评估
+        assessments = risk_service.assess_loan_applications(applications)
+
+        return jsonify({'count': len(assessments), 'results': assessments})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/apply_loan', methods=['GET', 'POST'])
 @login_required
 def apply_loan():
@@ -268,28 +342,22 @@ def apply_loan():
                 'previous_default': request.form.get('previous_default')
             }
             
-            app.logger.debug(f"表单数据: {data}")
+            app.logger.debug("表单数据: %s", data)
             
             # 进行风险评估
             risk_assessment = risk_service.assess_loan_application(data)
             
-            app.logger.debug(f"风险评估结果: {risk_assessment}")
+            app.logger.debug("风险评估结果: %s", risk_assessment)
             
-            # 计算利率
-            interest_rate = calculate_credit_score(data)
-            
-            # 计算月利率
-            monthly_rate = interest_rate / 12
-            
-            # 计算月还款额（等额本息）
+            # 计算利率、月还款额（等额本息）和总利息
             loan_amount = float(data['loan_amount'])
             loan_term = int(data['loan_term'])
-            monthly_payment = (loan_amount * monthly_rate * (1 + monthly_rate) ** loan_term) / ((1 + monthly_rate) ** loan_term - 1)
+            quote = calculate_loan_quote(loan_amount, loan_term)
+            interest_rate = quote['interest_rate']
+            monthly_payment = quote['monthly_payment']
+            total_interest = quote['total_interest']
             
-            # 计算总利息
-            total_interest = monthly_payment * loan_term - loan_amount
-            
-            app.logger.debug(f"利率: {interest_rate}, 月还款: {monthly_payment}, 总利息: {total_interest}")
+            app.logger.debug("利率: %s, 月还款: %s, 总利息: %s", interest_rate, monthly_payment, total_interest)
             
             # 创建贷款申请
             loan = LoanApplication(
@@ -325,7 +393,7 @@ def apply_loan():
                 recommendation=risk_assessment.get('recommendation', {}).get('recommendation', '暂无建议')
             )
             
-            app.logger.debug(f"创建贷款申请对象: {loan}")
+            app.logger.debug("创建贷款申请对象: %s", loan)
             
             # 保存到数据库
             db.session.add(loan)
@@ -443,29 +511,96 @@ def calculate_interest():
             except (ValueError, TypeError):
                 return jsonify({'error': f'{limits["label"]}必须是有效的数字'}), 400
 
-        # 计算利率
-        interest_rate = calculate_credit_score(data)
-        
-        # 计算月利率
-        monthly_rate = interest_rate / 12
-        
-        # 计算月还款额（等额本息）
+        # 计算利率、月还款额（等额本息）和总利息
         loan_amount = float(data['loan_amount'])
         loan_term = int(data['loan_term'])
-        monthly_payment = (loan_amount * monthly_rate * (1 + monthly_rate) ** loan_term) / ((1 + monthly_rate) ** loan_term - 1)
-        
-        # 计算总利息
-        total_interest = monthly_payment * loan_term - loan_amount
+        quote = calculate_loan_quote(loan_amount, loan_term)
         
         return jsonify({
-            'interest_rate': interest_rate,
-            'monthly_payment': monthly_payment,
-            'total_interest': total_interest,
-            'total_payment': loan_amount + total_interest
+            'interest_rate': quote['interest_rate'],
+            'monthly_payment': quote['monthly_payment'],
+            'total_interest': quote['total_interest'],
+            'total_payment': loan_amount + quote['total_interest']
         })
     except Exception as e:
         return jsonify({'error': f'计算失败: {str(e)}'}), 400
 
+def calculate_loan_quote(loan_amount, loan_term):
+    """计算贷款报价（利率、月还款额、总利息），相同金额和期限直接返回缓存结果"""
+    key = make_key('quote', {'loan_amount': loan_amount, 'loan_term': loan_term})
+    hit, quote = quote_cache.get(key)
+    if hit:
+        return quote
+
+    # 计算利率
+    interest_rate = calculate_credit_score({'loan_amount': loan_amount, 'loan_term': loan_term})
+
+    # 按还款计划计算月还款额（等额本息，取整到分）和总利息（含最后一期的取整差额）
+    schedule = amortize(loan_amount, interest_rate, loan_term)
+    monthly_payment = float(schedule.installment[0])
+    total_interest = float(schedule.total_interest[0])
+
+    quote = {
+        'interest_rate': interest_rate,
+        'monthly_payment': monthly_payment,
+        'total_interest': total_interest
+    }
+    quote_cache.set(key, quote)
+    return quote
+
+@app.route('/quote_grid', methods=['GET', 'POST'])
+@login_required
+def get_quote_grid():
+    """一次返回金额 × 期限网格上所有组合的利率、月还款额和总利息，申请表单在本地查表显示"""
+    try:
+        data = request.get_json(silent=True) or request.args
+        limits = {
+            'amounts': {'min': 1000, 'max': 1000000, 'label': '贷款金额'},
+            'terms': {'min': 1, 'max': 60, 'label': '贷款期限'}
+        }
+        values = {}
+        for field, limit in limits.items():
+            raw = data.get(field)
+            if not raw:
+                return jsonify({'error': f'缺少必需字段: {limit["label"]}'}), 400
+            if isinstance(raw, str):
+                raw = raw.split(',')
+            try:
+                items = sorted({float(value) for value in raw})
+            except (ValueError, TypeError):
+                return jsonify({'error': f'{limit["label"]}必须是有效的数字'}), 400
+            # NaN 能通过下面的大小比较，inf 无法输出为合法的 JSON
+            if not all(math.isfinite(value) for value in items):
+                return jsonify({'error': f'{limit["label"]}必须是有效的数字'}), 400
+            if items[0] < limit['min']:
+                return jsonify({'error': f'{limit["label"]}不能小于{limit["min"]}'}), 400
+            if items[-1] > limit['max']:
+                return jsonify({'error': f'{limit["label"]}不能大于{limit["max"]}'}), 400
+            values[field] = items
+        amounts = values['amounts']
+        # 期限按月计，12.7 这样的值不截断，直接拒绝
+        if any(term != int(term) for term in values['terms']):
+            return jsonify({'error': '贷款期限必须是整数'}), 400
+        terms = [int(term) for term in values['terms']]
+        if len(amounts) * len(terms) > MAX_GRID_CELLS:
+            return jsonify({'error': f'报价组合不能超过{MAX_GRID_CELLS}个'}), 400
+
+        key = make_key('quote_grid', {'amounts': amounts, 'terms': terms})
+        hit, grid = quote_cache.get(key)
+        if not hit:
+            quotes = quote_grid(amounts, terms)
+            grid = {
+                'amounts': amounts,
+                'terms': terms,
+                'interest_rate': quotes['interest_rate'].tolist(),
+                'monthly_payment': quotes['monthly_payment'].tolist(),
+                'total_interest': quotes['total_interest'].tolist()
+            }
+            quote_cache.set(key, grid)
+        return jsonify(grid)
+    except Exception as e:
+        return jsonify({'error': f'计算失败: {str(e)}'}), 400
+
 def calculate_credit_score(data):
     """根据贷款额度和期限计算利率"""
     try:
@@ -473,36 +608,10 @@ def calculate_credit_score(data):
         loan_amount = float(data['loan_amount'])
         loan_term = int(data['loan_term'])
         
-        # 基础利率
-        base_rate = 0.05  # 5%
-        
-        # 根据贷款额度调整利率
-        if loan_amount <= 50000:
-            amount_factor = 0.0  # 小额贷款不调整利率
-        elif loan_amount <= 100000:
-            amount_factor = 0.01  # 增加1%
-        elif loan_amount <= 200000:
-            amount_factor = 0.02  # 增加2%
-        else:
-            amount_factor = 0.03  # 增加3%
-        
-        # 根据贷款期限调整利率
-        if loan_term <= 12:
-            term_factor = 0.0  # 短期贷款不调整利率
-        elif loan_term <= 24:
-            term_factor = 0.01  # 增加1%
-        elif loan_term <= 36:
-            term_factor = 0.02  # 增加2%
-        else:
-            term_factor = 0.03  # 增加3%
-        
-        # 计算最终利率
-        interest_rate = base_rate + amount_factor + term_factor
-        
-        # 确保利率在合理范围内
-        interest_rate = max(0.05, min(0.15, interest_rate))
+        # 基础利率加上金额和期限的分档加点，限制在合理范围内（分档表见 loan_pricing）
+        interest_rate = float(pricing_rate(loan_amount, loan_term))
         
-        app.logger.info(f'贷款额度: {loan_amount}, 期限: {loan_term}, 计算得到的利率: {interest_rate}')
+        app.logger.debug('贷款额度: %s, 期限: %s, 计算得到的利率: %s', loan_amount, loan_term, interest_rate)
         
         # 返回利率（而不是信用评分）
         return interest_rate
@@ -543,54 +652,74 @@ def repayment_records():
         flash('获取还款记录失败，请稍后重试', 'danger')
         return redirect(url_for('dashboard'))
 
-def generate_bills(loan):
-    """生成贷款账单"""
-    amount = float(loan.amount)
-    term = loan.term
-    monthly_rate = float(loan.interest_rate) / 12
-    monthly_payment = float(loan.monthly_payment)
-    
-    remaining_principal = amount
-    current_date = datetime.utcnow()
-    
-    for period in range(1, term + 1):
-        # 计算利息
-        interest = remaining_principal * monthly_rate
-        
-        # 计算本金
-        principal = monthly_payment - interest
-        
-        # 更新剩余本金
-        remaining_principal -= principal
-        
-        # 设置还款日期为每月1号
-        if period == 1:
-            # 第一个月的还款日期是下个月1号
-            if current_date.day > 1:
-                # 如果当前日期大于1号，还款日期是下个月1号
-                due_date = (current_date.replace(day=1) + timedelta(days=32)).replace(day=1)
-            else:
-                # 如果当前日期小于等于1号，还款日期是本月1号
-                due_date = current_date.replace(day=1)
-        else:
-            # 后续月份的还款日期是每月1号
-            due_date = (current_date.replace(day=1) + timedelta(days=32 * period)).replace(day=1)
-        
-        # 创建账单
-        bill = Bill(
-            loan_id=loan.id,
-            period=period,
-            due_date=due_date,
-            amount=round(monthly_payment, 2),
-            principal=round(principal, 2),
-            interest=round(interest, 2),
-            remaining_principal=round(remaining_principal if remaining_principal > 0 else 0, 2),
-            status='pending'
-        )
-        
-        db.session.add(bill)
-    
-    db.session.commit()
+def generate_bills(loans):
+    """为一笔或多笔贷款生成账单：首期为下个月 1 号（当天为 1 号时为当天），之后每月 1 号
+
+    所有贷款的还款计划一次算出，账单用一条批量 INSERT 写入；不提交事务，由调用方提交。
+    返回新账单的还款日列表，调用方提交成功后再传给 bill_scheduler.bills_created。
+    """
+    if isinstance(loans, LoanApplication):
+        loans = [loans]
+    if not loans:
+        return []
+    schedule = amortize([float(loan.amount) for loan in loans],
+                        [float(loan.interest_rate) for loan in loans],
+                        [loan.term for loan in loans])
+    rows = schedule.records([loan.id for loan in loans])
+    for row in rows:
+        row['status'] = 'pending'
+    db.session.bulk_insert_mappings(Bill, rows)
+    return [row['due_date'] for row in rows]
+
+def review_loans(loan_ids, decision, reviewer_id):
+    """在一个事务中批量审核贷款：更新状态、生成全部账单、批量创建 loan_review 通知
+
+    已经批准或拒绝的贷款会被跳过。返回 (实际审核的贷款列表, 新账单的还款日列表)；
+    不提交事务，调用方提交成功后再把还款日交给 bill_scheduler。
+    """
+    loans = LoanApplication.query.filter(
+        LoanApplication.id.in_(loan_ids),
+        LoanApplication.status.notin_(['approved', 'rejected'])
+    ).all()
+    if not loans:
+        return [], []
+
+    now = datetime.utcnow()
+    approve = decision == 'approve'
+    status = 'approved' if approve else 'rejected'
+    # 状态条件也放进 UPDATE：并发审核同一批贷款时，查询时都未审核的行只会被先写入的事务改到
+    updated = LoanApplication.query.filter(
+        LoanApplication.id.in_([loan.id for loan in loans]),
+        LoanApplication.status.notin_(['approved', 'rejected'])
+    ).update({
+        'status': status,
+        'approved_at': now,
+        'approved_by': reviewer_id
+    }, synchronize_session='fetch')
+    if updated != len(loans):
+        # 部分贷款在查询之后已被其他审核改过：按本次写入的审核时间和审核人找出本事务改到的行，
+        # 只为这些贷款生成通知和账单
+        reviewed_ids = {loan_id for loan_id, in db.session.query(LoanApplication.id).filter(
+            LoanApplication.id.in_([loan.id for loan in loans]),
+            LoanApplication.status == status,
+            LoanApplication.approved_at == now,
+            LoanApplication.approved_by == reviewer_id
+        )}
+        loans = [loan for loan in loans if loan.id in reviewed_ids]
+        if not loans:
+            return [], []
+
+    db.session.bulk_insert_mappings(Notification, [{
+        'user_id': loan.user_id,
+        'title': '贷款申请审核结果',
+        'content': f'您的贷款申请（ID: {loan.id}）已被{"批准" if approve else "拒绝"}。',
+        'type': 'loan_review',
+        'is_read': False,
+        'created_at': now
+    } for loan in loans])
+
+    due_dates = generate_bills(loans) if approve else []
+    return loans, due_dates
 
 @app.route('/review_loan/<int:loan_id>', methods=['GET', 'POST'])
 @login_required
@@ -604,25 +733,15 @@ def president_review_loan(loan_id):
 
         
         if decision in ['approve', 'reject']:
-            # 更新贷款状态
-            loan.status = 'approved' if decision == 'approve' else 'rejected'
-            loan.approved_at = datetime.utcnow()
-            loan.approved_by = current_user.id
-            
-            # 创建通知
-            notification = Notification(
-                user_id=loan.user_id,
-                title='贷款申请审核结果',
-                content=f'您的贷款申请（ID: {loan.id}）已被{"批准" if decision == "approve" else "拒绝"}。',
-                type='loan_review'
-            )
-            db.session.add(notification)
-            
-            # 如果批准，生成还款计划
-            if decision == 'approve':
-                generate_bills(loan)
+            # 更新状态、创建通知，批准时生成还款计划；已审核过的贷款不会重复生成账单
+            reviewed, due_dates = review_loans([loan.id], decision, current_user.id)
+            if not reviewed:
+                flash('该贷款申请已审核过', 'warning')
+                return redirect(url_for('president_dashboard'))
             
             db.session.commit()
+            # 提交成功后再登记新账单，回滚时调度器里不会留下不存在的账单
+            bill_scheduler.bills_created(due_dates)
             flash('贷款申请已审核完成！', 'success')
             return redirect(url_for('president_dashboard'))
         else:
@@ -630,6 +749,35 @@ def president_review_loan(loan_id):
     
     return render_template('president_review.html', loan=loan, user=user)
 
+@app.route('/bulk_review_loans', methods=['POST'])
+@login_required
+@role_required(['president'])
+def bulk_review_loans():
+    """行长批量审核：一次批准或拒绝多笔贷款"""
+    decision = request.form.get('decision')
+    loan_ids = [int(loan_id) for loan_id in request.form.getlist('loan_ids') if loan_id.isdigit()]
+    if decision not in ['approve', 'reject']:
+        flash('无效的审核决定！', 'danger')
+        return redirect(url_for('president_dashboard'))
+    if not loan_ids:
+        flash('请选择要审核的贷款申请', 'warning')
+        return redirect(url_for('president_dashboard'))
+
+    try:
+        loans, due_dates = review_loans(loan_ids, decision, current_user.id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"批量审核失败: {str(e)}", exc_info=True)
+        flash('批量审核失败，请稍后重试', 'danger')
+        return redirect(url_for('president_dashboard'))
+    bill_scheduler.bills_created(due_dates)
+
+    skipped = len(set(loan_ids)) - len(loans)
+    flash(f'已{"批准" if decision == "approve" else "拒绝"} {len(loans)} 笔贷款申请' +
+          (f'，跳过 {skipped} 笔已审核或不存在的申请' if skipped else ''), 'success')
+    return redirect(url_for('president_dashboard'))
+
 @app.route('/loan_detail/<int:loan_id>')
 @login_required
 def loan_detail(loan_id):
@@ -702,6 +850,95 @@ def debug_loans():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/debug/cache_stats')
+@login_required
+@role_required(['manager', 'president'])
+def debug_cache_stats():
+    """调试路由：查看风险评估和报价缓存的命中情况"""
+    return jsonify({
+        'assessment': risk_service.cache.stats(),
+        'quote': quote_cache.stats()
+    })
+
+@app.route('/debug/bill_scheduler')
+@login_required
+@role_required(['manager', 'president'])
+def debug_bill_scheduler():
+    """调试路由：查看定时任务 leader、账单任务的下次唤醒时刻、待触发的还款日和唤醒次数"""
+    stats = bill_scheduler.stats()
+    stats['leader'] = scheduler_leader.stats()
+    return jsonify(stats)
+
+@app.route('/debug/batcher_stats', methods=['GET', 'POST'])
+@login_required
+@role_required(['manager', 'president'])
+def debug_batcher_stats():
+    """调试路由：查看请求合并器的队列深度和批大小，POST 可调整合并窗口和单批最大条数"""
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        try:
+            window_ms = float(data['window_ms']) if 'window_ms' in data else None
+            max_batch_size = int(data['max_batch_size']) if 'max_batch_size' in data else None
+        except (ValueError, TypeError):
+            return jsonify({'error': '参数必须是有效的数字'}), 400
+        risk_batcher.configure(window_ms=window_ms, max_batch_size=max_batch_size)
+    return jsonify(risk_batcher.stats())
+
+@app.route('/debug/scoring_trace', methods=['GET', 'POST'])
+@login_required
+@role_required(['manager', 'president'])
+def debug_scoring_trace():
+    """调试路由：查看评分各阶段耗时，POST 可开关追踪、调整采样比例或清空统计"""
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        try:
+            risk_service.tracer.configure(
+                enabled=data.get('enabled'),
+                sample_rate=data.get('sample_rate')
+            )
+        except (ValueError, TypeError):
+            return jsonify({'error': '采样比例必须是有效的数字'}), 400
+        if data.get('reset'):
+            risk_service.tracer.reset()
+    return jsonify(risk_service.tracer.stats())
+
+@app.route('/debug/shadow_scoring', methods=['GET', 'POST'])
+@login_required
+@role_required(['manager', 'president'])
+def debug_shadow_scoring():
+    """调试路由：查看模型与显式公式的差异统计，POST 可切换评分模式、调整影子采样比例或清空统计"""
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        try:
+            if data.get('mode') is not None:
+                risk_service.set_scoring_mode(data['mode'])
+            risk_service.shadow.configure(sample_rate=data.get('sample_rate'))
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        if data.get('reset'):
+            risk_service.shadow.reset()
+    stats = risk_service.shadow.stats()
+    stats['mode'] = risk_service.scoring_mode
+    return jsonify(stats)
+
+@app.route('/debug/model_registry', methods=['GET', 'POST'])
+@login_required
+@role_required(['president'])
+def debug_model_registry():
+    """调试路由：查看当前模型版本和模型目录，POST 可切换版本（activate）或回滚（rollback）"""
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        try:
+            if data.get('activate'):
+                if not risk_service.activate_version(data['activate']):
+                    return jsonify({'error': '新模型未通过预热，仍使用原版本', **risk_service.model_info()}), 500
+            elif data.get('rollback'):
+                if risk_service.rollback_model() is None:
+                    return jsonify({'error': '回滚版本未通过预热，仍使用原版本', **risk_service.model_info()}), 500
+        except RegistryError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(risk_service.model_info())
+
 @app.route('/president_dashboard')
 @login_required
 @role_required(['president'])
@@ -755,6 +992,7 @@ def repay_bill():
             return redirect(request.referrer or url_for('dashboard'))
         
         # 更新账单状态
+        was_pending = bill.status == 'pending'
         bill.status = 'paid'
         bill.updated_at = datetime.utcnow()
         bill.paid_at = datetime.utcnow()
@@ -770,6 +1008,8 @@ def repay_bill():
         
         db.session.add(repayment)
         db.session.commit()
+        if was_pending:
+            bill_scheduler.bill_paid(bill.due_date)
         
         flash('还款成功', 'success')
         return redirect(url_for('loan_detail', loan_id=bill.loan_id))
@@ -842,14 +1082,28 @@ def send_collection_notice(bill_id):
     flash('催收通知已发送', 'success')
     return redirect(url_for('loan_detail', loan_id=loan.id))
 
+@app.cli.command('rescore-applications')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='每批处理的申请数')
+@click.option('--checkpoint', default=DEFAULT_CHECKPOINT_PATH, show_default=True, help='断点文件路径')
+@click.option('--restart', is_flag=True, help='忽略断点文件，从头开始')
+@click.option('--status', 'statuses', multiple=True, help='只处理指定状态的申请，可重复指定')
+def rescore_applications_command(chunk_size, checkpoint, restart, statuses):
+    """用当前模型重新计算已保存贷款申请的风险评分（flask rescore-applications）"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    result = rescore_applications(risk_service, chunk_size=chunk_size, checkpoint_path=checkpoint,
+                                  restart=restart, statuses=list(statuses) or None)
+    click.echo(f"重评分完成：处理 {result['processed']} 条，更新 {result['updated']} 条，"
+               f"模型版本 {result['model_version']}")
+
 if __name__ == '__main__':
     with app.app_context():
         # 初始化数据库
         db.create_all()
         
-        # 启动调度器
-        if not scheduler.running:
-            scheduler.start()
+        # debug 模式下 werkzeug 重载器的父进程只负责监视文件并重启子进程，
+        # 由处理请求的子进程（WERKZEUG_RUN_MAIN=true）参与竞选
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_scheduler_election()
         
         # 运行应用程序
         app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""按主键分段执行的批处理任务
+
+大批量的写操作按主键顺序分成多段，每段只处理 (上一段最大 id, 本段最大 id] 区间内符合条件的行：
+先用键集分页只查询本段的主键（内存只取决于段大小），再由调用方对这个主键区间执行集合式语句。
+每段单独提交，SQLite 的写锁只持有一段的时间；段与段之间暂停 pause_seconds 秒，让前台请求有机会写入。
+每段提交后把游标（已处理到的最大 id 和累计数量）写入断点文件，中断后再次运行从断点处继续，
+全部完成后删除断点文件。
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from models import db
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_PAUSE_SECONDS = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+def load_checkpoint(path):
+    """读取断点文件，不存在时返回 None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    """原子写入断点文件"""
+    checkpoint['updated_at'] = datetime.utcnow().isoformat()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def keyset_ranges(key_column, criteria, after_id=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """按主键顺序把符合条件的行分段，逐段返回 (after_id, last_id, 行数)
+
+    每段只查询主键列：id > 上一段最大 id 的前 chunk_size 个。调用方处理完一段后才查询下一段，
+    因此处理过程中不再符合条件的行（如已标记为逾期的账单）不会影响后面的分段。
+    """
+    while True:
+        ids = db.session.query(key_column).filter(key_column > after_id, *criteria) \
+            .order_by(key_column).limit(chunk_size).all()
+        if not ids:
+            return
+        last_id = ids[-1][0]
+        yield after_id, last_id, len(ids)
+        after_id = last_id
+
+
+def run_keyset_job(name, key_column, criteria, process_range, checkpoint_path, params=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE, pause_seconds=DEFAULT_PAUSE_SECONDS, max_chunks=None):
+    """分段执行一个批处理任务，返回最终的游标
+
+    process_range(after_id, last_id) 对主键区间 (after_id, last_id] 内符合条件的行执行写操作并返回处理的行数，
+    不提交事务。params 为本次运行的参数（如截止日期），与断点文件中的不同时从头开始，
+    避免按旧参数处理过的区间被跳过。出错时回滚当前段并抛出异常，断点停在上一个已提交的段。
+    需要在应用上下文中调用。
+    """
+    params = params or {}
+    cursor = load_checkpoint(checkpoint_path)
+    if cursor and (cursor.get('job') != name or cursor.get('params') != params):
+        cursor = None
+    if cursor is None:
+        cursor = {
+            'job': name,
+            'params': params,
+            'last_id': 0,
+            'chunks': 0,
+            'processed': 0,
+            'started_at': datetime.utcnow().isoformat(),
+        }
+    else:
+        logger.info("%s 从断点继续：id > %s，已处理 %s 条", name, cursor['last_id'], cursor['processed'])
+
+    chunks = 0
+    for after_id, last_id, _ in keyset_ranges(key_column, criteria, cursor['last_id'], chunk_size):
+        try:
+            processed = process_range(after_id, last_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        # 释放本段占用的会话状态，内存不随处理的行数增长
+        db.session.expunge_all()
+
+        cursor['last_id'] = last_id
+        cursor['chunks'] += 1
+        cursor['processed'] += processed
+        save_checkpoint(checkpoint_path, cursor)
+
+        chunks += 1
+        if max_chunks is not None and chunks >= max_chunks:
+            return cursor
+        # 让出写锁和 CPU，前台请求可以在两段之间执行
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    cursor['completed'] = True
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return cursor
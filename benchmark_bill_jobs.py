@@ -0,0 +1,222 @@
+"""账单定时任务基准测试：比较逐条 ORM 实现与集合式 SQL 实现的耗时
+
+用法：
+    python benchmark_bill_jobs.py --bills 1000000 --output bill_jobs_benchmark.json
+
+在临时 SQLite 数据库中生成 --bills 张账单（每笔贷款 12 期），其中 --overdue 张为已过还款日的待还账单，
+--upcoming 张为 3 天后到期的待还账单，其余为已还清或未到期的账单；另有 --notifications 条历史通知。
+每种实现都在同一份数据库的副本上运行，分别测量还款提醒和逾期处理一次运行的耗时；
+chunked 为定时任务实际使用的分段执行方式（每段 1000 张账单、逐段提交，测量时段间不暂停）。
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Flask
+
+from bill_jobs import mark_overdue_bills, send_upcoming_reminders, run_overdue_job, run_reminder_job
+from models import db, Bill, Notification
+
+REMINDER_DAYS = 3
+PERIODS_PER_LOAN = 12
+INSERT_CHUNK = 100000
+CHECKPOINT_DIR = tempfile.gettempdir()
+
+
+def legacy_check_upcoming_bills(today):
+    """原来的实现：逐条加载账单，按内容字符串逐条检查是否已提醒"""
+    three_days_later = today + timedelta(days=REMINDER_DAYS)
+    upcoming_bills = Bill.query.filter(
+        Bill.status == 'pending',
+        Bill.due_date >= three_days_later,
+        Bill.due_date < three_days_later + timedelta(days=1)
+    ).all()
+    for bill in upcoming_bills:
+        existing_notification = Notification.query.filter_by(
+            user_id=bill.loan.user_id,
+            content=f"请于 {bill.due_date.strftime('%Y-%m-%d')} 前还款 {bill.amount:.2f} 元。"
+        ).first()
+        if not existing_notification:
+            db.session.add(Notification(
+                user_id=bill.loan.user_id,
+                title="还款提醒",
+                content=f"请于 {bill.due_date.strftime('%Y-%m-%d')} 前还款 {bill.amount:.2f} 元。",
+                type='repayment_reminder',
+                is_read=False,
+                created_at=datetime.utcnow()
+            ))
+    db.session.commit()
+
+
+def legacy_update_overdue_bills(today):
+    """原来的实现：逐条加载逾期账单，每张账单懒加载一次贷款并创建一个通知对象"""
+    overdue_bills = Bill.query.filter(Bill.status == 'pending', Bill.due_date < today).all()
+    for bill in overdue_bills:
+        bill.status = 'overdue'
+        db.session.add(Notification(
+            user_id=bill.loan.user_id,
+            title="账单逾期提醒",
+            content=f"您的账单已逾期，请尽快还款 {bill.amount:.2f} 元。",
+            type='overdue_reminder',
+            is_read=False,
+            created_at=datetime.utcnow()
+        ))
+    db.session.commit()
+
+
+def set_based_check_upcoming_bills(today):
+    send_upcoming_reminders(db.session, REMINDER_DAYS, today=today)
+    db.session.commit()
+
+
+def set_based_update_overdue_bills(today):
+    mark_overdue_bills(db.session, today=today)
+    db.session.commit()
+
+
+def chunked_check_upcoming_bills(today):
+    run_reminder_job(REMINDER_DAYS, pause_seconds=0, checkpoint_path=os.path.join(CHECKPOINT_DIR, 'reminders.json'),
+                     today=today)
+
+
+def chunked_update_overdue_bills(today):
+    run_overdue_job(pause_seconds=0, checkpoint_path=os.path.join(CHECKPOINT_DIR, 'overdue.json'), today=today)
+
+
+IMPLEMENTATIONS = {
+    'legacy': {'reminders': legacy_check_upcoming_bills, 'overdue': legacy_update_overdue_bills},
+    'set_based': {'reminders': set_based_check_upcoming_bills, 'overdue': set_based_update_overdue_bills},
+    'chunked': {'reminders': chunked_check_upcoming_bills, 'overdue': chunked_update_overdue_bills},
+}
+
+
+def _timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def build_database(path, bills, overdue, upcoming, notifications, users, seed, today):
+    """生成合成数据库，直接用 sqlite3 批量写入"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    rng = np.random.default_rng(seed)
+    loans = -(-bills // PERIODS_PER_LOAN)
+    now = _timestamp(datetime.utcnow())
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO users (id, username, password, email, phone, role, created_at) VALUES (?, ?, '', ?, ?, 'user', ?)",
+        ((i, f'user{i}', f'user{i}@example.com', str(13000000000 + i), now) for i in range(1, users + 1))
+    )
+    user_ids = rng.integers(1, users + 1, loans)
+    conn.executemany(
+        "INSERT INTO loan_application (id, user_id, username, amount, term, interest_rate, monthly_payment, "
+        "total_interest, status, created_at, annual_income, monthly_income, savings_balance, total_assets, "
+        "total_liabilities, his_existing_loans, his_monthly_debt) "
+        "VALUES (?, ?, '', 12000, ?, 0.08, 1000, 500, 'approved', ?, 0, 0, 0, 0, 0, 0, 0)",
+        ((i + 1, int(user_ids[i]), PERIODS_PER_LOAN, now) for i in range(loans))
+    )
+
+    # 账单状态：前 overdue 张逾期待处理，接着 upcoming 张 3 天后到期，其余一半已还清、一半未到期
+    overdue_due = _timestamp(datetime.combine(today - timedelta(days=2), datetime.min.time()))
+    upcoming_due = _timestamp(datetime.combine(today + timedelta(days=REMINDER_DAYS), datetime.min.time()))
+    paid_due = _timestamp(datetime.combine(today - timedelta(days=40), datetime.min.time()))
+    future_due = _timestamp(datetime.combine(today + timedelta(days=60), datetime.min.time()))
+    amounts = np.round(rng.uniform(100, 20000, bills), 2)
+
+    def rows(start, stop):
+        for i in range(start, stop):
+            if i < overdue:
+                status, due = 'pending', overdue_due
+            elif i < overdue + upcoming:
+                status, due = 'pending', upcoming_due
+            elif i % 2:
+                status, due = 'paid', paid_due
+            else:
+                status, due = 'pending', future_due
+            yield (i + 1, i // PERIODS_PER_LOAN + 1, i % PERIODS_PER_LOAN + 1, due, float(amounts[i]),
+                   status, now, now)
+
+    for start in range(0, bills, INSERT_CHUNK):
+        conn.executemany(
+            "INSERT INTO bills (id, loan_id, period, due_date, amount, principal, interest, remaining_principal, "
+            "status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 0, 0, 0, ?, ?, ?)",
+            rows(start, min(start + INSERT_CHUNK, bills))
+        )
+    conn.executemany(
+        "INSERT INTO notification (user_id, title, content, is_read, created_at, type) VALUES (?, '通知', ?, 0, ?, 'loan_review')",
+        ((int(user_id), f'历史通知 {i}', now) for i, user_id in enumerate(rng.integers(1, users + 1, notifications)))
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_implementation(name, template, today):
+    """在数据库副本上运行一种实现，返回各任务的耗时和结果计数"""
+    workdir = tempfile.mkdtemp(prefix=f'bill_jobs_{name}_')
+    path = os.path.join(workdir, 'bench.db')
+    shutil.copyfile(template, path)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    result = {}
+    try:
+        with app.app_context():
+            for job in ('reminders', 'overdue'):
+                started = time.perf_counter()
+                IMPLEMENTATIONS[name][job](today)
+                result[f'{job}_seconds'] = time.perf_counter() - started
+                db.session.remove()
+            result['notifications'] = Notification.query.count()
+            result['overdue_bills'] = Bill.query.filter_by(status='overdue').count()
+    finally:
+        shutil.rmtree(workdir)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='账单定时任务基准测试')
+    parser.add_argument('--bills', type=int, default=1000000, help='账单总数')
+    parser.add_argument('--overdue', type=int, default=20000, help='需要标记为逾期的账单数')
+    parser.add_argument('--upcoming', type=int, default=20000, help='需要发送还款提醒的账单数')
+    parser.add_argument('--notifications', type=int, default=100000, help='已有的通知数')
+    parser.add_argument('--users', type=int, default=20000, help='用户数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--implementations', nargs='+', default=list(IMPLEMENTATIONS), help='要测量的实现')
+    parser.add_argument('--output', default='bill_jobs_benchmark.json', help='结果输出文件')
+    args = parser.parse_args()
+
+    today = datetime.utcnow().date()
+    workdir = tempfile.mkdtemp(prefix='bill_jobs_')
+    template = os.path.join(workdir, 'template.db')
+    try:
+        started = time.perf_counter()
+        build_database(template, args.bills, args.overdue, args.upcoming, args.notifications,
+                       args.users, args.seed, today)
+        print(f"生成 {args.bills} 张账单用时 {time.perf_counter() - started:.1f}s")
+        report = {'settings': vars(args), 'results': {}}
+        for name in args.implementations:
+            result = run_implementation(name, template, today)
+            report['results'][name] = result
+            print(f"{name:>10}: 还款提醒 {result['reminders_seconds']:.2f}s，逾期处理 {result['overdue_seconds']:.2f}s，"
+                  f"通知 {result['notifications']} 条，逾期账单 {result['overdue_bills']} 张")
+    finally:
+        shutil.rmtree(workdir)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""模型加载基准测试：比较 pickle 与内存映射模型文件的冷启动时间和 worker 内存占用
+
+用法：
+    python benchmark_model_load.py --runs 5 --workers 4 --output model_load_benchmark.json
+
+每次冷启动都在新的子进程中完成（包含导入依赖的时间）。内存统计来自 /proc/self/status：
+RssAnon 为进程私有的匿名内存，RssFile 为映射文件占用的页（多个进程映射同一文件时共享）。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from model_artifact import ARTIFACT_PATH
+
+# 在子进程中执行的加载代码
+LOADERS = {
+    'pickle': """
+import pickle
+with open('risk_assessment_model.pkl', 'rb') as f:
+    model = pickle.load(f)
+with open('risk_assessment_scaler.pkl', 'rb') as f:
+    scaler = pickle.load(f)
+""",
+    'artifact': f"""
+from model_artifact import load_artifact
+model, scaler, header = load_artifact({ARTIFACT_PATH!r})
+""",
+}
+
+CHILD_TEMPLATE = """
+import json, time, sys, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+{loader}
+import numpy as np
+X = np.zeros((1, len(scaler.mean_)))
+model.predict_proba(scaler.transform(X))
+elapsed = time.perf_counter() - start
+
+def read_status():
+    status = {{}}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                status[key] = int(value.split()[0])
+    return status
+
+status = read_status()
+print(json.dumps({{'load_seconds': elapsed, 'rss_kb': status.get('VmRSS'),
+                  'rss_anon_kb': status.get('RssAnon'), 'rss_file_kb': status.get('RssFile')}}))
+{hold}
+"""
+
+
+def run_child(mode, hold=False):
+    """启动一个子进程加载模型，hold 为 True 时子进程加载后等待标准输入关闭再退出"""
+    code = CHILD_TEMPLATE.format(loader=LOADERS[mode], hold='sys.stdin.read()' if hold else '')
+    return subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE,
+                            stdin=subprocess.PIPE if hold else subprocess.DEVNULL, text=True)
+
+
+def cold_start(mode, runs):
+    """测量冷启动时间（进程启动到完成首次预测）"""
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = run_child(mode)
+        out, _ = proc.communicate()
+        wall = time.perf_counter() - start
+        result = json.loads(out)
+        result['wall_seconds'] = wall
+        results.append(result)
+    return results
+
+
+def concurrent_workers(mode, workers):
+    """同时保持多个 worker 进程，统计各自的内存占用"""
+    procs = [run_child(mode, hold=True) for _ in range(workers)]
+    stats = [json.loads(proc.stdout.readline()) for proc in procs]
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+    return stats
+
+
+def summarize(values):
+    return {
+        'min': min(values),
+        'median': statistics.median(values),
+        'max': max(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型加载基准测试')
+    parser.add_argument('--runs', type=int, default=5, help='每种方式的冷启动次数')
+    parser.add_argument('--workers', type=int, default=4, help='同时运行的 worker 数')
+    parser.add_argument('--output', default='model_load_benchmark.json', help='结果输出文件')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'artifact_size_bytes': os.path.getsize(ARTIFACT_PATH),
+        'pickle_size_bytes': os.path.getsize('risk_assessment_model.pkl') + os.path.getsize('risk_assessment_scaler.pkl'),
+        'modes': {}
+    }
+    for mode in LOADERS:
+        cold = cold_start(mode, args.runs)
+        workers = concurrent_workers(mode, args.workers)
+        report['modes'][mode] = {
+            'wall_seconds': summarize([r['wall_seconds'] for r in cold]),
+            'load_seconds': summarize([r['load_seconds'] for r in cold]),
+            'worker_rss_kb': summarize([w['rss_kb'] for w in workers]),
+            'worker_rss_anon_kb': summarize([w['rss_anon_kb'] for w in workers]),
+            'worker_rss_file_kb': summarize([w['rss_file_kb'] for w in workers]),
+        }
+        mode_report = report['modes'][mode]
+        print(f"{mode:>8}: 冷启动 {mode_report['wall_seconds']['median']:.3f}s，"
+              f"加载 {mode_report['load_seconds']['median']:.3f}s，"
+              f"私有内存 {mode_report['worker_rss_anon_kb']['median'] / 1024:.1f}MB，"
+              f"文件映射 {mode_report['worker_rss_file_kb']['median'] / 1024:.1f}MB")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""评分路径基准测试：测量风险评估、利率报价和批量评估的延迟与吞吐量
+
+用法：
+    python benchmark_scoring.py --output scoring_benchmark.json
+    python benchmark_scoring.py --output new.json --compare scoring_benchmark.json
+
+输入数据两种来源：mock_data.generate_sample_application 生成的申请和 loan_data.csv 中的记录。
+每个场景按批大小（默认 1、16、256、4096）重复调用，一次调用处理一批记录：
+单条接口在一次调用内逐条处理整批记录，批量接口一次处理整批。
+评估结果缓存在测试期间关闭，利率报价直接调用 loan_pricing 和 amortization（不导入 app、不经过报价缓存），
+测得的是实际计算的耗时。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from amortization import amortize
+from loan_pricing import interest_rate as pricing_rate
+from mock_data import generate_sample_application
+from risk_assessment import RiskAssessmentService, ASSESSMENT_FIELDS
+
+DEFAULT_BATCH_SIZES = [1, 16, 256, 4096]
+DATA_PATH = 'loan_data.csv'
+
+
+def load_sources(count, seed):
+    """准备两种来源的申请数据，各 count 条"""
+    np.random.seed(seed)
+    mock = [generate_sample_application() for _ in range(count)]
+
+    df = pd.read_csv(DATA_PATH)
+    df = df.sample(n=count, replace=len(df) < count, random_state=seed)
+    csv = [{field: row[field] for field in ASSESSMENT_FIELDS if field in row}
+           for row in df.to_dict('records')]
+    return {'mock': mock, 'loan_data': csv}
+
+
+def loan_quote(loan_amount, loan_term):
+    """与 app.calculate_loan_quote 相同的计算（分档利率 + 还款计划）
+
+    不导入 app：导入 app 会连接 loan.db、参与定时任务选主并可能启动会修改账单的调度器。
+    """
+    interest_rate = float(pricing_rate(loan_amount, loan_term))
+    schedule = amortize(loan_amount, interest_rate, loan_term)
+    return {
+        'interest_rate': interest_rate,
+        'monthly_payment': float(schedule.installment[0]),
+        'total_interest': float(schedule.total_interest[0])
+    }
+
+
+def make_targets(service, loan_quote):
+    """被测函数，每个函数接收一批记录"""
+    def assess_single(batch):
+        for data in batch:
+            service.assess_loan_application(data)
+
+    def assess_batch(batch):
+        service.assess_loan_applications(batch)
+
+    def quote(batch):
+        for data in batch:
+            loan_quote(float(data['loan_amount']), int(data['loan_term']))
+
+    return {
+        'assess_loan_application': assess_single,
+        'assess_loan_applications': assess_batch,
+        'credit_score_annuity': quote,
+    }
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_case(func, rows, batch_size, repeat, max_seconds, warmup):
+    """重复调用 func，返回每次调用的延迟分位数和吞吐量"""
+    # 每次调用取不同的记录，数据用完后从头循环
+    batches = [[rows[(i * batch_size + j) % len(rows)] for j in range(batch_size)]
+               for i in range(repeat + warmup)]
+
+    for batch in batches[:warmup]:
+        func(batch)
+
+    latencies = []
+    started = time.perf_counter()
+    for batch in batches[warmup:]:
+        t0 = time.perf_counter()
+        func(batch)
+        latencies.append(time.perf_counter() - t0)
+        # 超过时间预算后至少保留 3 次测量
+        if time.perf_counter() - started > max_seconds and len(latencies) >= 3:
+            break
+
+    total = sum(latencies)
+    return {
+        'calls': len(latencies),
+        'rows': len(latencies) * batch_size,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': total / len(latencies) * 1000,
+        'rows_per_second': len(latencies) * batch_size / total if total else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline_path):
+    """与之前的结果对比，打印吞吐量变化"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(c['target'], c['source'], c['batch_size']): c for c in baseline['cases']}
+    print(f"\n与 {baseline_path}（{baseline.get('git_revision')}）对比：")
+    for case in report['cases']:
+        key = (case['target'], case['source'], case['batch_size'])
+        if key not in old:
+            continue
+        before, after = old[key], case
+        ratio = after['rows_per_second'] / before['rows_per_second'] if before['rows_per_second'] else 0.0
+        print(f"{case['target']:>26} {case['source']:>9} n={case['batch_size']:<5} "
+              f"p50 {before['p50_ms']:.3f} -> {after['p50_ms']:.3f}ms，吞吐量 x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='评分路径基准测试')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES, help='批大小')
+    parser.add_argument('--repeat', type=int, default=30, help='每个场景的最多调用次数')
+    parser.add_argument('--warmup', type=int, default=2, help='每个场景的预热调用次数')
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='每个场景的时间预算（秒）')
+    parser.add_argument('--rows', type=int, default=8192, help='每种来源准备的记录数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--targets', nargs='+', help='只运行指定的被测函数')
+    parser.add_argument('--output', default='scoring_benchmark.json', help='结果输出文件')
+    parser.add_argument('--compare', help='用于对比的历史结果文件')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    # 关闭结果缓存，测量实际计算耗时
+    service = RiskAssessmentService(cache_size=0)
+
+    sources = load_sources(args.rows, args.seed)
+    targets = make_targets(service, loan_quote)
+    if args.targets:
+        targets = {name: func for name, func in targets.items() if name in args.targets}
+
+    report = {
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'model_version': service.model_version,
+        'settings': {
+            'batch_sizes': args.batch_sizes,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'max_seconds': args.max_seconds,
+            'rows': args.rows,
+            'seed': args.seed,
+        },
+        'cases': []
+    }
+    for target, func in targets.items():
+        for source, rows in sources.items():
+            for batch_size in args.batch_sizes:
+                result = run_case(func, rows, batch_size, args.repeat, args.max_seconds, args.warmup)
+                result.update({'target': target, 'source': source, 'batch_size': batch_size})
+                report['cases'].append(result)
+                print(f"{target:>26} {source:>9} n={batch_size:<5} "
+                      f"p50 {result['p50_ms']:.3f}ms p95 {result['p95_ms']:.3f}ms "
+                      f"p99 {result['p99_ms']:.3f}ms {result['rows_per_second']:.0f} 条/秒")
+                sys.stdout.flush()
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""账单定时任务的集合式实现
+
+逾期处理和还款提醒各用少量 SQL 语句完成，不把账单加载为 ORM 对象：
+通知由 INSERT ... SELECT 联结 loan_application 直接生成，账单状态由一条 UPDATE 修改，
+还款提醒是否已发送记录在提醒台账 reminder_ledger 中。
+mark_overdue_bills 和 send_upcoming_reminders 只执行语句、不提交事务，由调用方提交或回滚；
+定时任务使用 run_overdue_job 和 run_reminder_job，按账单主键分段执行并逐段提交（见 batch_jobs）。
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, exists, func, insert, literal, select, update
+
+from batch_jobs import run_keyset_job, DEFAULT_CHUNK_SIZE, DEFAULT_PAUSE_SECONDS
+from models import db, Bill, LoanApplication, Notification, ReminderLedger
+
+OVERDUE_TITLE = '账单逾期提醒'
+REMINDER_TITLE = '还款提醒'
+# 提醒台账中还款提醒的类型，与通知的 type 相同
+REMINDER_KIND = 'repayment_reminder'
+
+NOTIFICATION_COLUMNS = ['user_id', 'title', 'content', 'type', 'is_read', 'created_at']
+
+# 分段执行时的断点文件
+OVERDUE_CHECKPOINT_PATH = 'overdue_job_checkpoint.json'
+REMINDER_CHECKPOINT_PATH = 'reminder_job_checkpoint.json'
+
+
+def _day_start(day):
+    return datetime(day.year, day.month, day.day)
+
+
+def _amount_text(amount):
+    # 账单金额是取整到分的值，printf('%.2f') 与 Python 的 f'{amount:.2f}' 结果相同
+    return func.printf('%.2f', amount)
+
+
+def overdue_content(amount):
+    """逾期通知内容，与逐条生成时的文字相同"""
+    return literal('您的账单已逾期，请尽快还款 ').concat(_amount_text(amount)).concat(' 元。')
+
+
+def reminder_content(due_date, amount):
+    """还款提醒内容，与逐条生成时的文字相同"""
+    return (literal('请于 ').concat(func.strftime('%Y-%m-%d', due_date)).concat(' 前还款 ')
+            .concat(_amount_text(amount)).concat(' 元。'))
+
+
+def _id_range(id_range):
+    """账单主键区间 (after_id, last_id] 的条件，id_range 为 None 时不限制"""
+    if id_range is None:
+        return []
+    after_id, last_id = id_range
+    return [Bill.id > after_id, Bill.id <= last_id]
+
+
+def overdue_criteria(today):
+    """需要标记为逾期的账单：还款日早于 today 的待还账单"""
+    return [Bill.status == 'pending', Bill.due_date < _day_start(today)]
+
+
+def reminder_criteria(reminder_days, today):
+    """需要发送还款提醒的账单：今天到 reminder_days 天后之间到期的待还账单
+
+    不只取恰好 reminder_days 天后到期的账单：错过了提醒当天的账单（如在提醒当天之后才生成）也会补发，
+    已经提醒过的由提醒台账排除。
+    """
+    start = _day_start(today)
+    return [Bill.status == 'pending', Bill.due_date >= start,
+            Bill.due_date < start + timedelta(days=reminder_days + 1)]
+
+
+def mark_overdue_bills(session, today=None, now=None, id_range=None):
+    """把还款日早于 today 的待还账单标记为逾期，并为每张账单生成一条逾期通知，返回处理的账单数
+
+    先用 INSERT ... SELECT 按同样的条件生成通知，再用一条 UPDATE 修改状态，两条语句在同一个事务中。
+    id_range 为 (after_id, last_id) 时只处理该主键区间内的账单。
+    """
+    now = now or datetime.utcnow()
+    condition = and_(*overdue_criteria(today or now.date()), *_id_range(id_range))
+
+    notifications = select(
+        LoanApplication.user_id,
+        literal(OVERDUE_TITLE),
+        overdue_content(Bill.amount),
+        literal('overdue_reminder'),
+        literal(False),
+        literal(now),
+    ).select_from(Bill).join(LoanApplication, LoanApplication.id == Bill.loan_id).where(condition)
+    session.execute(insert(Notification).from_select(NOTIFICATION_COLUMNS, notifications))
+
+    result = session.execute(
+        update(Bill).where(condition).values(status='overdue', updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def send_upcoming_reminders(session, reminder_days, today=None, now=None, id_range=None):
+    """为今天到 reminder_days 天后之间到期、还没有提醒过的待还账单发送还款提醒，返回新生成的通知数
+
+    是否已经提醒过由提醒台账 reminder_ledger 判断：台账在 (bill_id, reminder_kind, due_date) 上有唯一索引，
+    先用 NOT EXISTS 对整批账单做一次反连接，只为台账中没有的账单生成通知，
+    再用 INSERT OR IGNORE 把这些账单记入台账，两条语句在同一个事务中。
+    id_range 为 (after_id, last_id) 时只处理该主键区间内的账单。
+    """
+    now = now or datetime.utcnow()
+    window = and_(*reminder_criteria(reminder_days, today or now.date()), *_id_range(id_range))
+    already_sent = exists().where(and_(
+        ReminderLedger.bill_id == Bill.id,
+        ReminderLedger.reminder_kind == REMINDER_KIND,
+        ReminderLedger.due_date == Bill.due_date
+    ))
+
+    notifications = select(
+        LoanApplication.user_id,
+        literal(REMINDER_TITLE),
+        reminder_content(Bill.due_date, Bill.amount),
+        literal(REMINDER_KIND),
+        literal(False),
+        literal(now),
+    ).select_from(Bill).join(LoanApplication, LoanApplication.id == Bill.loan_id).where(window, ~already_sent)
+    result = session.execute(insert(Notification).from_select(NOTIFICATION_COLUMNS, notifications))
+
+    ledger_rows = select(Bill.id, literal(REMINDER_KIND), Bill.due_date, literal(now)).where(window)
+    session.execute(
+        insert(ReminderLedger).prefix_with('OR IGNORE')
+        .from_select(['bill_id', 'reminder_kind', 'due_date', 'created_at'], ledger_rows)
+    )
+    return result.rowcount
+
+
+def backfill_reminder_ledger(session, today=None, now=None):
+    """把提醒台账上线前已经发送过的还款提醒补记到台账，返回补记的账单数；台账已有记录时不做任何事
+
+    台账上线前按“同一用户已有相同内容的通知”判断是否提醒过。台账为空时按同样的规则，
+    为今天及以后到期、已有相同内容 repayment_reminder 通知的待还账单补记台账，
+    避免上线后第一次运行时为这些账单重复发送提醒。不提交事务，由调用方提交。
+    """
+    if session.execute(select(ReminderLedger.id).limit(1)).first() is not None:
+        return 0
+    now = now or datetime.utcnow()
+    already_sent = exists().where(and_(
+        Notification.user_id == LoanApplication.user_id,
+        Notification.type == REMINDER_KIND,
+        Notification.content == reminder_content(Bill.due_date, Bill.amount)
+    ))
+    ledger_rows = select(Bill.id, literal(REMINDER_KIND), Bill.due_date, literal(now)).select_from(Bill).join(
+        LoanApplication, LoanApplication.id == Bill.loan_id
+    ).where(Bill.status == 'pending', Bill.due_date >= _day_start(today or now.date()), already_sent)
+    result = session.execute(
+        insert(ReminderLedger).prefix_with('OR IGNORE')
+        .from_select(['bill_id', 'reminder_kind', 'due_date', 'created_at'], ledger_rows)
+    )
+    return result.rowcount
+
+
+def run_overdue_job(chunk_size=DEFAULT_CHUNK_SIZE, pause_seconds=DEFAULT_PAUSE_SECONDS,
+                    checkpoint_path=OVERDUE_CHECKPOINT_PATH, today=None):
+    """按主键分段标记逾期账单，每段单独提交，返回最终游标（processed 为处理的账单数）"""
+    now = datetime.utcnow()
+    today = today or now.date()
+    return run_keyset_job(
+        'overdue_bills', Bill.id, overdue_criteria(today),
+        lambda after_id, last_id: mark_overdue_bills(db.session, today, now, (after_id, last_id)),
+        checkpoint_path, params={'today': today.isoformat()},
+        chunk_size=chunk_size, pause_seconds=pause_seconds
+    )
+
+
+def run_reminder_job(reminder_days, chunk_size=DEFAULT_CHUNK_SIZE, pause_seconds=DEFAULT_PAUSE_SECONDS,
+                     checkpoint_path=REMINDER_CHECKPOINT_PATH, today=None):
+    """按主键分段发送还款提醒，每段单独提交，返回最终游标（processed 为新生成的通知数）"""
+    now = datetime.utcnow()
+    today = today or now.date()
+    return run_keyset_job(
+        'upcoming_reminders', Bill.id, reminder_criteria(reminder_days, today),
+        lambda after_id, last_id: send_upcoming_reminders(db.session, reminder_days, today, now,
+                                                          (after_id, last_id)),
+        checkpoint_path, params={'today': today.isoformat(), 'reminder_days': reminder_days},
+        chunk_size=chunk_size, pause_seconds=pause_seconds
+    )
@@ -0,0 +1,228 @@
+"""按还款日驱动的账单任务调度
+
+账单状态只在日期边界上变化：还款日前 reminder_days 天进入提醒窗口，还款日次日起逾期。
+DueDateScheduler 维护一个按时间排序的最小堆，保存所有待还账单的还款日对应的提醒和逾期时刻（按还款日去重，
+每个月 1 号只有两个时刻），只在堆顶时刻到达时唤醒一次，调用提醒或逾期任务。
+账单生成和还款时更新各还款日的待还账单数；待还数已经为 0 的时刻在出堆时跳过。
+其他进程（不是定时任务 leader 的 worker）生成的账单由 leader 定期检查账单表的最大主键发现，
+每次只是一条主键索引上的查询，有新账单时才按还款日统计新增的部分。
+每天定时做一次全量对账：运行两个任务并从数据库重新加载堆，兜底处理进程外的还款和错过的时刻。
+"""
+import heapq
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from models import db, Bill
+
+REMINDER = 'reminder'
+OVERDUE = 'overdue'
+
+DEFAULT_REMINDER_DAYS = 3
+DEFAULT_RECONCILE_HOUR = 0
+DEFAULT_RECONCILE_MINUTE = 5
+DEFAULT_NEW_BILLS_CHECK_SECONDS = 60
+
+BOUNDARY_JOB_ID = 'bill_due_date_boundary'
+RECONCILE_JOB_ID = 'bill_daily_reconcile'
+NEW_BILLS_JOB_ID = 'bill_new_bills_check'
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _midnight(day):
+    """某天 0 点（UTC，与账单任务中 datetime.utcnow() 的日期一致）"""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+class DueDateScheduler:
+    """在还款日边界上触发账单提醒和逾期任务
+
+    remind 和 mark_overdue 为无参数的任务函数（即 check_upcoming_bills 和 update_overdue_bills），
+    它们自己按当前日期查询需要处理的账单，这里只决定什么时候调用。
+    """
+
+    def __init__(self, scheduler, app, remind, mark_overdue, reminder_days=DEFAULT_REMINDER_DAYS,
+                 reconcile_hour=DEFAULT_RECONCILE_HOUR, reconcile_minute=DEFAULT_RECONCILE_MINUTE,
+                 new_bills_check_seconds=DEFAULT_NEW_BILLS_CHECK_SECONDS):
+        self.scheduler = scheduler
+        self.app = app
+        self.remind = remind
+        self.mark_overdue = mark_overdue
+        self.reminder_days = reminder_days
+        self.reconcile_hour = reconcile_hour
+        self.reconcile_minute = reconcile_minute
+        self.new_bills_check_seconds = new_bills_check_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._heap = []  # (触发时刻, 类型, 还款日)
+        self._scheduled = set()  # 堆中已有的 (类型, 还款日)
+        self._pending = {}  # 还款日 -> 待还账单数
+        self._armed_at = None
+        self._last_bill_id = 0  # 已经计入堆的最大账单 id
+
+        # 统计信息
+        self.wakeups = 0
+        self.stale_skips = 0
+        self.reconciliations = 0
+        self.last_reconcile_at = None
+
+    def start(self):
+        """注册每日对账和新账单检查任务，对账立即执行一次（处理停机期间错过的时刻并加载堆）"""
+        self.scheduler.add_job(
+            self.reconcile, 'cron', hour=self.reconcile_hour, minute=self.reconcile_minute, timezone=timezone.utc,
+            id=RECONCILE_JOB_ID, replace_existing=True, coalesce=True, misfire_grace_time=None,
+            next_run_time=datetime.now(timezone.utc)
+        )
+        self.scheduler.add_job(
+            self.check_new_bills, 'interval', seconds=self.new_bills_check_seconds,
+            id=NEW_BILLS_JOB_ID, replace_existing=True, coalesce=True
+        )
+
+    def reconcile(self):
+        """全量对账：运行提醒和逾期任务，再从数据库重新加载各还款日的待还账单数"""
+        self.remind()
+        self.mark_overdue()
+        with self.app.app_context():
+            last_bill_id = db.session.query(func.max(Bill.id)).scalar() or 0
+            rows = db.session.query(Bill.due_date, func.count(Bill.id)).filter(
+                Bill.status == 'pending', Bill.id <= last_bill_id
+            ).group_by(Bill.due_date).all()
+            db.session.remove()
+        pending = {}
+        for due_date, count in rows:
+            day = _as_date(due_date)
+            pending[day] = pending.get(day, 0) + count
+        with self._lock:
+            self._pending = pending
+            self._last_bill_id = last_bill_id
+            self._heap = []
+            self._scheduled = set()
+            for day in pending:
+                self._push(day)
+            self.reconciliations += 1
+            self.last_reconcile_at = datetime.now(timezone.utc)
+        self._arm()
+        self.logger.info("账单对账完成：%d 个还款日，%d 个待触发时刻", len(pending), len(self._heap))
+
+    def check_new_bills(self):
+        """把上次检查之后（可能由其他进程）生成的待还账单加入堆"""
+        with self.app.app_context():
+            last_bill_id = db.session.query(func.max(Bill.id)).scalar() or 0
+            if last_bill_id <= self._last_bill_id:
+                db.session.remove()
+                return
+            rows = db.session.query(Bill.due_date, func.count(Bill.id)).filter(
+                Bill.status == 'pending', Bill.id > self._last_bill_id, Bill.id <= last_bill_id
+            ).group_by(Bill.due_date).all()
+            db.session.remove()
+        with self._lock:
+            for due_date, count in rows:
+                day = _as_date(due_date)
+                self._pending[day] = self._pending.get(day, 0) + count
+                self._push(day)
+            self._last_bill_id = max(self._last_bill_id, last_bill_id)
+        self._arm()
+
+    def bills_created(self, due_dates):
+        """新生成账单后调用，due_dates 为每张账单的还款日
+
+        本进程是 leader 时立即加入堆；这些账单之后还会被 check_new_bills 再计入一次，
+        待还数偏大只会导致一次多余的唤醒，不会漏掉提醒。
+        """
+        counts = Counter(_as_date(due_date) for due_date in due_dates)
+        with self._lock:
+            for day, count in counts.items():
+                self._pending[day] = self._pending.get(day, 0) + count
+                self._push(day)
+        self._arm()
+
+    def bill_paid(self, due_date):
+        """账单还清后调用；该还款日没有待还账单时，对应的时刻出堆时直接跳过"""
+        day = _as_date(due_date)
+        with self._lock:
+            if self._pending.get(day, 0) > 0:
+                self._pending[day] -= 1
+
+    def _push(self, day):
+        now = datetime.now(timezone.utc)
+        reminder_start = _midnight(day - timedelta(days=self.reminder_days))
+        overdue_at = _midnight(day + timedelta(days=1))
+        # 提醒任务会补发提醒窗口内（直到还款日当天）还没有提醒过的账单，还款日过后不再入堆
+        boundaries = [(REMINDER, reminder_start, overdue_at),
+                      (OVERDUE, overdue_at, None)]
+        for kind, fire_at, window_end in boundaries:
+            if (kind, day) in self._scheduled or (window_end is not None and now >= window_end):
+                continue
+            heapq.heappush(self._heap, (max(fire_at, now), kind, day))
+            self._scheduled.add((kind, day))
+
+    def _arm(self):
+        """把唯一的定时任务设置到堆顶时刻"""
+        if not self.scheduler.running:
+            # 本进程不是定时任务 leader，新账单由 leader 的 check_new_bills 加载
+            return
+        with self._lock:
+            next_at = self._heap[0][0] if self._heap else None
+            if next_at == self._armed_at:
+                return
+            self._armed_at = next_at
+        if next_at is None:
+            if self.scheduler.get_job(BOUNDARY_JOB_ID):
+                self.scheduler.remove_job(BOUNDARY_JOB_ID)
+            return
+        self.scheduler.add_job(self._fire, 'date', run_date=next_at, id=BOUNDARY_JOB_ID,
+                               replace_existing=True, coalesce=True, misfire_grace_time=None)
+
+    def _fire(self):
+        """堆顶时刻到达：弹出所有已到期的时刻，每种任务最多运行一次"""
+        now = datetime.now(timezone.utc)
+        kinds = set()
+        overdue_days = []
+        with self._lock:
+            self._armed_at = None
+            while self._heap and self._heap[0][0] <= now:
+                _, kind, day = heapq.heappop(self._heap)
+                self._scheduled.discard((kind, day))
+                if self._pending.get(day, 0) <= 0:
+                    self.stale_skips += 1
+                    continue
+                kinds.add(kind)
+                if kind == OVERDUE:
+                    overdue_days.append(day)
+            self.wakeups += 1
+        try:
+            if REMINDER in kinds:
+                self.remind()
+            if OVERDUE in kinds:
+                self.mark_overdue()
+                with self._lock:
+                    # 这些还款日的待还账单已经全部变为逾期
+                    for day in overdue_days:
+                        self._pending.pop(day, None)
+        finally:
+            self._arm()
+
+    def stats(self):
+        with self._lock:
+            upcoming = [{'at': fire_at.isoformat(), 'kind': kind, 'due_date': day.isoformat(),
+                         'pending_bills': self._pending.get(day, 0)}
+                        for fire_at, kind, day in heapq.nsmallest(10, self._heap)]
+            return {
+                'due_dates': len(self._pending),
+                'pending_bills': sum(self._pending.values()),
+                'scheduled': len(self._heap),
+                'next_wakeup': upcoming[0]['at'] if upcoming else None,
+                'upcoming': upcoming,
+                'wakeups': self.wakeups,
+                'stale_skips': self.stale_skips,
+                'reconciliations': self.reconciliations,
+                'last_bill_id': self._last_bill_id,
+                'last_reconcile_at': self.last_reconcile_at.isoformat() if self.last_reconcile_at else None,
+            }
@@ -0,0 +1,237 @@
+"""按列存储的数据集格式
+
+一个数据集是一个目录：每列一个原始二进制文件（小端、定长类型），外加 manifest.json 描述行数、
+每列的类型和分类列的取值字典。分类列以 int8 编码存储，读取时可以按需解码。
+分片数据集是包含多个子数据集目录的目录，顶层 manifest.json 列出各分片。
+
+写入时逐块追加，内存占用只取决于块大小；读取时按偏移量只读取需要的列和行区间，
+也可以用 column() 以只读内存映射访问整列。
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = 'manifest.json'
+FORMAT_NAME = 'loan-columnar'
+FORMAT_VERSION = 1
+# 分类列 int8 编码的取值个数上限（编码 0..127，-1 表示缺失）
+MAX_CATEGORIES = np.iinfo(np.int8).max + 1
+
+
+class ColumnarError(Exception):
+    """数据集格式错误"""
+
+
+def category(values):
+    """分类列的类型说明：int8 编码 + 取值字典，取值超过 int8 能编码的个数时抛出 ColumnarError"""
+    categories = list(values)
+    if len(categories) > MAX_CATEGORIES:
+        raise ColumnarError(f"分类列的取值有 {len(categories)} 个，int8 编码最多支持 {MAX_CATEGORIES} 个")
+    return {'dtype': 'category', 'categories': categories}
+
+
+def _write_json(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ColumnarWriter:
+    """逐块写入按列存储的数据集
+
+    schema 为 {列名: numpy 类型字符串 或 category([...])}，按 schema 顺序保存列。
+    close() 时写入 manifest.json，没有 manifest 的目录视为未写完。
+    """
+
+    def __init__(self, path, schema, metadata=None):
+        self.path = path
+        self.schema = schema
+        self.metadata = metadata or {}
+        self.rows = 0
+        self.chunks = 0
+        os.makedirs(path, exist_ok=True)
+        # 覆盖旧数据前先删除 manifest，中途失败时目录不会被当作完整数据集
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        self._files = {name: open(os.path.join(path, f'{name}.bin'), 'wb') for name in schema}
+        self._encoders = {name: {value: code for code, value in enumerate(spec['categories'])}
+                          for name, spec in schema.items() if isinstance(spec, dict)}
+
+    def write(self, columns):
+        """追加一块数据，columns 为 {列名: 数组}，各列长度必须相同"""
+        lengths = {len(columns[name]) for name in self.schema}
+        if len(lengths) != 1:
+            raise ColumnarError(f"各列长度不一致: {lengths}")
+        for name, spec in self.schema.items():
+            values = columns[name]
+            if isinstance(spec, dict):
+                codes = self._encode(name, values)
+                codes.tofile(self._files[name])
+            else:
+                np.asarray(values).astype(spec, copy=False).tofile(self._files[name])
+        self.rows += lengths.pop()
+        self.chunks += 1
+
+    def _encode(self, name, values):
+        categories = self.schema[name]['categories']
+        codes = pd.Categorical(values, categories=categories).codes
+        if (codes < 0).any():
+            unknown = set(np.asarray(values)[codes < 0].tolist())
+            raise ColumnarError(f"列 {name} 含有未声明的取值: {sorted(map(str, unknown))[:5]}")
+        return codes.astype(np.int8)
+
+    def close(self):
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        columns = {}
+        for name, spec in self.schema.items():
+            if isinstance(spec, dict):
+                columns[name] = {'dtype': np.dtype(np.int8).str, 'categories': spec['categories']}
+            else:
+                columns[name] = {'dtype': np.dtype(spec).str}
+        _write_json(os.path.join(self.path, MANIFEST), {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'kind': 'table',
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'columns': columns,
+            'metadata': self.metadata,
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files.values():
+                f.close()
+
+
+def write_sharded_manifest(path, shards, metadata=None):
+    """为已写好的分片目录写入顶层 manifest"""
+    tables = [ColumnarTable(os.path.join(path, shard)) for shard in shards]
+    _write_json(os.path.join(path, MANIFEST), {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'kind': 'sharded',
+        'rows': sum(table.rows for table in tables),
+        'shards': list(shards),
+        'metadata': metadata or {},
+    })
+
+
+def read_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise ColumnarError(f"数据集不完整或不存在: {path}")
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME or manifest.get('version') != FORMAT_VERSION:
+        raise ColumnarError(f"不支持的数据集格式: {manifest.get('format')} v{manifest.get('version')}")
+    return manifest
+
+
+class ColumnarTable:
+    """单个按列存储的数据集（一个分片）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = read_manifest(path)
+        if self.manifest['kind'] != 'table':
+            raise ColumnarError(f"{path} 不是单表数据集")
+        self.rows = self.manifest['rows']
+        self.columns = list(self.manifest['columns'])
+        self._arrays = {}
+
+    def categories(self, name):
+        return self.manifest['columns'][name].get('categories')
+
+    def column(self, name):
+        """以只读内存映射返回一列的原始数组（分类列为 int8 编码）"""
+        array = self._arrays.get(name)
+        if array is None:
+            spec = self.manifest['columns'].get(name)
+            if spec is None:
+                raise KeyError(name)
+            if self.rows == 0:
+                array = np.empty(0, dtype=spec['dtype'])
+            else:
+                array = np.memmap(os.path.join(self.path, f'{name}.bin'), dtype=spec['dtype'],
+                                  mode='r', shape=(self.rows,))
+            self._arrays[name] = array
+        return array
+
+    def _read_range(self, name, start, count):
+        """直接按偏移量读取一列中的连续行，比建立内存映射再切片开销小"""
+        spec = self.manifest['columns'].get(name)
+        if spec is None:
+            raise KeyError(name)
+        dtype = np.dtype(spec['dtype'])
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.fromfile(os.path.join(self.path, f'{name}.bin'), dtype=dtype, count=count,
+                           offset=start * dtype.itemsize)
+
+    def read(self, columns=None, start=0, stop=None, decode=True):
+        """读取部分列、部分行，返回 DataFrame；decode 为 False 时分类列保留编码"""
+        names = columns or self.columns
+        start, stop, _ = slice(start, stop).indices(self.rows)
+        data = {}
+        for name in names:
+            values = self._read_range(name, start, max(stop - start, 0))
+            categories = self.categories(name)
+            if categories is not None and decode:
+                values = pd.Categorical.from_codes(values, categories=categories)
+            data[name] = values
+        return pd.DataFrame(data)
+
+    def iter_chunks(self, chunk_size, columns=None, decode=True):
+        """按固定行数分块读取"""
+        for start in range(0, self.rows, chunk_size):
+            yield self.read(columns, start, start + chunk_size, decode)
+
+
+class ColumnarDataset:
+    """按列存储的数据集，单表和分片数据集使用相同的接口"""
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = read_manifest(path)
+        if self.manifest['kind'] == 'sharded':
+            self.tables = [ColumnarTable(os.path.join(path, shard)) for shard in self.manifest['shards']]
+        else:
+            self.tables = [ColumnarTable(path)]
+        self.rows = sum(table.rows for table in self.tables)
+        self.columns = self.tables[0].columns if self.tables else []
+
+    def read(self, columns=None, start=0, stop=None, decode=True):
+        """读取全局行区间 [start, stop) 的部分列，跨分片时自动拼接"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        frames = []
+        offset = 0
+        for table in self.tables:
+            lo, hi = max(start - offset, 0), min(stop - offset, table.rows)
+            if lo < hi:
+                frames.append(table.read(columns, lo, hi, decode))
+            offset += table.rows
+        if not frames:
+            return pd.DataFrame({name: [] for name in (columns or self.columns)})
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_chunks(self, chunk_size, columns=None, decode=True):
+        """逐分片按固定行数分块读取，内存占用只取决于块大小"""
+        for table in self.tables:
+            yield from table.iter_chunks(chunk_size, columns, decode)
+
+
+def open_dataset(path):
+    return ColumnarDataset(path)
@@ -0,0 +1,163 @@
+"""训练特征矩阵缓存
+
+以源数据内容哈希和特征规格为键，把独热编码、标准化后的训练/测试矩阵、标签、样本权重和列顺序
+保存为 .npy 文件，之后的训练直接以内存映射方式打开，跳过预处理。源数据或特征规格变化时键随之变化，
+自动重新构建。
+
+缓存目录结构：
+    feature_cache/<key>/
+        X.npy y.npy w.npy                 # 训练集（标准化后的特征、标签、样本权重）
+        X_test.npy y_test.npy w_test.npy  # 测试集
+        scaler_mean.npy scaler_var.npy scaler_scale.npy
+        meta.json                         # 列顺序、特征规格、源数据哈希
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+FEATURE_CACHE_DIR = 'feature_cache'
+
+# 保留的缓存条目数，超出时删除最久未使用的
+MAX_ENTRIES = 5
+
+# 训练特征规格，任何一项变化都会使缓存失效
+FEATURE_SPEC = {
+    'version': 1,
+    'categorical_features': ['education', 'employment_status', 'marital_status',
+                             'home_ownership', 'loan_purpose', 'previous_default'],
+    'drop': ['risk_score', 'loan_approved'],
+    'target': 'loan_approved',
+    # 新贷款月供占收入比例高于阈值的样本权重加倍
+    'weight_rule': {'column': 'new_loan_payment_ratio', 'threshold': 0.5, 'factor': 2.0},
+    'test_size': 0.2,
+    'random_state': 42,
+}
+
+ARRAYS = ('X', 'y', 'w', 'X_test', 'y_test', 'w_test', 'scaler_mean', 'scaler_var', 'scaler_scale')
+
+
+class FeatureMatrix:
+    """缓存中的一份特征矩阵，数组均为只读内存映射"""
+
+    def __init__(self, path, cached):
+        self.path = path
+        self.cached = cached
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.feature_names = self.meta['feature_names']
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+        self.X_train, self.y_train, self.w_train = arrays['X'], arrays['y'], arrays['w']
+        self.X_test, self.y_test, self.w_test = arrays['X_test'], arrays['y_test'], arrays['w_test']
+        self._scaler_arrays = arrays
+        # 更新访问时间，用于淘汰最久未使用的条目
+        os.utime(path)
+
+    @property
+    def scaler(self):
+        """重建训练时拟合的 StandardScaler"""
+        scaler = StandardScaler()
+        scaler.mean_ = np.array(self._scaler_arrays['scaler_mean'])
+        scaler.var_ = np.array(self._scaler_arrays['scaler_var'])
+        scaler.scale_ = np.array(self._scaler_arrays['scaler_scale'])
+        scaler.n_features_in_ = len(self.feature_names)
+        scaler.feature_names_in_ = np.array(self.feature_names, dtype=object)
+        scaler.n_samples_seen_ = self.meta['n_train']
+        return scaler
+
+
+def data_hash(df):
+    """DataFrame 内容哈希（列名、类型和所有值）"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def cache_key(df, spec=FEATURE_SPEC):
+    source = data_hash(df)
+    spec_hash = hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+    return hashlib.sha256(f'{source}:{spec_hash}'.encode('utf-8')).hexdigest()[:24], source
+
+
+def build_arrays(df, spec=FEATURE_SPEC):
+    """执行预处理：独热编码、划分训练/测试集、计算样本权重、拟合标准化器"""
+    X = pd.get_dummies(df.drop(spec['drop'], axis=1), columns=spec['categorical_features'])
+    y = df[spec['target']]
+
+    rule = spec['weight_rule']
+    sample_weights = np.ones(len(y))
+    sample_weights[df[rule['column']] > rule['threshold']] *= rule['factor']
+
+    X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+        X, y, sample_weights, test_size=spec['test_size'], random_state=spec['random_state'])
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    arrays = {
+        'X': np.ascontiguousarray(X_train_scaled, dtype=np.float64),
+        'y': np.asarray(y_train, dtype=np.int64),
+        'w': np.asarray(w_train, dtype=np.float64),
+        'X_test': np.ascontiguousarray(X_test_scaled, dtype=np.float64),
+        'y_test': np.asarray(y_test, dtype=np.int64),
+        'w_test': np.asarray(w_test, dtype=np.float64),
+        'scaler_mean': scaler.mean_,
+        'scaler_var': scaler.var_,
+        'scaler_scale': scaler.scale_,
+    }
+    return arrays, X.columns.tolist()
+
+
+def load_feature_matrix(df, spec=FEATURE_SPEC, cache_dir=FEATURE_CACHE_DIR):
+    """返回 df 对应的特征矩阵，缓存命中时直接映射，否则预处理后写入缓存"""
+    key, source = cache_key(df, spec)
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return FeatureMatrix(path, cached=True)
+
+    start = time.perf_counter()
+    arrays, feature_names = build_arrays(df, spec)
+
+    # 先写入临时目录再重命名，并发构建或中途失败都不会留下不完整的条目
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    os.makedirs(tmp_path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'key': key,
+            'source_hash': source,
+            'spec': spec,
+            'feature_names': feature_names,
+            'n_train': len(arrays['y']),
+            'n_test': len(arrays['y_test']),
+            'build_seconds': time.perf_counter() - start,
+            'created_at': datetime.utcnow().isoformat(),
+        }, f, ensure_ascii=False, indent=2)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # 其他进程已经写入同一个键
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    _evict(cache_dir)
+    return FeatureMatrix(path, cached=False)
+
+
+def _evict(cache_dir, max_entries=MAX_ENTRIES):
+    """删除超出数量上限的最久未使用条目"""
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+               if os.path.exists(os.path.join(cache_dir, name, 'meta.json'))]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[max_entries:]:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,139 @@
+"""衍生特征的唯一实现
+
+训练数据生成（mock_data / synthetic_data）、在线评分和批量重评分（FeatureLayout）都调用这里的函数，
+输入为列数组，整批一次计算，避免两套实现出现差异。
+"""
+import bisect
+import math
+
+import numpy as np
+
+# 新贷款月供收入比的分箱上界（含），超过最后一个上界归入最后一箱
+PAYMENT_RATIO_BINS = np.array([0.1, 0.5, 1, 2, 5, 10], dtype=np.float64)
+PAYMENT_RATIO_BINS_LIST = PAYMENT_RATIO_BINS.tolist()
+
+# 衍生特征名称
+DERIVED_FEATURES = ['debt_to_income', 'new_loan_payment_ratio',
+                    'new_loan_payment_ratio_binned', 'ratio_times_debt']
+
+# 计算衍生特征所需的输入字段及缺失时的默认值
+DERIVED_INPUTS = {
+    'monthly_income': 1,
+    'monthly_payment': 0,
+    'loan_amount': 0,
+    'loan_term': 1,
+}
+
+# 防止月收入为 0 时除零
+INCOME_EPSILON = 1e-6
+
+
+def bin_payment_ratio(ratio):
+    """对月供收入比分箱：ratio <= 上界 i 时归入第 i 箱，超过所有上界（含 nan）归入最后一箱"""
+    return np.searchsorted(PAYMENT_RATIO_BINS, ratio, side='left')
+
+
+def derived_features(monthly_income, monthly_payment, loan_amount, loan_term):
+    """由输入列计算全部衍生特征，返回 {特征名: float64 数组}
+
+    输入无效（缺失值、非数值、贷款期限为 0 等）导致结果不是有限值的行，对应衍生特征为 0。
+    """
+    income = np.asarray(monthly_income, dtype=np.float64) + INCOME_EPSILON
+    payment = np.asarray(monthly_payment, dtype=np.float64)
+    amount = np.asarray(loan_amount, dtype=np.float64)
+    term = np.asarray(loan_term, dtype=np.float64)
+    if income.all() and term.all():
+        # 常见情况：没有除数为 0 的行，省去 errstate 的开销（单条数据时占比不小）
+        debt = payment / income
+        ratio = amount / term / income
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            debt = payment / income
+            ratio = amount / term / income
+    ratio_times_debt = ratio * debt
+    binned = bin_payment_ratio(ratio).astype(np.float64)
+
+    if not np.isfinite(ratio_times_debt).all():
+        debt_valid = np.isfinite(debt)
+        ratio_valid = np.isfinite(ratio)
+        debt = np.where(debt_valid, debt, 0.0)
+        ratio = np.where(ratio_valid, ratio, 0.0)
+        binned = np.where(ratio_valid, binned, 0.0)
+        ratio_times_debt = np.where(debt_valid & ratio_valid, ratio_times_debt, 0.0)
+    return {
+        'debt_to_income': debt,
+        'new_loan_payment_ratio': ratio,
+        'new_loan_payment_ratio_binned': binned,
+        'ratio_times_debt': ratio_times_debt,
+    }
+
+
+def derived_features_one(monthly_income, monthly_payment, loan_amount, loan_term):
+    """单条数据的衍生特征，返回 {特征名: float}，结果与 derived_features 对同样输入的计算相同
+
+    在线评分每次只有一条数据，用 Python 浮点数计算可以省去 numpy 每次调用的固定开销。
+    除数为 0 时交给 derived_features 处理（numpy 的除零语义）。
+    """
+    income = monthly_income + INCOME_EPSILON
+    if income == 0 or loan_term == 0:
+        return {name: float(values[0]) for name, values in
+                derived_features([monthly_income], [monthly_payment], [loan_amount], [loan_term]).items()}
+    debt = monthly_payment / income
+    ratio = loan_amount / loan_term / income
+    ratio_times_debt = ratio * debt
+    if math.isfinite(ratio_times_debt):
+        binned = float(bisect.bisect_left(PAYMENT_RATIO_BINS_LIST, ratio))
+    else:
+        debt_valid = math.isfinite(debt)
+        ratio_valid = math.isfinite(ratio)
+        binned = float(bisect.bisect_left(PAYMENT_RATIO_BINS_LIST, ratio)) if ratio_valid else 0.0
+        ratio_times_debt = ratio_times_debt if debt_valid and ratio_valid else 0.0
+        debt = debt if debt_valid else 0.0
+        ratio = ratio if ratio_valid else 0.0
+    return {
+        'debt_to_income': debt,
+        'new_loan_payment_ratio': ratio,
+        'new_loan_payment_ratio_binned': binned,
+        'ratio_times_debt': ratio_times_debt,
+    }
+
+
+def _to_float(value, invalid):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return invalid
+    return value if math.isfinite(value) else invalid
+
+
+def numeric_columns(records, fields, invalid=0.0):
+    """从多条输入数据中取出多个数值字段，返回 (n, len(fields)) 的 float64 矩阵
+
+    fields 为 [(字段名, 缺失时的默认值)]；值为空、无法转换或不是有限值时取 invalid。
+    """
+    rows = [[data.get(field, default) for field, default in fields] for data in records]
+    try:
+        # 常见情况：所有值都是有限数值，一次转换（None 会被转换为 nan，交给下面逐个处理）
+        values = np.array(rows, dtype=np.float64).reshape(len(records), len(fields))
+        if np.isfinite(values).all():
+            return values
+    except (TypeError, ValueError):
+        pass
+    return np.array([[_to_float(value, invalid) for value in row] for row in rows],
+                    dtype=np.float64).reshape(len(records), len(fields))
+
+
+def numeric_row(data, fields, invalid=0.0):
+    """从一条输入数据中取出多个数值字段，返回 float 列表，取值规则与 numeric_columns 相同"""
+    return [_to_float(data.get(field, default), invalid) for field, default in fields]
+
+
+def derived_features_from_records(records):
+    """从多条输入数据计算衍生特征"""
+    values = numeric_columns(records, list(DERIVED_INPUTS.items()), invalid=np.nan)
+    return derived_features(*values.T)
+
+
+def derived_features_from_record(data):
+    """从一条输入数据计算衍生特征，返回 {特征名: float}"""
+    return derived_features_one(*numeric_row(data, list(DERIVED_INPUTS.items()), invalid=math.nan))
@@ -0,0 +1,116 @@
+import logging
+
+import numpy as np
+
+from feature_engineering import (DERIVED_FEATURES, derived_features_from_record, derived_features_from_records,
+                                 numeric_columns, numeric_row)
+
+# 直接取自输入数据的数值特征
+RAW_NUMERIC_FEATURES = [
+    'age', 'employment_years', 'annual_income', 'monthly_income',
+    'savings_balance', 'total_assets', 'total_liabilities',
+    'credit_cards', 'existing_loans', 'monthly_payment',
+    'loan_amount', 'loan_term', 'dependents', 'credit_score',
+    'new_loan_monthly_payment'
+]
+
+# 分类特征及其可能值
+CATEGORICAL_FEATURES = {
+    'marital_status': ['single', 'married', 'divorced', 'widowed'],
+    'education': ['high_school', 'college', 'bachelor', 'master', 'phd'],
+    'employment_status': ['employed', 'self_employed', 'unemployed', 'retired'],
+    'home_ownership': ['own', 'rent', 'mortgage', 'other'],
+    'loan_purpose': ['business', 'education', 'home', 'car', 'debt_consolidation', 'other'],
+    'previous_default': ['yes', 'no']
+}
+
+# 布局能够构建的全部特征名称
+KNOWN_FEATURES = set(RAW_NUMERIC_FEATURES) | set(DERIVED_FEATURES) | {
+    f"{field}_{v}" for field, values in CATEGORICAL_FEATURES.items() for v in values
+}
+
+
+class FeatureLayout:
+    """按模型特征顺序预编译的特征槽位布局
+
+    在加载模型时根据 feature_names_in_ 构建一次，之后按列填充预分配的 float64 矩阵：
+    数值字段整列写入对应槽位，衍生特征由 feature_engineering 对整批一次计算，
+    分类特征按下标写入独热槽位，不再逐个构建字典或 DataFrame。
+    """
+
+    def __init__(self, feature_names):
+        self.logger = logging.getLogger(__name__)
+        self.feature_names = list(feature_names)
+        self.width = len(self.feature_names)
+        self.slots = {name: i for i, name in enumerate(self.feature_names)}
+
+        # 数值字段 -> 槽位
+        self.numeric_slots = [(field, self.slots[field])
+                              for field in RAW_NUMERIC_FEATURES if field in self.slots]
+        self._numeric_fields = [(field, None) for field, _ in self.numeric_slots]
+        self._numeric_index = np.array([slot for _, slot in self.numeric_slots], dtype=np.intp)
+
+        # 模型需要的衍生特征 -> 槽位
+        self.derived_slots = [(name, self.slots[name]) for name in DERIVED_FEATURES if name in self.slots]
+
+        # 分类字段 -> {取值: 独热槽位}
+        self.categorical_slots = []
+        for field, values in CATEGORICAL_FEATURES.items():
+            value_slots = {v: self.slots[f"{field}_{v}"] for v in values if f"{field}_{v}" in self.slots}
+            if value_slots:
+                self.categorical_slots.append((field, value_slots))
+
+        for name in self.feature_names:
+            if name not in KNOWN_FEATURES:
+                self.logger.warning(f"特征 {name} 无法从输入数据构建，将固定为 0")
+
+    def index(self, name):
+        """获取特征所在列，特征不存在时抛出 KeyError"""
+        return self.slots[name]
+
+    def transform(self, records):
+        """把多条输入数据构建为 (n, width) 的特征矩阵
+
+        数值字段缺失或无法转换时为 0；衍生特征的计算见 feature_engineering.derived_features。
+        """
+        X = np.zeros((len(records), self.width), dtype=np.float64)
+        if not records:
+            return X
+        if self.numeric_slots:
+            X[:, self._numeric_index] = numeric_columns(records, self._numeric_fields)
+
+        if self.derived_slots:
+            derived = derived_features_from_records(records)
+            for name, slot in self.derived_slots:
+                X[:, slot] = derived[name]
+
+        # 独热编码：只写入命中的槽位
+        hit_rows, hit_slots = [], []
+        for i, data in enumerate(records):
+            for field, value_slots in self.categorical_slots:
+                slot = value_slots.get(str(data.get(field, 'unknown')).lower())
+                if slot is not None:
+                    hit_rows.append(i)
+                    hit_slots.append(slot)
+        X[hit_rows, hit_slots] = 1.0
+        return X
+
+    def transform_one(self, data):
+        """把单条输入数据构建为 (1, width) 的特征矩阵，结果与 transform([data]) 相同
+
+        单条数据逐个槽位写入 Python 列表，最后转换一次，不经过按列构建的 numpy 调用。
+        """
+        row = [0.0] * self.width
+        for (_, slot), value in zip(self.numeric_slots, numeric_row(data, self._numeric_fields)):
+            row[slot] = value
+
+        if self.derived_slots:
+            derived = derived_features_from_record(data)
+            for name, slot in self.derived_slots:
+                row[slot] = derived[name]
+
+        for field, value_slots in self.categorical_slots:
+            slot = value_slots.get(str(data.get(field, 'unknown')).lower())
+            if slot is not None:
+                row[slot] = 1.0
+        return np.array([row], dtype=np.float64)
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+class LinearEngine:
+    """二分类线性模型（逻辑回归形式）的推理引擎
+
+    只保存系数和截距，predict_proba 与 SGDClassifier(loss='log_loss') / LogisticRegression
+    的二分类结果一致，加载时无需导入 sklearn。
+    """
+
+    def __init__(self, coef, intercept, classes, feature_names=None):
+        self.coef = np.ascontiguousarray(np.ravel(coef), dtype=np.float64)
+        self.intercept = np.ascontiguousarray(np.ravel(intercept), dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """从训练好的二分类线性模型导出系数"""
+        if model.coef_.shape[0] != 1:
+            raise ValueError("只支持二分类线性模型")
+        return cls(
+            coef=model.coef_[0],
+            intercept=model.intercept_,
+            classes=model.classes_,
+            feature_names=getattr(model, 'feature_names_in_', None)
+        )
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept[0]
+
+    def predict_proba(self, X):
+        # 1 / (1 + exp(-z)) 的数值稳定形式，z 绝对值很大时不会溢出
+        positive = np.exp(-np.logaddexp(0.0, -self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
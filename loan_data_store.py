@@ -0,0 +1,182 @@
+"""loan_data.csv 的按列存储版本
+
+用法：
+    python loan_data_store.py convert [--csv loan_data.csv] [--output loan_data.columnar]
+    python loan_data_store.py benchmark [--output loan_data_benchmark.json]
+
+转换分两遍按块读取 CSV（内存占用只取决于块大小）：第一遍统计每列的取值范围和分类取值，
+第二遍按推断出的类型写入 columnar_store 格式。字符串列字典编码为 int8，整数列（以及只含整数值的
+浮点列，如 new_loan_payment_ratio_binned）使用能容纳取值范围的最小整数类型，其余浮点列保持 float64。
+
+load_loan_data 优先读取按列存储的版本（不比 CSV 旧时），只读取需要的列和行；否则回退到解析 CSV。
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import ColumnarWriter, ColumnarError, category, open_dataset
+
+CSV_PATH = 'loan_data.csv'
+COLUMNAR_PATH = 'loan_data.columnar'
+CSV_CHUNK_SIZE = 100000
+
+INT_DTYPES = ['int8', 'int16', 'int32', 'int64']
+
+
+def infer_schema(csv_path=CSV_PATH, chunk_size=CSV_CHUNK_SIZE):
+    """第一遍扫描：按块统计各列类型，返回 columnar_store 的 schema"""
+    stats = {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        for name, values in chunk.items():
+            info = stats.setdefault(name, {'kind': None, 'min': None, 'max': None, 'integral': True,
+                                           'categories': set(), 'nulls': False})
+            info['nulls'] = info['nulls'] or bool(values.isna().any())
+            if values.dtype == object:
+                info['kind'] = 'category'
+                info['categories'].update(values.dropna().unique().tolist())
+                continue
+            info['kind'] = info['kind'] or 'number'
+            array = values.to_numpy(dtype=np.float64)
+            low, high = np.nanmin(array), np.nanmax(array)
+            info['min'] = low if info['min'] is None else min(info['min'], low)
+            info['max'] = high if info['max'] is None else max(info['max'], high)
+            if values.dtype.kind == 'f':
+                info['integral'] = info['integral'] and bool(np.all(np.mod(array[~np.isnan(array)], 1) == 0))
+
+    schema = {}
+    for name, info in stats.items():
+        if info['kind'] == 'category':
+            schema[name] = category(sorted(info['categories']))
+        elif info['integral'] and not info['nulls']:
+            schema[name] = next(dtype for dtype in INT_DTYPES
+                                if np.iinfo(dtype).min <= info['min'] and info['max'] <= np.iinfo(dtype).max)
+        else:
+            schema[name] = 'float64'
+    return schema
+
+
+def convert_csv(csv_path=CSV_PATH, output=COLUMNAR_PATH, chunk_size=CSV_CHUNK_SIZE):
+    """把 CSV 转换为按列存储的数据集，返回行数"""
+    schema = infer_schema(csv_path, chunk_size)
+    metadata = {'source': os.path.abspath(csv_path), 'source_mtime': os.path.getmtime(csv_path)}
+    with ColumnarWriter(output, schema, metadata=metadata) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            writer.write({name: chunk[name].to_numpy() for name in schema})
+    return writer.rows
+
+
+def columnar_is_fresh(csv_path=CSV_PATH, columnar_path=COLUMNAR_PATH):
+    """按列存储的版本存在且不比 CSV 旧"""
+    try:
+        dataset = open_dataset(columnar_path)
+    except ColumnarError:
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return dataset.manifest['metadata'].get('source_mtime', 0) >= os.path.getmtime(csv_path)
+
+
+def load_loan_data(columns=None, start=0, stop=None, csv_path=CSV_PATH, columnar_path=COLUMNAR_PATH):
+    """读取贷款数据的部分列和行区间 [start, stop)
+
+    优先从按列存储的版本读取（只映射需要的列和行）；不存在或已过期时解析 CSV。
+    分类列以 pandas Categorical 返回，其取值与 CSV 中的字符串相同；
+    解析 CSV 时取值字典只包含读到的行中出现的取值。
+    """
+    if columnar_is_fresh(csv_path, columnar_path):
+        return open_dataset(columnar_path).read(columns, start, stop)
+    nrows = None if stop is None else stop - start
+    skiprows = range(1, start + 1) if start else None
+    df = pd.read_csv(csv_path, usecols=columns, skiprows=skiprows, nrows=nrows)
+    if columns:
+        # usecols 按文件中的顺序返回列，调整为与按列存储的读取结果相同的顺序
+        df = df[list(columns)]
+    for name in df.columns[df.dtypes == object]:
+        df[name] = df[name].astype('category')
+    return df
+
+
+def _measure(func):
+    """返回 (耗时秒, 峰值 Python 分配字节, 结果 DataFrame 内存字节)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, int(df.memory_usage(deep=True).sum())
+
+
+def benchmark(csv_path=CSV_PATH, columnar_path=COLUMNAR_PATH, repeat=5):
+    """比较 CSV 与按列存储在全量、部分列和部分行读取时的耗时与内存"""
+    dataset = open_dataset(columnar_path)
+    rows = dataset.rows
+    some_columns = ['annual_income', 'loan_amount', 'education', 'loan_approved']
+    mid = rows // 2
+    cases = {
+        'full': (lambda: pd.read_csv(csv_path),
+                 lambda: open_dataset(columnar_path).read()),
+        'columns': (lambda: pd.read_csv(csv_path, usecols=some_columns),
+                    lambda: open_dataset(columnar_path).read(some_columns)),
+        'row_range': (lambda: pd.read_csv(csv_path, skiprows=range(1, mid + 1), nrows=1000),
+                      lambda: open_dataset(columnar_path).read(None, mid, mid + 1000)),
+    }
+    report = {
+        'rows': rows,
+        'csv_bytes': os.path.getsize(csv_path),
+        'columnar_bytes': sum(os.path.getsize(os.path.join(columnar_path, name))
+                              for name in os.listdir(columnar_path)),
+        'cases': {}
+    }
+    for case, (csv_loader, columnar_loader) in cases.items():
+        report['cases'][case] = {}
+        for fmt, loader in (('csv', csv_loader), ('columnar', columnar_loader)):
+            runs = [_measure(loader) for _ in range(repeat)]
+            report['cases'][case][fmt] = {
+                'seconds': float(np.median([r[0] for r in runs])),
+                'peak_alloc_bytes': int(np.median([r[1] for r in runs])),
+                'frame_bytes': runs[0][2],
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='loan_data.csv 的按列存储')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help='把 CSV 转换为按列存储')
+    convert.add_argument('--csv', default=CSV_PATH)
+    convert.add_argument('--output', default=COLUMNAR_PATH)
+    convert.add_argument('--chunk-size', type=int, default=CSV_CHUNK_SIZE)
+    bench = subparsers.add_parser('benchmark', help='比较 CSV 与按列存储的读取耗时和内存')
+    bench.add_argument('--csv', default=CSV_PATH)
+    bench.add_argument('--columnar', default=COLUMNAR_PATH)
+    bench.add_argument('--repeat', type=int, default=5)
+    bench.add_argument('--output', default='loan_data_benchmark.json')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        rows = convert_csv(args.csv, args.output, args.chunk_size)
+        print(f"已转换 {rows} 行到 {args.output}")
+    else:
+        if not columnar_is_fresh(args.csv, args.columnar):
+            convert_csv(args.csv, args.columnar)
+        report = benchmark(args.csv, args.columnar, args.repeat)
+        print(f"{report['rows']} 行，CSV {report['csv_bytes'] / 1024:.0f}KB，"
+              f"按列存储 {report['columnar_bytes'] / 1024:.0f}KB")
+        for case, formats in report['cases'].items():
+            for fmt, result in formats.items():
+                print(f"{case:>10} {fmt:>9}: {result['seconds'] * 1000:8.2f}ms，"
+                      f"峰值分配 {result['peak_alloc_bytes'] / 1024:8.0f}KB，"
+                      f"DataFrame {result['frame_bytes'] / 1024:8.0f}KB")
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""贷款定价：利率分档表和报价网格
+
+利率 = 基础利率 + 金额分档加点 + 期限分档加点，并限制在 [MIN_RATE, MAX_RATE] 内。
+分档表同时用于单笔报价（calculate_credit_score）和报价网格，两者结果一致。
+"""
+import numpy as np
+
+from amortization import amortize, annuity_factor
+
+BASE_RATE = 0.05
+
+# 分档上界（含）及各档加点，超过最后一个上界归入最后一档
+AMOUNT_TIER_BOUNDS = np.array([50000, 100000, 200000], dtype=np.float64)
+AMOUNT_TIER_ADDONS = np.array([0.0, 0.01, 0.02, 0.03])
+TERM_TIER_BOUNDS = np.array([12, 24, 36], dtype=np.float64)
+TERM_TIER_ADDONS = np.array([0.0, 0.01, 0.02, 0.03])
+
+MIN_RATE = 0.05
+MAX_RATE = 0.15
+
+# 报价网格最多包含的 (金额, 期限) 组合数
+MAX_GRID_CELLS = 10000
+
+
+def amount_tier(loan_amount):
+    return np.searchsorted(AMOUNT_TIER_BOUNDS, loan_amount, side='left')
+
+
+def term_tier(loan_term):
+    return np.searchsorted(TERM_TIER_BOUNDS, loan_term, side='left')
+
+
+def _rate(amount_addon, term_addon):
+    return np.clip(BASE_RATE + amount_addon + term_addon, MIN_RATE, MAX_RATE)
+
+
+def interest_rate(loan_amount, loan_term):
+    """按分档表计算年利率，参数可以是标量或可广播的数组"""
+    return _rate(AMOUNT_TIER_ADDONS[amount_tier(loan_amount)], TERM_TIER_ADDONS[term_tier(loan_term)])
+
+
+def quote_grid(amounts, terms, start=None):
+    """计算金额 × 期限网格上每个组合的利率、月还款额和总利息
+
+    返回 {'interest_rate', 'monthly_payment', 'total_interest'}，每项为 (len(amounts), len(terms)) 的数组。
+    利率只取决于金额档位和期限，先按 (金额档位, 期限) 算出利率表和年金系数表，再按每个金额的档位取出对应的行，
+    月还款额 = 金额 × 年金系数（取整到分）。总利息对整张网格一次计算还款计划得到，
+    与单笔报价和实际生成的账单（含最后一期的取整差额）一致。
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    terms = np.asarray(terms, dtype=np.int64)
+
+    rate_table = _rate(AMOUNT_TIER_ADDONS[:, None], TERM_TIER_ADDONS[term_tier(terms)][None, :])
+    factor_table = annuity_factor(rate_table, terms[None, :])
+    tiers = amount_tier(amounts)
+    rates = rate_table[tiers]
+    monthly_payment = np.round(amounts[:, None] * factor_table[tiers] * 100) / 100
+
+    shape = rates.shape
+    schedule = amortize(np.repeat(amounts, len(terms)), rates.ravel(), np.tile(terms, len(amounts)),
+                        start=start, installment=monthly_payment.ravel())
+    return {
+        'interest_rate': rates,
+        'monthly_payment': monthly_payment,
+        'total_interest': schedule.total_interest.reshape(shape),
+    }
@@ -8,62 +8,70 @@ import pickle
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 
+from feature_engineering import derived_features
+
 # Number of samples
 num_samples = 2000
 
-# Seed for reproducibility
-np.random.seed(42)
+# 分类特征的取值及其概率
+MARITAL_STATUS = (['single', 'married', 'divorced', 'widowed'], [0.3, 0.5, 0.15, 0.05])
+EDUCATION = (['high_school', 'college', 'bachelor', 'master', 'phd'], [0.2, 0.3, 0.3, 0.15, 0.05])
+EMPLOYMENT_STATUS = (['employed', 'self_employed', 'unemployed', 'retired'], [0.6, 0.2, 0.1, 0.1])
+HOME_OWNERSHIP = (['own', 'mortgage', 'rent', 'other'], [0.2, 0.4, 0.3, 0.1])
+LOAN_PURPOSE = (['business', 'education', 'home', 'car', 'debt_consolidation', 'other'],
+                [0.2, 0.1, 0.2, 0.2, 0.2, 0.1])
+PREVIOUS_DEFAULT = (['yes', 'no'], [0.15, 0.85])
 
 
-def generate_training_data(num_samples=num_samples):
-    """生成用于训练风险评估模型的模拟数据"""
+def generate_training_data(num_samples=num_samples, output_path='loan_data.csv'):
+    """生成用于训练风险评估模型的模拟数据，output_path 为 None 时不写文件"""
     np.random.seed(42)
+    df = pd.DataFrame(generate_training_columns(num_samples))
+    if output_path:
+        df.to_csv(output_path, index=False)
+        print(f"生成了 {num_samples} 条模拟贷款数据，保存到 {output_path}")
+
+    return df
+
+
+def generate_training_columns(num_samples, rng=np.random):
+    """按训练数据的分布生成 num_samples 条记录，返回 {列名: 数组}
 
+    rng 可以是 numpy.random 模块（全局随机状态）或 numpy.random.Generator，
+    两者的抽样方法同名，分片生成时每个分片使用独立的 Generator。
+    """
     # 数值特征
-    age = np.random.normal(35, 10, num_samples).clip(18, 70).astype(int)
-    employment_years = np.random.poisson(5, num_samples).clip(0, 30).astype(int)
-    annual_income = np.random.lognormal(11, 0.4, num_samples).clip(200000, 2000000).astype(int)
+    age = rng.normal(35, 10, num_samples).clip(18, 70).astype(int)
+    employment_years = rng.poisson(5, num_samples).clip(0, 30).astype(int)
+    annual_income = rng.lognormal(11, 0.4, num_samples).clip(200000, 2000000).astype(int)
     monthly_income = annual_income / 12
-    savings_balance = np.random.lognormal(8, 0.8, num_samples).clip(1000, 500000).astype(int)
-    total_assets = np.random.lognormal(11, 0.8, num_samples).clip(50000, 5000000).astype(int)
-    total_liabilities = np.random.lognormal(10, 0.8, num_samples).clip(10000, 1000000).astype(int)
-    credit_cards = np.random.poisson(2, num_samples).clip(0, 8).astype(int)
-    existing_loans = np.random.lognormal(9, 0.6, num_samples).clip(0, 500000).astype(int)
-    monthly_payment = np.random.lognormal(6, 0.5, num_samples).clip(500, 5000).astype(int)
-    loan_amount = np.random.lognormal(9.5, 0.7, num_samples).clip(10000, 1000000)
-    loan_term = np.random.choice([3,6,12, 24, 36], num_samples)
-    dependents = np.random.poisson(1, num_samples).clip(0, 5).astype(int)
+    savings_balance = rng.lognormal(8, 0.8, num_samples).clip(1000, 500000).astype(int)
+    total_assets = rng.lognormal(11, 0.8, num_samples).clip(50000, 5000000).astype(int)
+    total_liabilities = rng.lognormal(10, 0.8, num_samples).clip(10000, 1000000).astype(int)
+    credit_cards = rng.poisson(2, num_samples).clip(0, 8).astype(int)
+    existing_loans = rng.lognormal(9, 0.6, num_samples).clip(0, 500000).astype(int)
+    monthly_payment = rng.lognormal(6, 0.5, num_samples).clip(500, 5000).astype(int)
+    loan_amount = rng.lognormal(9.5, 0.7, num_samples).clip(10000, 1000000)
+    loan_term = rng.choice([3,6,12, 24, 36], num_samples)
+    dependents = rng.poisson(1, num_samples).clip(0, 5).astype(int)
 
     # 确保总资产 >= 储蓄
     total_assets = np.maximum(total_assets, savings_balance)
 
     # 分类特征
-    marital_status = np.random.choice(['single', 'married', 'divorced', 'widowed'],
-                                     num_samples, p=[0.3, 0.5, 0.15, 0.05])
-    education = np.random.choice(['high_school', 'college', 'bachelor', 'master', 'phd'],
-                                num_samples, p=[0.2, 0.3, 0.3, 0.15, 0.05])
-    employment_status = np.random.choice(['employed', 'self_employed', 'unemployed', 'retired'],
-                                        num_samples, p=[0.6, 0.2, 0.1, 0.1])
-    home_ownership = np.random.choice(['own', 'mortgage', 'rent', 'other'],
-                                     num_samples, p=[0.2, 0.4, 0.3, 0.1])
-    loan_purpose = np.random.choice(['business', 'education', 'home', 'car', 'debt_consolidation', 'other'],
-                                   num_samples, p=[0.2, 0.1, 0.2, 0.2, 0.2, 0.1])
-    previous_default = np.random.choice(['yes', 'no'], num_samples, p=[0.15, 0.85])
-
-    # 计算衍生特征
-    debt_to_income = monthly_payment / (monthly_income + 1e-6)
-    new_loan_monthly_payment = loan_amount / loan_term
-    new_loan_payment_ratio = new_loan_monthly_payment / monthly_income
-
-    new_loan_payment_ratio_binned = np.zeros(num_samples)
-    new_loan_payment_ratio_binned[(new_loan_payment_ratio > 0.1) & (new_loan_payment_ratio <= 0.5)] = 1
-    new_loan_payment_ratio_binned[(new_loan_payment_ratio > 0.5) & (new_loan_payment_ratio <= 1)] = 2
-    new_loan_payment_ratio_binned[(new_loan_payment_ratio > 1) & (new_loan_payment_ratio <= 2)] = 3
-    new_loan_payment_ratio_binned[(new_loan_payment_ratio > 2) & (new_loan_payment_ratio <= 5)] = 4
-    new_loan_payment_ratio_binned[(new_loan_payment_ratio > 5) & (new_loan_payment_ratio <= 10)] = 5
-    new_loan_payment_ratio_binned[new_loan_payment_ratio > 10] = 6
-
-    ratio_times_debt = new_loan_payment_ratio * debt_to_income
+    marital_status = rng.choice(MARITAL_STATUS[0], num_samples, p=MARITAL_STATUS[1])
+    education = rng.choice(EDUCATION[0], num_samples, p=EDUCATION[1])
+    employment_status = rng.choice(EMPLOYMENT_STATUS[0], num_samples, p=EMPLOYMENT_STATUS[1])
+    home_ownership = rng.choice(HOME_OWNERSHIP[0], num_samples, p=HOME_OWNERSHIP[1])
+    loan_purpose = rng.choice(LOAN_PURPOSE[0], num_samples, p=LOAN_PURPOSE[1])
+    previous_default = rng.choice(PREVIOUS_DEFAULT[0], num_samples, p=PREVIOUS_DEFAULT[1])
+
+    # 计算衍生特征（与在线评分共用同一实现）
+    derived = derived_features(monthly_income, monthly_payment, loan_amount, loan_term)
+    debt_to_income = derived['debt_to_income']
+    new_loan_payment_ratio = derived['new_loan_payment_ratio']
+    new_loan_payment_ratio_binned = derived['new_loan_payment_ratio_binned']
+    ratio_times_debt = derived['ratio_times_debt']
 
     # 贷款批准逻辑
     penalty = 1 / (1 + np.exp(-15 * (new_loan_payment_ratio - 0.3)))
@@ -76,11 +84,10 @@ def generate_training_data(num_samples=num_samples):
     loan_approved = (risk_score < 30).astype(int)
 
     # 添加噪声
-    flip = np.random.choice([0, 1], num_samples, p=[0.9, 0.1])
+    flip = rng.choice([0, 1], num_samples, p=[0.9, 0.1])
     loan_approved = np.where(flip, 1 - loan_approved, loan_approved)
 
-    # 创建数据框
-    data = {
+    return {
         'age': age,
         'employment_years': employment_years,
         'annual_income': annual_income,
@@ -108,12 +115,6 @@ def generate_training_data(num_samples=num_samples):
         'loan_approved': loan_approved
     }
 
-    df = pd.DataFrame(data)
-    df.to_csv('loan_data.csv', index=False)
-    print(f"生成了 {num_samples} 条模拟贷款数据，保存到 loan_data.csv")
-
-    return df
-
 def generate_sample_application():
     """生成一个样本贷款申请数据"""
     # 生成基本特征
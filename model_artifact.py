@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from linear_engine import LinearEngine
+from tree_engine import ForestEngine, ScalerParams
+
+ARTIFACT_PATH = 'risk_assessment_model.bin'
+
+# 文件格式：8 字节魔数 + uint32 格式版本 + uint32 头部长度 + JSON 头部 + 按 64 字节对齐的原始数组
+MAGIC = b'RAMODEL\0'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sII')
+ALIGNMENT = 64
+
+# 模型类型：随机森林（扁平数组）或二分类线性模型（系数和截距），头部未注明时为随机森林
+MODEL_TYPE_FOREST = 'forest'
+MODEL_TYPE_LINEAR = 'linear'
+
+# 写入文件的数组及其类型
+ARRAY_DTYPES = {
+    'feature': np.int32,
+    'threshold': np.float64,
+    'children': np.int32,
+    'value': np.float64,
+    'roots': np.int32,
+    'coef': np.float64,
+    'intercept': np.float64,
+    'scaler_mean': np.float64,
+    'scaler_scale': np.float64,
+}
+
+
+class ArtifactError(Exception):
+    """模型文件格式错误"""
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_artifact(path, engine, scaler, model_version=None):
+    """把模型数组和标准化器参数写入单个可内存映射的模型文件
+
+    engine 为 ForestEngine 或 LinearEngine。model_version 为空时使用数组内容的哈希作为版本号。先写临时文件再原子替换，
+    正在映射旧文件的进程不受影响。
+    """
+    if isinstance(engine, LinearEngine):
+        model_type = MODEL_TYPE_LINEAR
+        arrays = {
+            'coef': engine.coef,
+            'intercept': engine.intercept,
+        }
+    else:
+        model_type = MODEL_TYPE_FOREST
+        arrays = {
+            'feature': engine.feature,
+            'threshold': engine.threshold,
+            'children': engine.children,
+            'value': engine.value,
+            'roots': engine.roots,
+        }
+    arrays['scaler_mean'] = scaler.mean_
+    arrays['scaler_scale'] = scaler.scale_
+    arrays = {name: np.ascontiguousarray(array, dtype=ARRAY_DTYPES[name]) for name, array in arrays.items()}
+
+    if model_version is None:
+        digest = hashlib.sha256()
+        for name in sorted(arrays):
+            digest.update(arrays[name].tobytes())
+        model_version = digest.hexdigest()[:16]
+
+    header = {
+        'model_version': model_version,
+        'created_at': datetime.utcnow().isoformat(),
+        'model_type': model_type,
+        'max_depth': getattr(engine, 'max_depth', 0),
+        'classes': engine.classes_.tolist(),
+        'feature_names': engine.feature_names_in_.tolist() if hasattr(engine, 'feature_names_in_') else [],
+        'arrays': {}
+    }
+
+    # 计算每个数组的偏移量，头部长度会影响偏移量，因此先按占位头部估算再修正
+    header_bytes = b''
+    while True:
+        offset = _align(PREAMBLE.size + len(header_bytes))
+        for name, array in arrays.items():
+            header['arrays'][name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offset': offset
+            }
+            offset = _align(offset + array.nbytes)
+        new_header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(new_header_bytes) == len(header_bytes):
+            break
+        header_bytes = new_header_bytes
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return model_version
+
+
+def read_header(path):
+    """只读取模型文件头部"""
+    with open(path, 'rb') as f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) != PREAMBLE.size:
+            raise ArtifactError(f"模型文件过短: {path}")
+        magic, version, header_len = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ArtifactError(f"不是有效的模型文件: {path}")
+        if version != FORMAT_VERSION:
+            raise ArtifactError(f"不支持的模型文件版本: {version}")
+        return json.loads(f.read(header_len).decode('utf-8'))
+
+
+def load_artifact(path=ARTIFACT_PATH):
+    """以只读内存映射方式打开模型文件，返回 (engine, scaler, header)
+
+    数组直接引用映射的文件页，多个 gunicorn worker 打开同一文件时共享同一份页缓存。
+    """
+    header = read_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        if spec['offset'] + count * dtype.itemsize > buffer.size:
+            raise ArtifactError(f"模型文件不完整，数组 {name} 超出文件范围")
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=spec['offset'])
+        arrays[name] = array.reshape(spec['shape'])
+
+    model_type = header.get('model_type', MODEL_TYPE_FOREST)
+    if model_type == MODEL_TYPE_LINEAR:
+        engine = LinearEngine(
+            coef=arrays['coef'],
+            intercept=arrays['intercept'],
+            classes=np.array(header['classes']),
+            feature_names=header['feature_names'] or None
+        )
+        scaler = ScalerParams(arrays['scaler_mean'], arrays['scaler_scale'])
+        return engine, scaler, header
+    if model_type != MODEL_TYPE_FOREST:
+        raise ArtifactError(f"不支持的模型类型: {model_type}")
+
+    engine = ForestEngine(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        left=None,
+        right=None,
+        value=arrays['value'],
+        roots=arrays['roots'],
+        max_depth=header['max_depth'],
+        classes=np.array(header['classes']),
+        feature_names=header['feature_names'] or None,
+        children=arrays['children']
+    )
+    scaler = ScalerParams(arrays['scaler_mean'], arrays['scaler_scale'])
+    return engine, scaler, header
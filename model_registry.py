@@ -0,0 +1,199 @@
+"""版本化模型目录
+
+目录结构：
+    model_registry/
+        <version>.bin     # model_artifact 格式的模型文件，文件名即版本号
+        ACTIVE            # 当前生效的版本号
+        history.jsonl     # 发布、切换和回滚记录
+
+用法：
+    python model_registry.py list
+    python model_registry.py publish risk_assessment_model.bin [--no-activate]
+    python model_registry.py activate <version>
+    python model_registry.py rollback
+
+RiskAssessmentService 定期检查 ACTIVE 文件，版本变化时在后台加载并预热新模型后原子切换。
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from model_artifact import read_header, write_artifact
+
+REGISTRY_DIR = 'model_registry'
+ACTIVE_FILE = 'ACTIVE'
+HISTORY_FILE = 'history.jsonl'
+
+
+class RegistryError(Exception):
+    """模型目录操作错误"""
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def path_for(self, version):
+        return os.path.join(self.root, f'{version}.bin')
+
+    @property
+    def active_path(self):
+        return os.path.join(self.root, ACTIVE_FILE)
+
+    def _temp_path(self, prefix):
+        """在目录中创建一个唯一的临时文件，同时发布或切换版本的多个进程不会写到同一个文件"""
+        fd, tmp_path = tempfile.mkstemp(prefix=prefix, suffix='.part', dir=self.root)
+        os.close(fd)
+        return tmp_path
+
+    def active_version(self):
+        """当前生效的版本号，未设置时返回 None"""
+        try:
+            with open(self.active_path, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def versions(self):
+        """列出目录中的所有版本，按创建时间排序"""
+        if not os.path.isdir(self.root):
+            return []
+        active = self.active_version()
+        versions = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                header = read_header(path)
+            except Exception:
+                continue
+            versions.append({
+                'version': name[:-len('.bin')],
+                'created_at': header.get('created_at'),
+                'size_bytes': os.path.getsize(path),
+                'active': name[:-len('.bin')] == active
+            })
+        return sorted(versions, key=lambda v: v['created_at'] or '')
+
+    def publish(self, engine, scaler, activate=True):
+        """把模型写入目录，返回版本号"""
+        os.makedirs(self.root, exist_ok=True)
+        incoming = self._temp_path('incoming-')
+        try:
+            version = write_artifact(incoming, engine, scaler)
+            os.replace(incoming, self.path_for(version))
+        except BaseException:
+            if os.path.exists(incoming):
+                os.remove(incoming)
+            raise
+        self._append_history('publish', version)
+        if activate:
+            self.activate(version)
+        return version
+
+    def import_artifact(self, path, activate=True):
+        """把已有的模型文件复制到目录中，版本号取自文件头部"""
+        version = read_header(path)['model_version']
+        os.makedirs(self.root, exist_ok=True)
+        target = self.path_for(version)
+        if not os.path.exists(target):
+            tmp_path = self._temp_path(f'{version}-')
+            try:
+                shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, target)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._append_history('publish', version)
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version, action='activate'):
+        """把指定版本设为生效版本（原子替换 ACTIVE 文件）"""
+        if not os.path.exists(self.path_for(version)):
+            raise RegistryError(f"模型版本不存在: {version}")
+        tmp_path = self._temp_path(f'{ACTIVE_FILE}-')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.active_path)
+        self._append_history(action, version)
+
+    def rollback_target(self):
+        """上一个生效过的版本，即 rollback() 将切换到的版本"""
+        stack = self._activation_stack()
+        if len(stack) < 2:
+            raise RegistryError("没有可回滚的历史版本")
+        return stack[-2]
+
+    def rollback(self):
+        """回滚到上一个生效过的版本，返回回滚后的版本号"""
+        version = self.rollback_target()
+        self.activate(version, action='rollback')
+        return version
+
+    def history(self):
+        path = os.path.join(self.root, HISTORY_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _activation_stack(self):
+        """根据历史记录计算生效版本栈：activate 入栈，rollback 出栈"""
+        stack = []
+        for entry in self.history():
+            if entry['action'] == 'activate':
+                if not stack or stack[-1] != entry['version']:
+                    stack.append(entry['version'])
+            elif entry['action'] == 'rollback':
+                while stack and stack[-1] != entry['version']:
+                    stack.pop()
+                if not stack:
+                    stack.append(entry['version'])
+        return stack
+
+    def _append_history(self, action, version):
+        os.makedirs(self.root, exist_ok=True)
+        entry = {'action': action, 'version': version, 'at': datetime.utcnow().isoformat()}
+        with open(os.path.join(self.root, HISTORY_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='版本化模型目录管理')
+    parser.add_argument('--root', default=REGISTRY_DIR, help='模型目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='列出所有版本')
+    publish = subparsers.add_parser('publish', help='发布模型文件')
+    publish.add_argument('path', help='model_artifact 格式的模型文件')
+    publish.add_argument('--no-activate', action='store_true', help='只发布，不切换生效版本')
+    activate = subparsers.add_parser('activate', help='切换生效版本')
+    activate.add_argument('version')
+    subparsers.add_parser('rollback', help='回滚到上一个生效版本')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'list':
+        for item in registry.versions():
+            marker = '*' if item['active'] else ' '
+            print(f"{marker} {item['version']}  {item['created_at']}  {item['size_bytes']} 字节")
+    elif args.command == 'publish':
+        version = registry.import_artifact(args.path, activate=not args.no_activate)
+        print(f"已发布版本 {version}")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"生效版本已切换为 {args.version}")
+    elif args.command == 'rollback':
+        print(f"已回滚到版本 {registry.rollback()}")
+
+
+if __name__ == "__main__":
+    main()
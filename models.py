@@ -132,7 +132,7 @@ class Notification(db.Model):
     __tablename__ = 'notification'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
     is_read = db.Column(db.Boolean, default=False)
@@ -147,6 +147,8 @@ class Notification(db.Model):
 
 class Bill(db.Model):
     __tablename__ = 'bills'
+    # 定时任务按状态和还款日筛选待还账单
+    __table_args__ = (db.Index('ix_bills_status_due_date', 'status', 'due_date'),)
     id = db.Column(db.Integer, primary_key=True)
     loan_id = db.Column(db.Integer, db.ForeignKey('loan_application.id'), nullable=False)
     period = db.Column(db.Integer, nullable=False)  # 第几期
@@ -179,4 +181,20 @@ class Bill(db.Model):
         elif self.is_overdue():
             return '已逾期'
         else:
-            return '待还款'
\ No newline at end of file
+            return '待还款'
+
+class ReminderLedger(db.Model):
+    """已发送的账单提醒，每张账单的每种提醒（按还款日）只记录一次，用于提醒去重"""
+    __tablename__ = 'reminder_ledger'
+    __table_args__ = (
+        db.UniqueConstraint('bill_id', 'reminder_kind', 'due_date', name='uq_reminder_ledger_bill_kind_due'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bill_id = db.Column(db.Integer, db.ForeignKey('bills.id'), nullable=False)
+    reminder_kind = db.Column(db.String(50), nullable=False)  # 与 Notification.type 相同，如 repayment_reminder
+    due_date = db.Column(db.DateTime, nullable=False)  # 提醒对应的还款日
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ReminderLedger {self.bill_id} {self.reminder_kind}>'
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from models import RepaymentRecord, LoanApplication, db
+from amortization import amortize
 from notification_service import NotificationService
 
 
@@ -9,42 +10,18 @@ class RepaymentService:
 
     def generate_repayment_plan(self, loan_application):
         """生成还款计划"""
-        loan_amount = loan_application.loan_amount
-        loan_term = loan_application.loan_term
         annual_interest_rate = 0.06  # 假设年利率为6%
-        monthly_interest_rate = annual_interest_rate / 12
-
-        # 计算等额本息每月还款额
-        monthly_payment = (loan_amount * monthly_interest_rate * (1 + monthly_interest_rate) ** loan_term) / \
-                         ((1 + monthly_interest_rate) ** loan_term - 1)
-
-        # 生成还款计划
-        repayment_plan = []
-        remaining_principal = loan_amount
-        current_date = datetime.now()
-
-        for month in range(1, loan_term + 1):
-            # 计算每月利息
-            monthly_interest = remaining_principal * monthly_interest_rate
-            # 计算每月本金
-            monthly_principal = monthly_payment - monthly_interest
-            # 更新剩余本金
-            remaining_principal -= monthly_principal
-
-            # 计算还款日期（每月1号）
-            due_date = current_date.replace(day=1) + timedelta(days=30 * month)
-            if due_date.day != 1:
-                due_date = due_date.replace(day=1) + timedelta(days=30)
-
-            repayment_record = RepaymentRecord(
+        schedule = amortize(loan_application.amount, annual_interest_rate, loan_application.term,
+                            start=datetime.now())
+        return [
+            RepaymentRecord(
                 loan_id=loan_application.id,
-                amount=round(monthly_payment, 2),
-                due_date=due_date,
+                amount=row['amount'],
+                due_date=row['due_date'],
                 status='pending'
             )
-            repayment_plan.append(repayment_record)
-
-        return repayment_plan
+            for row in schedule.rows()
+        ]
 
     def save_repayment_plan(self, loan_application, repayment_plan):
         """保存还款计划"""
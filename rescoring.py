@@ -0,0 +1,134 @@
+import logging
+import os
+from datetime import datetime
+
+from batch_jobs import load_checkpoint, save_checkpoint
+from models import db, LoanApplication
+
+# 默认每批处理的申请数和断点文件
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHECKPOINT_PATH = 'rescore_checkpoint.json'
+
+# 评估特征与 LoanApplication 字段的对应关系（字段名不同的几项见 apply_loan）
+FEATURE_COLUMNS = {
+    'age': LoanApplication.age,
+    'employment_years': LoanApplication.employment_years,
+    'annual_income': LoanApplication.annual_income,
+    'monthly_income': LoanApplication.monthly_income,
+    'savings_balance': LoanApplication.savings_balance,
+    'total_assets': LoanApplication.total_assets,
+    'total_liabilities': LoanApplication.total_liabilities,
+    'credit_cards': LoanApplication.credit_cards,
+    'existing_loans': LoanApplication.his_existing_loans,
+    'monthly_payment': LoanApplication.his_monthly_debt,
+    'loan_amount': LoanApplication.amount,
+    'loan_term': LoanApplication.term,
+    'dependents': LoanApplication.dependents,
+    'employment_status': LoanApplication.employment_status,
+    'marital_status': LoanApplication.marital_status,
+    'education': LoanApplication.education,
+    'home_ownership': LoanApplication.home_ownership,
+    'loan_purpose': LoanApplication.purpose,
+    'previous_default': LoanApplication.previous_default,
+}
+
+# 查询时附带读取的当前评估结果，只有结果变化的申请才写回
+RESULT_COLUMNS = [LoanApplication.risk_score, LoanApplication.risk_level, LoanApplication.recommendation]
+
+logger = logging.getLogger(__name__)
+
+
+def iter_chunks(after_id, chunk_size, statuses=None):
+    """按主键分页读取申请，每次只查询评分所需的列
+
+    使用 id > 上一批最大 id 的键集分页，每批查询代价与表大小和已处理行数无关。
+    """
+    columns = [LoanApplication.id] + list(FEATURE_COLUMNS.values()) + RESULT_COLUMNS
+    while True:
+        query = db.session.query(*columns).filter(LoanApplication.id > after_id)
+        if statuses:
+            query = query.filter(LoanApplication.status.in_(statuses))
+        rows = query.order_by(LoanApplication.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def rescore_chunk(service, rows):
+    """对一批申请统一评分，返回需要更新的记录"""
+    feature_names = list(FEATURE_COLUMNS)
+    records = [dict(zip(feature_names, row[1:1 + len(feature_names)])) for row in rows]
+    assessments = service.assess_loan_applications(records, use_cache=False)
+
+    mappings = []
+    for row, assessment in zip(rows, assessments):
+        old_score, old_level, old_recommendation = row[1 + len(feature_names):]
+        values = {
+            'risk_score': assessment.get('risk_score', 0),
+            'risk_level': assessment.get('risk_level', 'medium'),
+            'recommendation': assessment.get('recommendation', {}).get('recommendation', '暂无建议'),
+        }
+        if (values['risk_score'], values['risk_level'], values['recommendation']) != \
+                (old_score, old_level, old_recommendation):
+            values['id'] = row[0]
+            mappings.append(values)
+    return mappings
+
+
+def rescore_applications(service, chunk_size=DEFAULT_CHUNK_SIZE, checkpoint_path=DEFAULT_CHECKPOINT_PATH,
+                         restart=False, statuses=None, max_chunks=None):
+    """用当前模型重新计算所有贷款申请的风险评分、风险等级和建议
+
+    每批评分后批量写回并提交，再更新断点文件；中断后再次运行从断点处继续。
+    断点对应的模型版本与当前不同时从头开始，避免新旧模型的结果混在一起；
+    状态过滤条件不同时也从头开始，避免按旧条件处理过的 id 区间中新条件下的申请被跳过。
+    需要在应用上下文中调用。
+    """
+    status_filter = sorted(statuses) if statuses else None
+    checkpoint = None if restart else load_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get('model_version') != service.model_version:
+        logger.warning("断点文件的模型版本 %s 与当前模型 %s 不一致，从头开始重评分",
+                       checkpoint.get('model_version'), service.model_version)
+        checkpoint = None
+    if checkpoint and checkpoint.get('statuses') != status_filter:
+        logger.warning("断点文件的状态过滤 %s 与本次 %s 不一致，从头开始重评分",
+                       checkpoint.get('statuses'), status_filter)
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = {
+            'model_version': service.model_version,
+            'statuses': status_filter,
+            'last_id': 0,
+            'processed': 0,
+            'updated': 0,
+            'started_at': datetime.utcnow().isoformat(),
+        }
+    else:
+        logger.info("从断点继续重评分：id > %s，已处理 %s 条", checkpoint['last_id'], checkpoint['processed'])
+
+    chunks = 0
+    for rows in iter_chunks(checkpoint['last_id'], chunk_size, statuses):
+        mappings = rescore_chunk(service, rows)
+        if mappings:
+            db.session.bulk_update_mappings(LoanApplication, mappings)
+        db.session.commit()
+        # 释放本批查询占用的会话状态，内存不随表大小增长
+        db.session.expunge_all()
+
+        checkpoint['last_id'] = rows[-1][0]
+        checkpoint['processed'] += len(rows)
+        checkpoint['updated'] += len(mappings)
+        save_checkpoint(checkpoint_path, checkpoint)
+        logger.info("重评分进度：id <= %s，已处理 %s 条，更新 %s 条",
+                    checkpoint['last_id'], checkpoint['processed'], checkpoint['updated'])
+
+        chunks += 1
+        if max_chunks is not None and chunks >= max_chunks:
+            return checkpoint
+
+    # 全部完成后删除断点文件，下次运行从头开始
+    checkpoint['completed'] = True
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return checkpoint
@@ -1,53 +1,272 @@
 import os
 import pickle
+import threading
+import time
+from datetime import datetime
 
 import numpy as np
-import pandas as pd
 import logging
 
+from feature_layout import FeatureLayout, RAW_NUMERIC_FEATURES, CATEGORICAL_FEATURES
+from model_artifact import ARTIFACT_PATH, load_artifact
+from model_registry import ModelRegistry, RegistryError, REGISTRY_DIR
+from scoring_cache import TTLCache, make_key, DEFAULT_MAXSIZE, DEFAULT_TTL
+from scoring_trace import ScoringTracer, NULL_TIMER
+from shadow_scoring import ShadowScorer, SCORING_MODES, SCORING_MODE_FULL, SCORING_MODE_FAST
+from tree_engine import FOREST_PATH, load_forest
+
+MODEL_PATH = 'risk_assessment_model.pkl'
+SCALER_PATH = 'risk_assessment_scaler.pkl'
+
+# 检查模型文件是否变化的最小间隔（秒）
+MODEL_CHECK_INTERVAL = 5
+
+# 参与风险评估的输入字段，缓存键只由这些字段决定
+ASSESSMENT_FIELDS = RAW_NUMERIC_FEATURES + list(CATEGORICAL_FEATURES)
+
+# 新模型切换前用于预热和校验的样本
+WARMUP_DATA_PATH = 'loan_data.csv'
+WARMUP_ROWS = 256
+
+
+class ModelState:
+    """一个已加载模型的全部状态
+
+    服务通过替换 state 引用整体切换模型，请求开始时取一次 state，
+    整个请求内使用同一组模型、标准化器和特征布局。
+    """
+    __slots__ = ('model', 'scaler', 'feature_names', 'layout', 'version', 'signature', 'source')
+
+    def __init__(self, model=None, scaler=None, feature_names=None, layout=None, version=None,
+                 signature=None, source=None):
+        self.model = model
+        self.scaler = scaler
+        self.feature_names = feature_names
+        self.layout = layout
+        self.version = version
+        self.signature = signature
+        self.source = source
+
+    @property
+    def ready(self):
+        return self.model is not None and self.scaler is not None
+
 
 class RiskAssessmentService:
-    def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.feature_names = None
+    def __init__(self, cache_size=DEFAULT_MAXSIZE, cache_ttl=DEFAULT_TTL,
+                 trace_enabled=False, trace_sample_rate=0.0,
+                 scoring_mode=SCORING_MODE_FULL, shadow_sample_rate=0.0, registry_dir=REGISTRY_DIR):
+        self.state = ModelState()
+
+        # 评估结果缓存，模型切换时清空
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._last_model_check = 0.0
+        self._model_check_lock = threading.Lock()
+
+        # 版本化模型目录；新模型在后台线程加载预热，加载失败的签名不再重试
+        self.registry = ModelRegistry(registry_dir)
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        self._failed_signature = None
+        self.last_swap_at = None
+
+        # 分阶段耗时追踪，默认关闭
+        self.tracer = ScoringTracer(enabled=trace_enabled, sample_rate=trace_sample_rate)
+
+        # 评分模式：fast 模式下只用显式公式计算，模型按 shadow_sample_rate 抽样在后台运行
+        self.scoring_mode = SCORING_MODE_FULL
+        self.set_scoring_mode(scoring_mode)
+        self.shadow = ShadowScorer(self.get_risk_level, sample_rate=shadow_sample_rate)
         
-        # 设置日志记录器
+        # 日志记录器，输出位置由应用统一配置
         self.logger = logging.getLogger(__name__)
-        if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('\n%(asctime)s - %(name)s - %(levelname)s\n%(message)s\n')
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
-            self.logger.setLevel(logging.INFO)
         
         self.load_model()
     
+    # 兼容原有属性，均取自当前模型状态
+    @property
+    def model(self):
+        return self.state.model
+
+    @property
+    def scaler(self):
+        return self.state.scaler
+
+    @property
+    def feature_names(self):
+        return self.state.feature_names
+
+    @property
+    def layout(self):
+        return self.state.layout
+
+    @property
+    def model_version(self):
+        return self.state.version
+
+    @property
+    def model_signature(self):
+        return self.state.signature
+
     def load_model(self):
-        """加载风险评估模型和标准化器"""
+        """同步加载当前模型、预热后切换（服务初始化时调用）"""
+        state = self._load_state()
+        if state.ready:
+            try:
+                self._warm_up(state)
+            except Exception as e:
+                self.logger.error("模型预热失败: %s", e)
+        self._swap(state)
+
+    def reload_model(self, signature=None):
+        """加载并预热当前生效的模型，成功后原子切换，返回是否切换
+
+        加载和预热期间请求继续使用旧模型；新模型加载或预热失败时保留旧模型。
+        """
+        with self._reload_lock:
+            signature = signature or self._model_signature()
+            state = self._load_state(signature)
+            try:
+                if not state.ready:
+                    raise ValueError("模型或标准化器加载失败")
+                self._warm_up(state)
+            except Exception as e:
+                self.logger.error("新模型未通过预热，继续使用版本 %s: %s", self.model_version, e)
+                self._failed_signature = signature
+                return False
+            self._swap(state)
+            return True
+
+    def activate_version(self, version, action='activate'):
+        """加载并预热模型目录中的指定版本，成功后才写入 ACTIVE 并切换，返回是否切换
+
+        预热失败时 ACTIVE 保持不变，其他 worker 和重启后的进程不会加载这个版本。
+        """
+        if not os.path.exists(self.registry.path_for(version)):
+            raise RegistryError(f"模型版本不存在: {version}")
+        with self._reload_lock:
+            state = self._load_state(version=version)
+            try:
+                if not state.ready:
+                    raise ValueError("模型或标准化器加载失败")
+                self._warm_up(state)
+            except Exception as e:
+                self.logger.error("版本 %s 未通过预热，不切换，继续使用版本 %s: %s", version, self.model_version, e)
+                return False
+            self.registry.activate(version, action=action)
+            state.signature = self._model_signature()
+            self._swap(state)
+            return True
+
+    def rollback_model(self):
+        """回滚到上一个生效版本：预热通过后才写入 ACTIVE 并切换，返回回滚后的版本号，未通过预热时返回 None"""
+        version = self.registry.rollback_target()
+        return version if self.activate_version(version, action='rollback') else None
+
+    def model_info(self):
+        """当前模型及模型目录信息"""
+        state = self.state
+        return {
+            'active_version': state.version,
+            'source': state.source,
+            'ready': state.ready,
+            'registry_active_version': self.registry.active_version(),
+            'reloading': self._reload_thread is not None and self._reload_thread.is_alive(),
+            'last_swap_at': self.last_swap_at,
+            'versions': self.registry.versions()
+        }
+
+    def _swap(self, state):
+        """原子切换模型状态并清空评估缓存"""
+        self.state = state
+        self._last_model_check = time.monotonic()
+        self._failed_signature = None
+        self.last_swap_at = datetime.utcnow().isoformat()
+        self.cache.clear()
+        self.logger.info("当前模型版本: %s（来源 %s）", state.version, state.source)
+
+    def _warm_up(self, state):
+        """用 loan_data.csv 中的样本跑一遍完整评分流程，校验输出并预热内存映射页"""
+        records = _warmup_records()
+        if not records:
+            return
+        X_raw = state.layout.transform(records)
+        probabilities = state.model.predict_proba(self._scale(X_raw, state))
+        if probabilities.shape != (len(records), 2) or not np.all(np.isfinite(probabilities)):
+            raise ValueError(f"模型预热输出异常: shape={probabilities.shape}")
+        self._explicit_scores(X_raw, state)
+        self.logger.info("模型 %s 预热完成，样本 %s 条", state.version, len(records))
+
+    def _load_state(self, signature=None, version=None):
+        """按优先级加载模型，返回新的 ModelState，不修改当前状态
+
+        加载顺序：模型目录中的生效版本、单文件模型、森林数组文件、pickle 文件，
+        前一个来源加载失败时继续尝试下一个（生效版本损坏时回退到随代码提交的单文件模型）。
+        version 不为空时只加载模型目录中的该版本（切换版本前预热用），失败时返回未就绪的状态。
+        仓库中提交的 risk_assessment_model.bin 是从同样提交的 pickle 模型导出的，两者预测结果相同；
+        train_model 只把新模型发布到模型目录，不覆盖单文件模型（会覆盖 pickle 文件，但单文件模型存在时不会加载 pickle）。
+        森林数组文件只作为旧版本的兼容格式读取，不再提交。
+        """
+        state = ModelState(signature=signature or self._model_signature())
         try:
-            model_path = 'risk_assessment_model.pkl'
-            scaler_path = 'risk_assessment_scaler.pkl'
-            
-            self.logger.info(f"尝试加载模型文件: {model_path}")
-            self.logger.info(f"尝试加载标准化器文件: {scaler_path}")
-            
-            if os.path.exists(model_path) and os.path.exists(scaler_path):
-                with open(model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                    self.logger.info("成功加载模型")
+            model_path = MODEL_PATH
+            scaler_path = SCALER_PATH
+            forest_path = FOREST_PATH
+            artifact_path = ARTIFACT_PATH
+
+            sources = []
+            registry_version = version or self.registry.active_version()
+            if registry_version is not None:
+                sources.append(('registry', self.registry.path_for(registry_version)))
+            if version is None:
+                if os.path.exists(artifact_path):
+                    sources.append(('artifact', artifact_path))
+                if os.path.exists(forest_path):
+                    sources.append(('forest', forest_path))
+
+            for kind, path in sources:
+                try:
+                    if kind == 'forest':
+                        # 扁平数组格式的森林，无需导入 sklearn
+                        self.logger.info(f"尝试加载森林数组文件: {path}")
+                        state.model, state.scaler = load_forest(path)
+                    else:
+                        # 以内存映射方式打开单文件模型，多个 worker 共享同一份页缓存
+                        self.logger.info(f"尝试加载模型文件: {path}")
+                        state.model, state.scaler, header = load_artifact(path)
+                        state.version = header['model_version']
+                    state.source = path
+                    self.logger.info(f"成功加载模型，版本: {state.version}（来源 {path}）")
+                    break
+                except Exception as e:
+                    self.logger.error(f"加载模型 {path} 失败，尝试下一个来源: {str(e)}")
+                    state.model = state.scaler = state.version = None
+
+            if version is not None and state.model is None:
+                return state
+
+            if (state.model is not None or os.path.exists(model_path)) and \
+                    (state.scaler is not None or os.path.exists(scaler_path)):
+                if state.model is None:
+                    self.logger.info(f"尝试加载模型文件: {model_path}")
+                    with open(model_path, 'rb') as f:
+                        state.model = pickle.load(f)
+                        state.source = model_path
+                        self.logger.info("成功加载模型")
                     
-                with open(scaler_path, 'rb') as f:
-                    self.scaler = pickle.load(f)
-                    self.logger.info("成功加载标准化器")
+                if state.scaler is None:
+                    self.logger.info(f"尝试加载标准化器文件: {scaler_path}")
+                    with open(scaler_path, 'rb') as f:
+                        state.scaler = pickle.load(f)
+                        self.logger.info("成功加载标准化器")
                 
                 # 从模型中获取特征名称
-                if hasattr(self.model, 'feature_names_in_'):
-                    self.feature_names = self.model.feature_names_in_.tolist()
-                    self.logger.info(f"从模型中获取特征名称: {self.feature_names}")
+                if hasattr(state.model, 'feature_names_in_'):
+                    state.feature_names = state.model.feature_names_in_.tolist()
+                    self.logger.info(f"从模型中获取特征名称: {state.feature_names}")
                 else:
                     # 使用实际的特征名称
-                    self.feature_names = [
+                    state.feature_names = [
                         'age', 'employment_years', 'annual_income', 'monthly_income',
                         'savings_balance', 'total_assets', 'total_liabilities',
                         'credit_cards', 'existing_loans', 'monthly_payment',
@@ -60,11 +279,14 @@ class RiskAssessmentService:
                         'previous_default_yes', 'previous_default_no'
                     ]
                     self.logger.info("使用默认特征名称列表")
+
+                # 预编译特征槽位布局，之后每个请求直接按槽位填充特征行
+                state.layout = FeatureLayout(state.feature_names)
                 
                 # 验证模型和标准化器
-                if not hasattr(self.model, 'predict_proba'):
+                if not hasattr(state.model, 'predict_proba'):
                     raise AttributeError("模型缺少 predict_proba 方法")
-                if not hasattr(self.scaler, 'transform'):
+                if not hasattr(state.scaler, 'transform'):
                     raise AttributeError("标准化器缺少 transform 方法")
                 
                 self.logger.info("模型和标准化器验证成功")
@@ -77,153 +299,166 @@ class RiskAssessmentService:
                 
         except Exception as e:
             self.logger.error(f"加载模型时出错: {str(e)}")
-            self.model = None
-            self.scaler = None
-            self.feature_names = None
+            state = ModelState(signature=state.signature)
+        return state
 
-    def calculate_risk_score(self, data):
-        """计算风险分数"""
+    def set_scoring_mode(self, mode):
+        """切换评分模式（full 或 fast），两种模式返回的风险分数相同"""
+        if mode not in SCORING_MODES:
+            raise ValueError(f"未知的评分模式: {mode}")
+        self.scoring_mode = mode
+
+    def calculate_risk_score(self, data, timer=NULL_TIMER):
+        """计算风险分数，timer 用于记录各阶段耗时"""
+        state = self.state
         try:
-            if self.model is not None and self.scaler is not None:
-                # 准备特征数据
-                features = self._prepare_features(data)
-                
-                # 将特征转换为 DataFrame，并确保列顺序正确
-                df = pd.DataFrame([features])
-                
-                # 确保列顺序与训练时一致
-                if hasattr(self.model, 'feature_names_in_'):
-                    required_features = self.model.feature_names_in_.tolist()
-                else:
-                    required_features = self.feature_names
-                
-                self.logger.debug(f"模型期望的特征顺序: {required_features}")
-                self.logger.debug(f"当前特征顺序: {df.columns.tolist()}")
-                
-                # 重新排序列
-                df = df[required_features]
-                
+            if state.ready:
+                # 按预编译布局构建特征行，列顺序与训练时一致
+                X_raw = self._prepare_features(data, state)
+                timer.mark('feature_build')
+
+                if self.scoring_mode == SCORING_MODE_FAST:
+                    # 快速模式：返回值只取决于显式公式，模型推理交给后台影子线程抽样运行
+                    explicit_score = self._explicit_scores(X_raw, state)[0]
+                    timer.mark('explicit_formula')
+                    if timer.sampled:
+                        timer.detail('input', data)
+                        timer.detail('explicit_score', float(explicit_score))
+                    if not np.isfinite(explicit_score):
+                        raise ValueError(f"显式公式计算结果无效: {explicit_score}")
+                    score = int(explicit_score)
+                    if self.shadow.sample_rate > 0:
+                        self._submit_shadow(state, X_raw, np.array([score]))
+                    return score
+
                 # 标准化特征
-                X = self.scaler.transform(df)
+                X = self._scale(X_raw, state)
+                timer.mark('scale')
                 
                 # 预测风险概率
-                risk_prob = self.model.predict_proba(X)[0][1]
+                risk_prob = state.model.predict_proba(X)[0][1]
+                timer.mark('predict')
 
                 # 显式公式
-                ratio = features['new_loan_payment_ratio']
-                penalty = 1 / (1 + np.exp(-15 * (ratio - 0.3)))  # 更早、更强惩罚
-                explicit_score = (
-                                         0.1 * (features['annual_income'] / 2000000) +
-                                         0.14 * features['previous_default_no'] +
-                                         0.13 * (1 - min(max(features['debt_to_income'], 0), 1)) +
-                                         0.5 * min(max(features['savings_balance'] /features['loan_amount'], 0), 1)+
-                                         0.13 * (1 - penalty)  # 反转penalty，增大权重
-                                 ) * 100
-
-
-                self.logger.info(f"使用模型计算的风险分数: {100-int(explicit_score)}")
+                explicit_score = self._explicit_scores(X_raw, state)[0]
+                timer.mark('explicit_formula')
+                if timer.sampled:
+                    timer.detail('input', data)
+                    timer.detail('features', dict(zip(state.feature_names, X_raw[0].tolist())))
+                    timer.detail('risk_prob', float(risk_prob))
+                    timer.detail('explicit_score', float(explicit_score))
+                if not np.isfinite(explicit_score):
+                    raise ValueError(f"显式公式计算结果无效: {explicit_score}")
+
                 return int(explicit_score)
             else:
                 risk_score = self._calculate_default_risk_score(data)
-                self.logger.info(f"使用默认方法计算的风险分数: {risk_score}")
+                self.logger.debug("使用默认方法计算的风险分数: %s", risk_score)
                 return risk_score
         except Exception as e:
-             self.logger.error(f"计算风险分数时出错: {str(e)}")
+             self.logger.error("计算风险分数时出错: %s", e)
              return self._calculate_default_risk_score(data)
 
-    def _prepare_features(self, data):
-        """准备特征数据"""
-        features = {}
-        self.logger.debug(f"开始准备特征，输入数据: {data}")
-
-        # 确保特征顺序与训练时一致
-        if self.feature_names is None:
-            self.logger.error("特征名称列表未初始化")
-            return features
-
-        # 数值特征
-        numeric_features = [
-            'age', 'employment_years', 'annual_income', 'monthly_income',
-            'savings_balance', 'total_assets', 'total_liabilities',
-            'credit_cards', 'existing_loans', 'monthly_payment',
-            'loan_amount', 'loan_term', 'dependents', 'credit_score',
-            'debt_to_income', 'new_loan_monthly_payment', 'new_loan_payment_ratio',
-            'new_loan_payment_ratio_binned', 'ratio_times_debt'
-        ]
-        for feature in numeric_features:
-            try:
-                if feature == 'debt_to_income':
-                    value = data.get('monthly_payment', 0) / (data.get('monthly_income', 1) + 1e-6)
-                elif feature == 'new_loan_payment_ratio':
-                    value = (data.get('loan_amount', 0) / data.get('loan_term', 1)) / (
-                                data.get('monthly_income', 1) + 1e-6)
-                elif feature == 'new_loan_payment_ratio_binned':
-                    ratio = (data.get('loan_amount', 0) / data.get('loan_term', 1)) / (
-                            data.get('monthly_income', 1) + 1e-6)
-                    if ratio <= 0.1:
-                        value = 0
-                    elif ratio <= 0.5:
-                        value = 1
-                    elif ratio <= 1:
-                        value = 2
-                    elif ratio <= 2:
-                        value = 3
-                    elif ratio <= 5:
-                        value = 4
-                    elif ratio <= 10:
-                        value = 5
-                    else:
-                        value = 6
-                elif feature == 'ratio_times_debt':
-                    ratio = (data.get('loan_amount', 0) / data.get('loan_term', 1)) / (
-                            data.get('monthly_income', 1) + 1e-6)
-                    debt = data.get('monthly_payment', 0) / (data.get('monthly_income', 1) + 1e-6)
-                    value = ratio * debt
-                else:
-                    value = data.get(feature)
-                self.logger.debug(f"处理数值特征 {feature}, 原始值: {value}")
-                features[feature] = float(value) if value is not None else 0.0
-                self.logger.debug(f"处理后的值: {features[feature]}")
-            except Exception as e:
-                self.logger.error(f"处理数值特征 {feature} 时出错: {str(e)}")
-                features[feature] = 0.0
-
-
-        # 分类特征及其可能值
-        categorical_features = {
-            'marital_status': ['single', 'married', 'divorced', 'widowed'],
-            'education': ['high_school', 'college', 'bachelor', 'master', 'phd'],
-            'employment_status': ['employed', 'self_employed', 'unemployed', 'retired'],
-            'home_ownership': ['own', 'rent', 'mortgage', 'other'],
-            'loan_purpose': ['business', 'education', 'home', 'car', 'debt_consolidation', 'other'],
-            'previous_default': ['yes', 'no']
-        }
+    def calculate_risk_scores(self, records):
+        """批量计算风险分数，结果与逐条调用 calculate_risk_score 一致"""
+        scores = self._model_risk_scores(records)
+        # 模型不可用或个别记录无法用显式公式计算时，逐条回退到默认方法
+        return [score if score is not None else self._calculate_default_risk_score(data)
+                for score, data in zip(scores, records)]
 
-        # 独热编码
-        for feature, values in categorical_features.items():
-            try:
-                value = str(data.get(feature, 'unknown')).lower()
-                self.logger.debug(f"处理分类特征 {feature}, 原始值: {value}")
-                for v in values:
-                    features[f"{feature}_{v}"] = 1 if value == v else 0
-                    self.logger.debug(f"独热编码 {feature}_{v}: {features[f'{feature}_{v}']}")
-            except Exception as e:
-                self.logger.error(f"处理分类特征 {feature} 时出错: {str(e)}")
-                for v in values:
-                    features[f"{feature}_{v}"] = 0
-
-        # 确保所有特征都存在，并按正确顺序排列
-        ordered_features = {}
-        for feature_name in self.feature_names:
-            if feature_name in features:
-                ordered_features[feature_name] = features[feature_name]
-            else:
-                self.logger.warning(f"特征 {feature_name} 不存在，使用默认值 0")
-                ordered_features[feature_name] = 0.0
+    def _model_risk_scores(self, records, timer=None):
+        """用模型和显式公式批量计算风险分数，无法计算的记录返回 None
+
+        传入 timer 时各阶段记录在调用方的计时器上，由调用方结束计时；否则单独计时。
+        """
+        scores = [None] * len(records)
+        state = self.state
+        if not state.ready or not records:
+            return scores
+        owns_timer = timer is None
+        if owns_timer:
+            timer = self.tracer.start('batch.')
+        try:
+            # 一次性构建特征矩阵
+            X_raw = state.layout.transform(records)
+            timer.mark('feature_build')
+
+            fast = self.scoring_mode == SCORING_MODE_FAST
+            if not fast:
+                # 整个矩阵一次标准化、一次预测
+                X = self._scale(X_raw, state)
+                timer.mark('scale')
+                risk_prob = state.model.predict_proba(X)[:, 1]
+                timer.mark('predict')
+
+            # 向量化显式公式
+            explicit_scores = self._explicit_scores(X_raw, state)
+            for i, explicit_score in enumerate(explicit_scores):
+                if np.isfinite(explicit_score):
+                    scores[i] = int(explicit_score)
+            timer.mark('explicit_formula')
+
+            if fast and self.shadow.sample_rate > 0:
+                self._submit_shadow(state, X_raw, explicit_scores)
+            if timer.sampled:
+                timer.detail('rows', len(records))
+                timer.detail('scores', scores)
+        except Exception as e:
+            self.logger.error("批量计算风险分数时出错: %s", e)
+            scores = [None] * len(records)
+        if owns_timer:
+            timer.finish()
+        return scores
+
+    def _submit_shadow(self, state, X_raw, scores):
+        """只把抽中的、公式分数可计算的行交给影子推理
+
+        影子推理只用于对比，这里的任何异常只记录日志，不影响返回给调用方的分数。
+        """
+        try:
+            mask = self.shadow.sample_mask(len(scores)) & np.isfinite(scores)
+            if mask.any():
+                self.shadow.submit(state.model, state.scaler, state.version,
+                                   X_raw[mask], scores[mask].astype(np.int64))
+        except Exception as e:
+            self.logger.error("提交影子推理时出错: %s", e)
+
+    def _scale(self, X_raw, state=None):
+        """标准化特征矩阵"""
+        scaler = (state or self.state).scaler
+        if hasattr(scaler, 'mean_') and hasattr(scaler, 'scale_'):
+            # StandardScaler：直接按均值和标准差计算，与 transform 结果一致，省去输入校验开销
+            return (X_raw - scaler.mean_) / scaler.scale_
+        return scaler.transform(X_raw)
+
+    def _explicit_scores(self, X, state=None):
+        """对原始特征矩阵逐行计算显式公式分数，无法计算的行返回 nan"""
+        layout = (state or self.state).layout
+
+        def column(name):
+            return X[:, layout.index(name)]
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            loan_amount = column('loan_amount')
+            ratio = column('new_loan_payment_ratio')
+            penalty = 1 / (1 + np.exp(-15 * (ratio - 0.3)))  # 更早、更强惩罚
+            explicit_scores = (
+                                      0.1 * (column('annual_income') / 2000000) +
+                                      0.14 * column('previous_default_no') +
+                                      0.13 * (1 - np.minimum(np.maximum(column('debt_to_income'), 0), 1)) +
+                                      0.5 * np.minimum(np.maximum(column('savings_balance') / loan_amount, 0), 1) +
+                                      0.13 * (1 - penalty)  # 反转penalty，增大权重
+                              ) * 100
+        # 贷款金额为 0 时原公式无法计算
+        return np.where(loan_amount == 0, np.nan, explicit_scores)
+
+    def _prepare_features(self, data, state=None):
+        """准备特征数据，返回 (1, n_features) 的 float64 特征行"""
+        layout = (state or self.state).layout
+        if layout is None:
+            raise ValueError("特征布局未初始化")
+        return layout.transform_one(data)
 
-        self.logger.debug(f"特征准备完成，最终特征: {ordered_features}")
-        return ordered_features
-    
     def _calculate_default_credit_score(self, data):
         """使用默认方法计算信用分数"""
         score = 600  # 基础分
@@ -357,28 +592,142 @@ class RiskAssessmentService:
     
     def assess_loan_application(self, application_data):
         """评估贷款申请"""
+        self._check_model_files()
         try:
+            # 请求体不是 JSON 对象（null、列表、标量）时无法计算缓存键，与评估出错一样返回默认评估
+            key = self._cache_key(application_data)
+            hit, cached = self.cache.get(key)
+            if hit:
+                return cached
+            timer = self.tracer.start()
             # 计算风险分数
-            risk_score = 100 - self.calculate_risk_score(application_data)
-            
-            # 确定风险等级
-            risk_level = self.get_risk_level(risk_score)
-            
-            # 获取建议
-            recommendation = self.get_risk_recommendation(risk_score)
-            
-            return {
-                'risk_score': risk_score,
-                'risk_level': risk_level,
-                'recommendation': recommendation
-            }
+            risk_score = 100 - self.calculate_risk_score(application_data, timer)
+            assessment = self._build_assessment(risk_score)
+            timer.mark('recommendation')
         except Exception as e:
-            self.logger.error(f"评估贷款申请时出错: {str(e)}")
-            return {
-                'risk_score': 50,  # 默认风险分数
-                'risk_level': '中风险',
-                'recommendation': {
-                    'recommendation': '需要进一步评估',
-                    'suggestions': ['系统评估出错，需要人工审核']
-                }
-            } 
\ No newline at end of file
+            self.logger.error("评估贷款申请时出错: %s", e)
+            return self._fallback_assessment()
+        timer.finish()
+        self.cache.set(key, assessment)
+        return assessment
+
+    def assess_loan_applications(self, applications, use_cache=True):
+        """批量评估贷款申请，结果与逐条调用 assess_loan_application 一致
+
+        use_cache 为 False 时既不查询也不写入结果缓存（如批量重评分，避免冲掉在线请求的缓存）。
+        """
+        self._check_model_files()
+        results = [None] * len(applications)
+
+        # 先查缓存，只对未命中的申请构建特征矩阵
+        keys = [None] * len(applications)
+        pending = []
+        for i, data in enumerate(applications):
+            if not isinstance(data, dict):
+                # 不是 JSON 对象的请求只影响自己：返回默认评估，不进入特征矩阵
+                self.logger.error("评估贷款申请时出错: 申请数据不是对象: %s", type(data).__name__)
+                results[i] = self._fallback_assessment()
+                continue
+            if use_cache:
+                keys[i] = self._cache_key(data)
+                hit, cached = self.cache.get(keys[i])
+                if hit:
+                    results[i] = cached
+                    continue
+            pending.append(i)
+
+        records = [applications[i] for i in pending]
+        # 整批只用一个计时器：特征构建、预测和生成建议都记在 batch. 前缀下
+        timer = self.tracer.start('batch.')
+        scores = self._model_risk_scores(records, timer)
+        for i, score, data in zip(pending, scores, records):
+            try:
+                if score is None:
+                    score = self._calculate_default_risk_score(data)
+                results[i] = self._build_assessment(100 - score)
+                if use_cache:
+                    self.cache.set(keys[i], results[i])
+            except Exception as e:
+                self.logger.error("评估贷款申请时出错: %s", e)
+                results[i] = self._fallback_assessment()
+        timer.mark('recommendation')
+        timer.finish()
+        return results
+
+    def _cache_key(self, data):
+        """评估结果的缓存键，包含模型文件签名，模型切换后旧结果不会被命中"""
+        return make_key(['assessment', self.model_signature], data, ASSESSMENT_FIELDS)
+
+    def _model_signature(self):
+        """模型相关文件的 (路径, 修改时间, 大小)，用于判断文件是否变化"""
+        signature = [('registry', self.registry.active_version())]
+        for path in (ARTIFACT_PATH, FOREST_PATH, MODEL_PATH, SCALER_PATH):
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _check_model_files(self):
+        """定期检查模型文件和模型目录，变化时在后台线程加载预热新模型，不阻塞当前请求"""
+        if time.monotonic() - self._last_model_check < MODEL_CHECK_INTERVAL:
+            return
+        if not self._model_check_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_model_check = time.monotonic()
+            signature = self._model_signature()
+            if signature == self.model_signature or signature == self._failed_signature:
+                return
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return
+            self.logger.info("检测到模型文件变化，在后台加载新模型")
+            self._reload_thread = threading.Thread(target=self.reload_model, args=(signature,),
+                                                   name='model-reload', daemon=True)
+            self._reload_thread.start()
+        finally:
+            self._model_check_lock.release()
+
+    def _build_assessment(self, risk_score):
+        """根据风险分数组装评估结果"""
+        # 确定风险等级
+        risk_level = self.get_risk_level(risk_score)
+
+        # 获取建议
+        recommendation = self.get_risk_recommendation(risk_score)
+
+        return {
+            'risk_score': risk_score,
+            'risk_level': risk_level,
+            'recommendation': recommendation
+        }
+
+    @staticmethod
+    def _fallback_assessment():
+        """评估出错时返回的默认结果"""
+        return {
+            'risk_score': 50,  # 默认风险分数
+            'risk_level': '中风险',
+            'recommendation': {
+                'recommendation': '需要进一步评估',
+                'suggestions': ['系统评估出错，需要人工审核']
+            }
+        }
+
+
+_warmup_cache = None
+
+
+def _warmup_records():
+    """读取预热样本（只读一次），文件不存在时返回空列表"""
+    global _warmup_cache
+    if _warmup_cache is None:
+        if os.path.exists(WARMUP_DATA_PATH):
+            from loan_data_store import load_loan_data
+            df = load_loan_data(stop=WARMUP_ROWS, csv_path=WARMUP_DATA_PATH)
+            _warmup_cache = [{field: row[field] for field in ASSESSMENT_FIELDS if field in row}
+                             for row in df.to_dict('records')]
+        else:
+            _warmup_cache = []
+    return _warmup_cache
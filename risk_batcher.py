@@ -0,0 +1,188 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+# 默认合并窗口（毫秒）和单批最大条数
+DEFAULT_WINDOW_MS = 2
+DEFAULT_MAX_BATCH_SIZE = 64
+
+# 调用方等待批量结果的最长时间（秒），超时后改为直接逐条评估
+DEFAULT_SUBMIT_TIMEOUT = 5
+
+_STOP = object()
+
+
+class RiskBatcher:
+    """风险评估请求合并器
+
+    把在合并窗口内到达的并发请求（或凑满 max_batch_size 条）合并成一个特征矩阵，
+    通过 RiskAssessmentService.assess_loan_applications 一次评估后再把结果分发给各自的调用方。
+    队列中只有一条请求、也没有其他已提交未完成的请求时不等待合并窗口，直接评估。
+    整批评估失败时改为逐条评估，只有出错的请求收到异常。
+    只有在同一进程内有多个线程同时处理请求时（如 Flask 多线程、gunicorn gthread）才会产生合并效果。
+    """
+
+    def __init__(self, service, window_ms=DEFAULT_WINDOW_MS, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 submit_timeout=DEFAULT_SUBMIT_TIMEOUT):
+        self.service = service
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.submit_timeout = submit_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0  # 已提交、尚未分发结果的请求数
+
+        # 统计信息
+        self.requests = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.fallbacks = 0
+        self.immediate_batches = 0
+        self.split_batches = 0
+        self.last_batch_size = 0
+        self.max_queue_depth = 0
+        self.batch_size_histogram = {}
+
+    def configure(self, window_ms=None, max_batch_size=None):
+        """运行时调整合并窗口和单批最大条数"""
+        if window_ms is not None:
+            self.window_ms = window_ms
+        if max_batch_size is not None:
+            self.max_batch_size = max(1, int(max_batch_size))
+
+    def start(self):
+        """启动合并线程（首次提交时自动启动）"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='risk-batcher', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """停止合并线程，队列中剩余的请求处理完后退出"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join()
+            self._thread = None
+
+    def submit(self, application_data):
+        """提交一条评估请求并等待结果"""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+        future = Future()
+        with self._stats_lock:
+            self._in_flight += 1
+        self._queue.put((application_data, future))
+        with self._stats_lock:
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+        try:
+            return future.result(timeout=self.submit_timeout)
+        except TimeoutError:
+            # 尚未开始处理的请求直接取消，避免重复评估
+            future.cancel()
+            self.logger.warning("等待批量评估结果超时，改为直接评估")
+        except Exception as e:
+            self.logger.error(f"批量评估失败，改为直接评估: {str(e)}")
+        with self._stats_lock:
+            self.fallbacks += 1
+        return self.service.assess_loan_application(application_data)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            stopping = False
+            with self._stats_lock:
+                idle = self._in_flight <= 1
+            if idle:
+                # 没有其他请求可以合并，不等待合并窗口
+                with self._stats_lock:
+                    self.immediate_batches += 1
+                self._dispatch(batch)
+                continue
+
+            # 在窗口期内继续收集请求，凑满一批立即处理
+            deadline = time.monotonic() + self.window_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch):
+        """对一批请求统一评估并分发结果"""
+        with self._stats_lock:
+            self._in_flight -= len(batch)
+        pending = [(data, future) for data, future in batch if future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+        try:
+            results = self.service.assess_loan_applications([data for data, _ in pending])
+        except Exception as e:
+            self.logger.error(f"批量评估失败，改为逐条评估: {str(e)}")
+            results = None
+        if results is not None:
+            for (_, future), result in zip(pending, results):
+                future.set_result(result)
+        else:
+            # 逐条评估，一条请求出错不影响同批的其他请求
+            for data, future in pending:
+                try:
+                    future.set_result(self.service.assess_loan_application(data))
+                except Exception as e:
+                    future.set_exception(e)
+
+        with self._stats_lock:
+            if results is None:
+                self.split_batches += 1
+            size = len(pending)
+            self.batches += 1
+            self.batched_rows += size
+            self.last_batch_size = size
+            bucket = 1
+            while bucket < size:
+                bucket *= 2
+            self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+
+    def stats(self):
+        """获取合并器统计信息"""
+        with self._stats_lock:
+            return {
+                'window_ms': self.window_ms,
+                'max_batch_size': self.max_batch_size,
+                'queue_depth': self._queue.qsize(),
+                'in_flight': self._in_flight,
+                'max_queue_depth': self.max_queue_depth,
+                'requests': self.requests,
+                'batches': self.batches,
+                'fallbacks': self.fallbacks,
+                'immediate_batches': self.immediate_batches,
+                'split_batches': self.split_batches,
+                'last_batch_size': self.last_batch_size,
+                'avg_batch_size': round(self.batched_rows / self.batches, 2) if self.batches else 0.0,
+                # 键为批大小的上界（2 的幂）
+                'batch_size_histogram': {f'<={k}': v for k, v in sorted(self.batch_size_histogram.items())}
+            }
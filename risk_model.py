@@ -15,8 +15,9 @@ class RiskAssessment:
         model_path = 'models/risk_model.pkl'
         scaler_path = 'models/scaler.pkl'
         if os.path.exists(model_path) and os.path.exists(scaler_path):
-            self.model = joblib.load(model_path)
-            self.scaler = joblib.load(scaler_path)
+            # 以只读内存映射方式加载其中的 numpy 数组，多个 worker 共享同一份页缓存
+            self.model = joblib.load(model_path, mmap_mode='r')
+            self.scaler = joblib.load(scaler_path, mmap_mode='r')
         else:
             self.train_model()
             
@@ -0,0 +1,121 @@
+"""定时任务的单进程选主
+
+同一台机器上的多个进程（gunicorn 的多个 worker、flask 命令行）导入 app 时都会尝试成为定时任务的 leader：
+对锁文件加非阻塞的 fcntl 排他锁，拿到锁的进程启动调度器，其余进程每隔 retry_seconds 秒重试一次。
+锁由操作系统在进程退出（包括被杀死）时释放，leader 退出后下一个重试成功的进程自动接管。
+锁文件中写入 leader 的 pid，便于排查。
+
+没有 fcntl 的平台（Windows）上不做选主，直接视为 leader。
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_LOCK_PATH = 'scheduler.lock'
+DEFAULT_RETRY_SECONDS = 15
+
+
+class SchedulerLeader:
+    """用锁文件选出唯一运行定时任务的进程
+
+    当选时调用 on_elected（启动调度器）；stop() 放弃 leader 身份时先调用 on_demoted（停止调度器），
+    再释放锁，保证其他进程接管之前本进程的任务已经停止。
+    """
+
+    def __init__(self, on_elected, on_demoted=None, lock_path=DEFAULT_LOCK_PATH,
+                 retry_seconds=DEFAULT_RETRY_SECONDS):
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lock_path = lock_path
+        self.retry_seconds = retry_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self._file = None
+        self._leader_pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.elected_at = None
+        self.attempts = 0
+
+    @property
+    def is_leader(self):
+        # fork 出的子进程继承了锁文件描述符，但不是 leader
+        return self._leader_pid == os.getpid()
+
+    def try_acquire(self):
+        """尝试获得锁，成为 leader 时返回 True（已经是 leader 时也返回 True）"""
+        if self.is_leader:
+            return True
+        self.attempts += 1
+        if fcntl is not None:
+            lock_file = open(self.lock_path, 'a+')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            lock_file.seek(0)
+            lock_file.truncate()
+            lock_file.write(f'{os.getpid()}\n')
+            lock_file.flush()
+            self._file = lock_file
+        self._leader_pid = os.getpid()
+        self.elected_at = datetime.utcnow()
+        self.logger.info("进程 %d 成为定时任务 leader", os.getpid())
+        self.on_elected()
+        return True
+
+    def start(self):
+        """立即尝试一次，没有成功时在后台线程中定期重试"""
+        if self.try_acquire() or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler-leader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止重试；是 leader 时先停止定时任务，再释放锁"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.is_leader:
+            if self.on_demoted is not None:
+                self.on_demoted()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.logger.info("进程 %d 放弃定时任务 leader", os.getpid())
+        self._leader_pid = None
+
+    def _run(self):
+        while not self._stop.wait(self.retry_seconds):
+            try:
+                if self.try_acquire():
+                    return
+            except Exception:
+                self.logger.exception("定时任务选主失败")
+
+    def current_leader_pid(self):
+        """锁文件中记录的 leader pid"""
+        try:
+            with open(self.lock_path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'is_leader': self.is_leader,
+            'leader_pid': os.getpid() if self.is_leader else self.current_leader_pid(),
+            'elected_at': self.elected_at.isoformat() if self.is_leader and self.elected_at else None,
+            'attempts': self.attempts,
+            'lock_path': self.lock_path,
+        }
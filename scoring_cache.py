@@ -0,0 +1,97 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# 默认缓存容量和有效期（秒）
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL = 600
+
+
+def normalize_value(value):
+    """规范化单个输入值，使语义相同的输入得到相同的键"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # 5000 与 5000.0 参与计算时结果相同；超过 2**53 的整数保留原值以免丢失精度
+        if isinstance(value, int) and abs(value) >= 2 ** 53:
+            return value
+        return float(value)
+    return value
+
+
+def make_key(namespace, data, fields=None):
+    """根据规范化后的输入计算内容哈希键
+
+    只取 fields 中列出的字段（为 None 时取全部字段），缺失的字段不参与哈希，
+    与取值为 None 的字段区分开。
+    """
+    if fields is None:
+        fields = data.keys()
+    normalized = {field: normalize_value(data[field]) for field in fields if field in data}
+    payload = json.dumps([namespace, normalized], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TTLCache:
+    """线程安全的 LRU + TTL 缓存，记录命中、未命中和淘汰次数"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """查询缓存，返回 (是否命中, 值)；值为深拷贝，调用方修改不会影响缓存"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return True, copy.deepcopy(value)
+
+    def set(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
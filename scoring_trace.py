@@ -0,0 +1,144 @@
+import logging
+import random
+import threading
+import time
+
+# 直方图桶上界（微秒），按 2 的幂递增，最后一个桶收集所有更大的值
+BUCKET_BOUNDS_US = [2 ** i for i in range(25)]
+
+
+class Histogram:
+    """对数分桶的耗时直方图"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_US) + 1)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def record(self, elapsed_us):
+        index = 0
+        while index < len(BUCKET_BOUNDS_US) and elapsed_us > BUCKET_BOUNDS_US[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_us += elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+
+    def percentile(self, q):
+        """按桶上界估算分位数（微秒）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return float(BUCKET_BOUNDS_US[index]) if index < len(BUCKET_BOUNDS_US) else self.max_us
+        return self.max_us
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_us': round(self.total_us / self.count, 2) if self.count else 0.0,
+            'p50_us': self.percentile(0.5),
+            'p95_us': self.percentile(0.95),
+            'p99_us': self.percentile(0.99),
+            'max_us': round(self.max_us, 2),
+        }
+
+
+class _NullTimer:
+    """追踪关闭时使用的空计时器，所有方法都不做任何事"""
+    sampled = False
+
+    def mark(self, stage):
+        pass
+
+    def detail(self, label, value):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """一次评估的分阶段计时器"""
+
+    def __init__(self, tracer, prefix, sampled):
+        self.tracer = tracer
+        self.prefix = prefix
+        self.sampled = sampled
+        self.started = self.last = time.perf_counter()
+        self.details = [] if sampled else None
+
+    def mark(self, stage):
+        """记录从上一个阶段结束到现在的耗时"""
+        now = time.perf_counter()
+        self.tracer.record(f"{self.prefix}{stage}", (now - self.last) * 1e6)
+        self.last = now
+
+    def detail(self, label, value):
+        """记录采样请求的明细数据，只在 sampled 为 True 时保留"""
+        if self.sampled:
+            self.details.append((label, value))
+
+    def finish(self):
+        """记录总耗时，采样请求输出明细日志"""
+        elapsed_us = (time.perf_counter() - self.started) * 1e6
+        self.tracer.record(f"{self.prefix}total", elapsed_us)
+        if self.sampled:
+            self.tracer.logger.info("评估追踪 [%stotal %.1fus] %s", self.prefix, elapsed_us, self.details)
+
+
+class ScoringTracer:
+    """评分流程的分阶段追踪
+
+    关闭时 start() 返回空计时器，热路径上只剩几次空方法调用；开启后各阶段耗时写入进程内直方图，
+    并按 sample_rate 对少量请求输出输入、特征和分数等明细日志。
+    """
+
+    def __init__(self, enabled=False, sample_rate=0.0):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        # 作为 risk_assessment 的子日志记录器，采样明细随评估服务日志一起输出
+        self.logger = logging.getLogger('risk_assessment.trace')
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, sample_rate=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if sample_rate is not None:
+            self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+
+    def start(self, prefix=''):
+        """开始一次评估的计时"""
+        if not self.enabled:
+            return NULL_TIMER
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        return _Timer(self, prefix, sampled)
+
+    def record(self, stage, elapsed_us):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.record(elapsed_us)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def stats(self):
+        """获取各阶段耗时统计"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'sample_rate': self.sample_rate,
+                'stages': {stage: histogram.summary() for stage, histogram in sorted(self._histograms.items())}
+            }
@@ -0,0 +1,194 @@
+import logging
+import queue
+import random
+import threading
+
+import numpy as np
+
+# 评分模式：full 每次请求都运行模型（原有行为）；fast 只用显式公式计算，模型在后台影子运行
+SCORING_MODE_FULL = 'full'
+SCORING_MODE_FAST = 'fast'
+SCORING_MODES = (SCORING_MODE_FULL, SCORING_MODE_FAST)
+
+# 影子推理队列上限，队列满时直接丢弃样本，不阻塞请求线程
+DEFAULT_MAX_PENDING = 1000
+
+# 后台线程单次合并处理的最大行数
+DEFAULT_MAX_BATCH_ROWS = 256
+
+# 模型与公式分数差异的直方图桶上界（分）
+DIFF_BUCKETS = [5, 10, 20, 30, 50, 100]
+
+_STOP = object()
+
+
+class ShadowScorer:
+    """模型影子推理
+
+    快速模式下请求线程只计算显式公式，按 sample_rate 抽样把原始特征行放入队列，
+    由后台线程批量运行标准化和森林预测，统计模型与公式的差异。
+    两者都换算到评估结果使用的风险分数（0-100，越高风险越大）：
+    公式风险分数为 100 - 显式公式分数，模型风险分数为 100 * P(类别 1)。
+    """
+
+    def __init__(self, risk_level, sample_rate=0.0, max_pending=DEFAULT_MAX_PENDING,
+                 max_batch_rows=DEFAULT_MAX_BATCH_ROWS):
+        self.risk_level = risk_level
+        self.sample_rate = sample_rate
+        self.max_batch_rows = max_batch_rows
+        self.logger = logging.getLogger('risk_assessment.shadow')
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reset()
+
+    def configure(self, sample_rate=None):
+        if sample_rate is not None:
+            self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+
+    def reset(self):
+        """清空差异统计"""
+        with self._stats_lock:
+            self.submitted = 0
+            self.dropped = 0
+            self.errors = 0
+            self.compared = 0
+            self.level_agreements = 0
+            self.total_abs_diff = 0.0
+            self.max_abs_diff = 0.0
+            self.total_diff = 0.0
+            self.diff_histogram = [0] * (len(DIFF_BUCKETS) + 1)
+            self.level_confusion = {}
+            self.by_version = {}
+
+    def sample_mask(self, rows):
+        """按采样比例为一批记录生成布尔抽样掩码，不抽样时（包括采样比例被并发调为 0）返回全 False 的掩码"""
+        rate = self.sample_rate
+        if rate <= 0 or rows == 0:
+            return np.zeros(rows, dtype=bool)
+        if rows == 1:
+            return np.array([random.random() < rate])
+        return np.random.random(rows) < rate
+
+    def submit(self, model, scaler, model_version, X_raw, formula_scores):
+        """提交需要影子推理的特征行和对应的公式分数（请求线程调用，不阻塞）
+
+        model 和 scaler 在提交时确定，模型热更新后排队中的样本仍用提交时的模型比较。
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self._queue.put_nowait((model, scaler, model_version, X_raw, formula_scores))
+            counter = 'submitted'
+        except queue.Full:
+            counter = 'dropped'
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + len(X_raw))
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """处理完队列中剩余的样本后停止后台线程"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            # 合并队列中同一模型的样本，减少预测调用次数
+            items = [item]
+            rows = len(item[3])
+            stopping = False
+            while rows < self.max_batch_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                items.append(item)
+                rows += len(item[3])
+            self._process(items)
+            if stopping:
+                return
+
+    def _process(self, items):
+        groups = {}
+        for model, scaler, model_version, X_raw, formula_scores in items:
+            group = groups.setdefault(id(model), (model, scaler, model_version, [], []))
+            group[3].append(X_raw)
+            group[4].append(formula_scores)
+
+        for model, scaler, model_version, matrices, scores in groups.values():
+            try:
+                X_raw = np.vstack(matrices)
+                formula_risk = 100 - np.concatenate(scores).astype(np.float64)
+                if hasattr(scaler, 'mean_') and hasattr(scaler, 'scale_'):
+                    X = (X_raw - scaler.mean_) / scaler.scale_
+                else:
+                    X = scaler.transform(X_raw)
+                model_risk = model.predict_proba(X)[:, 1] * 100
+                self._record(model_version, formula_risk, model_risk)
+            except Exception as e:
+                self.logger.error("影子推理出错: %s", e)
+                with self._stats_lock:
+                    self.errors += sum(len(m) for m in matrices)
+
+    def _record(self, model_version, formula_risk, model_risk):
+        diff = model_risk - formula_risk
+        abs_diff = np.abs(diff)
+        buckets = np.searchsorted(DIFF_BUCKETS, abs_diff, side='left')
+        formula_levels = [self.risk_level(score) for score in formula_risk]
+        model_levels = [self.risk_level(score) for score in model_risk]
+        with self._stats_lock:
+            self.compared += len(diff)
+            self.total_diff += float(diff.sum())
+            self.total_abs_diff += float(abs_diff.sum())
+            self.max_abs_diff = max(self.max_abs_diff, float(abs_diff.max()))
+            for bucket in buckets:
+                self.diff_histogram[bucket] += 1
+            for formula_level, model_level in zip(formula_levels, model_levels):
+                if formula_level == model_level:
+                    self.level_agreements += 1
+                key = f'{formula_level}->{model_level}'
+                self.level_confusion[key] = self.level_confusion.get(key, 0) + 1
+            version = self.by_version.setdefault(str(model_version), {'compared': 0, 'level_agreements': 0})
+            version['compared'] += len(diff)
+            version['level_agreements'] += sum(f == m for f, m in zip(formula_levels, model_levels))
+
+    def stats(self):
+        """获取影子推理的差异统计"""
+        with self._stats_lock:
+            compared = self.compared
+            labels = [f'<={bound}' for bound in DIFF_BUCKETS] + [f'>{DIFF_BUCKETS[-1]}']
+            return {
+                'sample_rate': self.sample_rate,
+                'queue_depth': self._queue.qsize(),
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'compared': compared,
+                'level_agreement_rate': round(self.level_agreements / compared, 4) if compared else None,
+                'mean_diff': round(self.total_diff / compared, 4) if compared else None,
+                'mean_abs_diff': round(self.total_abs_diff / compared, 4) if compared else None,
+                'max_abs_diff': round(self.max_abs_diff, 4),
+                'abs_diff_histogram': dict(zip(labels, self.diff_histogram)),
+                # 键为 公式风险等级->模型风险等级
+                'level_confusion': dict(sorted(self.level_confusion.items())),
+                'by_model_version': {
+                    version: dict(counts, level_agreement_rate=round(counts['level_agreements'] / counts['compared'], 4))
+                    for version, counts in self.by_version.items()
+                }
+            }
@@ -0,0 +1,129 @@
+"""分片并行生成大规模模拟贷款数据，用于压力测试
+
+用法：
+    python synthetic_data.py --rows 10000000 --shards 32 --workers 8 --output data/synthetic_10m
+
+数据按分片生成：分片 i 使用以 (seed, i) 初始化的独立随机数生成器，按固定块大小逐块生成并追加写入
+按列存储的数据集（columnar_store），内存占用只取决于块大小。同一 seed、分片数、行数和块大小下，
+每个分片的内容与 worker 数量和调度顺序无关。已写完的分片（存在 manifest）再次运行时跳过。
+分布和衍生特征与 mock_data.generate_training_data 相同。
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from columnar_store import ColumnarWriter, ColumnarTable, ColumnarError, category, write_sharded_manifest
+from mock_data import (generate_training_columns, MARITAL_STATUS, EDUCATION, EMPLOYMENT_STATUS,
+                       HOME_OWNERSHIP, LOAN_PURPOSE, PREVIOUS_DEFAULT)
+
+DEFAULT_CHUNK_SIZE = 100000
+DEFAULT_SEED = 42
+
+# 生成数据的列类型：整数列按取值范围选最小类型，分类列字典编码
+SCHEMA = {
+    'age': 'int8',
+    'employment_years': 'int8',
+    'annual_income': 'int32',
+    'monthly_income': 'float64',
+    'savings_balance': 'int32',
+    'total_assets': 'int32',
+    'total_liabilities': 'int32',
+    'credit_cards': 'int8',
+    'existing_loans': 'int32',
+    'monthly_payment': 'int32',
+    'loan_amount': 'float64',
+    'loan_term': 'int8',
+    'dependents': 'int8',
+    'marital_status': category(MARITAL_STATUS[0]),
+    'education': category(EDUCATION[0]),
+    'employment_status': category(EMPLOYMENT_STATUS[0]),
+    'home_ownership': category(HOME_OWNERSHIP[0]),
+    'loan_purpose': category(LOAN_PURPOSE[0]),
+    'previous_default': category(PREVIOUS_DEFAULT[0]),
+    'debt_to_income': 'float64',
+    'new_loan_payment_ratio': 'float64',
+    'new_loan_payment_ratio_binned': 'int8',
+    'ratio_times_debt': 'float64',
+    'risk_score': 'float64',
+    'loan_approved': 'int8',
+}
+
+
+def shard_rows(total_rows, shards):
+    """把总行数尽量均匀地分到各分片"""
+    base, extra = divmod(total_rows, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def iter_shard_chunks(shard, rows, seed=DEFAULT_SEED, chunk_size=DEFAULT_CHUNK_SIZE):
+    """逐块生成一个分片的数据，每块为 {列名: 数组}"""
+    rng = np.random.default_rng([seed, shard])
+    remaining = rows
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        yield generate_training_columns(n, rng)
+        remaining -= n
+
+
+def shard_name(shard):
+    return f'shard-{shard:05d}'
+
+
+def write_shard(output, shard, rows, seed, chunk_size):
+    """生成并写入一个分片，已完整存在时跳过"""
+    path = os.path.join(output, shard_name(shard))
+    metadata = {'shard': shard, 'seed': seed, 'chunk_size': chunk_size}
+    try:
+        table = ColumnarTable(path)
+        if table.rows == rows and table.manifest['metadata'] == metadata:
+            return shard, rows, 0.0, True
+    except ColumnarError:
+        pass
+
+    start = time.perf_counter()
+    with ColumnarWriter(path, SCHEMA, metadata=metadata) as writer:
+        for columns in iter_shard_chunks(shard, rows, seed, chunk_size):
+            writer.write(columns)
+    return shard, rows, time.perf_counter() - start, False
+
+
+def generate_dataset(output, rows, shards, workers=None, seed=DEFAULT_SEED, chunk_size=DEFAULT_CHUNK_SIZE):
+    """在进程池中并行生成所有分片，完成后写入顶层 manifest"""
+    os.makedirs(output, exist_ok=True)
+    counts = shard_rows(rows, shards)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(write_shard, output, shard, count, seed, chunk_size)
+                   for shard, count in enumerate(counts)]
+        for future in as_completed(futures):
+            shard, count, seconds, skipped = future.result()
+            if skipped:
+                print(f"分片 {shard} 已存在，跳过")
+            else:
+                print(f"分片 {shard} 完成：{count} 行，{seconds:.1f}s，{count / max(seconds, 1e-9):.0f} 行/秒")
+
+    write_sharded_manifest(output, [shard_name(shard) for shard in range(shards)],
+                           metadata={'seed': seed, 'chunk_size': chunk_size, 'rows': rows})
+    elapsed = time.perf_counter() - start
+    print(f"共生成 {rows} 行，{shards} 个分片，耗时 {elapsed:.1f}s，输出到 {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分片并行生成模拟贷款数据')
+    parser.add_argument('--rows', type=int, required=True, help='总行数')
+    parser.add_argument('--shards', type=int, default=16, help='分片数')
+    parser.add_argument('--workers', type=int, help='并行进程数，默认等于 CPU 核数')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每块行数，决定内存占用')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='随机种子')
+    parser.add_argument('--output', required=True, help='输出目录')
+    args = parser.parse_args()
+
+    generate_dataset(args.output, args.rows, args.shards, workers=args.workers,
+                     seed=args.seed, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
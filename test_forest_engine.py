@@ -0,0 +1,53 @@
+# 森林数组推理引擎与 sklearn predict_proba 的一致性测试
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from tree_engine import ForestEngine, save_forest, load_forest
+
+
+def test_forest_parity():
+    with open('risk_assessment_model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    with open('risk_assessment_scaler.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+
+    # 按训练时的方式对 loan_data.csv 做独热编码和标准化
+    df = pd.read_csv('loan_data.csv')
+    categorical_features = ['education', 'employment_status', 'marital_status',
+                            'home_ownership', 'loan_purpose', 'previous_default']
+    X = pd.get_dummies(df.drop(['risk_score', 'loan_approved'], axis=1), columns=categorical_features)
+    X = X.reindex(columns=model.feature_names_in_.tolist(), fill_value=0)
+    X_scaled = scaler.transform(X)
+
+    expected = model.predict_proba(X_scaled)
+
+    # 直接从模型导出
+    engine = ForestEngine.from_sklearn(model)
+    assert np.array_equal(engine.predict_proba(X_scaled), expected)
+
+    # 保存后重新加载
+    workdir = tempfile.mkdtemp(prefix='test_forest_engine_')
+    try:
+        forest_path = os.path.join(workdir, 'forest_parity_test.npz')
+        save_forest(engine, forest_path, scaler)
+        loaded, loaded_scaler = load_forest(forest_path)
+    finally:
+        shutil.rmtree(workdir)
+    assert np.array_equal(loaded_scaler.transform(X), X_scaled)
+    assert np.array_equal(loaded.predict_proba(X_scaled), expected)
+    assert loaded.feature_names_in_.tolist() == model.feature_names_in_.tolist()
+
+    # 逐行预测与整批预测一致
+    for i in range(0, len(X_scaled), 997):
+        assert np.array_equal(loaded.predict_proba(X_scaled[i:i + 1]), expected[i:i + 1])
+
+    print(f"一致性测试通过，共 {len(X_scaled)} 条样本")
+
+
+if __name__ == "__main__":
+    test_forest_parity()
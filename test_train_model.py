@@ -0,0 +1,62 @@
+# 模型搜索选中逻辑回归时，导出的模型文件能发布到模型目录并正确加载
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from linear_engine import LinearEngine
+from model_artifact import ARTIFACT_PATH, load_artifact
+from model_registry import ModelRegistry
+from train_model import SERVABLE_FAMILIES, build_candidates, publish_model, select_model
+
+
+def test_logistic_winner_is_published():
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(2000, 5))
+    y = (X @ np.array([1.5, -2.0, 0.5, 0.0, 1.0]) + rng.normal(size=2000) > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    name, family, params = next(c for c in build_candidates(['logistic']))
+    model = LogisticRegression(**params).fit(X_scaled, y)
+    expected = model.predict_proba(X_scaled)
+    # 与训练流程相同，发布前给模型设置特征名称
+    model.feature_names_in_ = np.array([f'f{i}' for i in range(X.shape[1])], dtype=object)
+
+    # 逻辑回归的 AUC 最高且在延迟预算内，应被选中
+    results = [
+        {'name': 'forest', 'family': 'forest', 'servable': 'forest' in SERVABLE_FAMILIES,
+         'cv': {'roc_auc': 0.80}, 'latency': {'single_p99_ms': 1.0}},
+        {'name': name, 'family': family, 'servable': family in SERVABLE_FAMILIES,
+         'cv': {'roc_auc': 0.90}, 'latency': {'single_p99_ms': 0.1}},
+    ]
+    best = select_model(results, latency_budget_ms=5.0)
+    assert best['family'] == 'logistic'
+
+    # 发布只写入模型目录，服务端直接加载的模型文件不变
+    served_mtime = os.stat(ARTIFACT_PATH).st_mtime_ns
+    workdir = tempfile.mkdtemp(prefix='test_train_model_')
+    try:
+        registry = ModelRegistry(root=os.path.join(workdir, 'registry'))
+        version = publish_model(best['family'], model, scaler, registry=registry)
+        assert registry.active_version() is None
+        assert os.stat(ARTIFACT_PATH).st_mtime_ns == served_mtime
+        engine, loaded_scaler, header = load_artifact(registry.path_for(version))
+
+        assert isinstance(engine, LinearEngine)
+        assert header['model_version'] == version
+        assert engine.feature_names_in_.tolist() == model.feature_names_in_.tolist()
+        assert np.allclose(loaded_scaler.transform(X), X_scaled)
+        assert np.allclose(engine.predict_proba(X_scaled), expected)
+        assert np.array_equal(engine.predict(X_scaled), expected.argmax(axis=1))
+        del engine, loaded_scaler
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"逻辑回归发布测试通过，版本: {version}")
+
+
+if __name__ == "__main__":
+    test_logistic_winner_is_published()
@@ -1,79 +1,488 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
+from sklearn.metrics import accuracy_score, classification_report, roc_auc_score, log_loss, f1_score
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import itertools
+import json
 import pickle
 import os
+import time
 from mock_data import generate_training_data
+from feature_cache import load_feature_matrix, FEATURE_SPEC
+from feature_layout import CATEGORICAL_FEATURES
+from columnar_store import open_dataset, MANIFEST
+from linear_engine import LinearEngine
+from model_registry import ModelRegistry, REGISTRY_DIR
+from tree_engine import ForestEngine
 
-def train_and_evaluate_model():
-    """训练并评估风险评估模型"""
+# 默认的单条推理延迟预算（毫秒，p99），超出预算的候选模型不会被选中
+DEFAULT_LATENCY_BUDGET_MS = 5.0
+DEFAULT_FOLDS = 5
+REPORT_PATH = 'training_report.json'
+
+# 流式训练的默认参数
+STREAMING_CHUNK_SIZE = 50000
+STREAMING_EPOCHS = 3
+STREAMING_SGD_PARAMS = {'loss': 'log_loss', 'alpha': 1e-4, 'random_state': 42}
+# 流式评估时 ROC AUC 按概率分桶近似计算，桶数决定精度
+AUC_BINS = 1000
+
+# 候选模型族及其超参数网格
+SEARCH_SPACE = {
+    'forest': (RandomForestClassifier, {
+        'n_estimators': [100, 200],
+        'max_depth': [6, 8, 12],
+        'min_samples_split': [20],
+        'min_samples_leaf': [10],
+        'max_features': ['sqrt'],
+        'random_state': [42],
+    }),
+    'gradient_boosting': (GradientBoostingClassifier, {
+        'n_estimators': [100, 200],
+        'learning_rate': [0.05, 0.1],
+        'max_depth': [3],
+        'random_state': [42],
+    }),
+    'logistic': (LogisticRegression, {
+        'C': [0.1, 1.0, 10.0],
+        'max_iter': [1000],
+    }),
+}
+
+# 服务端能加载的模型族：随机森林导出为扁平数组，逻辑回归导出为系数（见 export_engine），其他模型族只参与比较
+SERVABLE_FAMILIES = {'forest', 'logistic'}
+
+# 进程池 worker 中共享的训练矩阵（内存映射打开，不随任务复制）
+_shared = {}
+
+
+def build_candidates(families=None):
+    """展开超参数网格，返回 [(名称, 模型族, 参数)]"""
+    candidates = []
+    for family, (_, grid) in SEARCH_SPACE.items():
+        if families and family not in families:
+            continue
+        keys = sorted(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            params = dict(zip(keys, values))
+            tuned = {k: v for k, v in params.items() if len(grid[k]) > 1}
+            name = family + ''.join(f'[{k}={v}]' for k, v in tuned.items())
+            candidates.append((name, family, params))
+    return candidates
+
+
+def make_model(family, params):
+    cls = SEARCH_SPACE[family][0]
+    return cls(**params)
+
+
+def _init_worker(matrix_dir):
+    """worker 初始化：以只读内存映射打开共享矩阵"""
+    for name in ('X', 'y', 'w'):
+        _shared[name] = np.load(os.path.join(matrix_dir, f'{name}.npy'), mmap_mode='r')
+
+
+def _evaluate_fold(family, params, train_index, val_index, keep_model=False):
+    """在一个交叉验证折上训练并评估，返回指标和训练耗时；keep_model 为 True 时同时返回该折的模型"""
+    X, y, w = _shared['X'], _shared['y'], _shared['w']
+    model = make_model(family, params)
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index], sample_weight=w[train_index])
+    fit_seconds = time.perf_counter() - start
+    prob = model.predict_proba(X[val_index])[:, 1]
+    result = {
+        'fit_seconds': fit_seconds,
+        'roc_auc': roc_auc_score(y[val_index], prob, sample_weight=w[val_index]),
+        'log_loss': log_loss(y[val_index], prob, sample_weight=w[val_index], labels=[0, 1]),
+        'accuracy': accuracy_score(y[val_index], prob >= 0.5, sample_weight=w[val_index]),
+        'f1': f1_score(y[val_index], prob >= 0.5, sample_weight=w[val_index], zero_division=0),
+    }
+    if keep_model:
+        result['model'] = model
+    return result
+
+
+def fit_full(family, params, X, y, w):
+    """在完整训练集上训练最终模型，返回模型和训练耗时"""
+    model = make_model(family, params)
+    start = time.perf_counter()
+    model.fit(np.asarray(X), np.asarray(y), sample_weight=np.asarray(w))
+    return model, time.perf_counter() - start
+
+
+def export_engine(family, model):
+    """把服务端可加载的模型转换为写入模型文件的推理引擎"""
+    if family == 'forest':
+        return ForestEngine.from_sklearn(model)
+    if family == 'logistic':
+        return LinearEngine.from_sklearn(model)
+    raise ValueError(f"模型族 {family} 无法导出为模型文件")
+
+
+def serving_predictor(family, model):
+    """返回服务端实际使用的预测函数：可导出的模型按推理引擎评估，其他模型直接调用"""
+    if family in SERVABLE_FAMILIES:
+        return export_engine(family, model).predict_proba
+    return model.predict_proba
+
+
+def publish_model(family, model, scaler, registry=None, activate=False):
+    """把模型导出为模型文件并发布到版本化模型目录，返回模型版本号
+
+    model 需要已设置 feature_names_in_。只写入模型目录，不覆盖服务端直接加载的 risk_assessment_model.bin；
+    默认不切换生效版本，确认后用 model_registry.py activate 上线。
+    """
+    return (registry or ModelRegistry()).publish(export_engine(family, model), scaler, activate=activate)
+
+
+def measure_latency(predict, X, single_rows=200, batch_size=256, repeat=5):
+    """测量单条推理延迟分位数和批量吞吐量"""
+    latencies = []
+    for i in range(single_rows):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        predict(row)
+        latencies.append(time.perf_counter() - start)
+    batch = X[:batch_size]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        predict(batch)
+    batch_seconds = (time.perf_counter() - start) / repeat
+    return {
+        'single_p50_ms': float(np.percentile(latencies, 50)) * 1000,
+        'single_p99_ms': float(np.percentile(latencies, 99)) * 1000,
+        'batch_rows_per_second': len(batch) / batch_seconds,
+    }
+
+
+def select_model(results, latency_budget_ms):
+    """在延迟预算内、服务端可加载的候选中选 ROC AUC 最高的；都超出预算时选最快的"""
+    servable = [r for r in results if r['servable']]
+    if not servable:
+        raise ValueError(f"候选模型中没有服务端可加载的模型族: {sorted(SERVABLE_FAMILIES)}")
+    within = [r for r in servable if r['latency']['single_p99_ms'] <= latency_budget_ms]
+    if within:
+        return max(within, key=lambda r: r['cv']['roc_auc'])
+    print(f"警告: 没有候选模型满足 {latency_budget_ms}ms 的延迟预算，选择延迟最低的模型")
+    return min(servable, key=lambda r: r['latency']['single_p99_ms'])
+
+
+def train_and_evaluate_model(workers=None, folds=DEFAULT_FOLDS, latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS,
+                             families=None, report_path=REPORT_PATH):
+    """搜索模型族和超参数，训练并评估风险评估模型
+
+    所有候选模型共用一份标准化后的训练矩阵：矩阵来自特征缓存目录，进程池中的 worker 以内存映射方式读取，
+    每个 (候选, 折) 组合作为一个任务并行执行。候选模型的测试集指标和推理延迟用第一折训练的模型测量，
+    只有选中的候选在完整训练集上重新训练。训练时传入 sample_weights。
+    """
     # 生成训练数据
     print("正在生成训练数据...")
     df = generate_training_data(num_samples=10000)
-    
-    # 准备特征
+
+    # 准备特征：独热编码、划分数据集和标准化的结果按数据内容缓存，数据和特征规格不变时直接映射
     print("正在准备特征...")
-    categorical_features = ['education', 'employment_status', 'marital_status', 
-                          'home_ownership', 'loan_purpose', 'previous_default']
-    
-    # 对分类特征进行独热编码
-    X = pd.get_dummies(df.drop(['risk_score', 'loan_approved'], axis=1), 
-                      columns=categorical_features)
-    
-    # 保存特征名称
-    feature_names = X.columns.tolist()
+    features = load_feature_matrix(df)
+    print(f"特征矩阵{'命中缓存' if features.cached else '已重新构建'}: {features.path}")
+    feature_names = features.feature_names
     print(f"特征名称: {feature_names}")
-    
-    # 准备目标变量
-    y = df['loan_approved']
-
-    sample_weights = np.ones(len(y))
-    sample_weights[df['new_loan_payment_ratio'] > 0.5] *= 2
-    
-    # 分割训练集和测试集
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # 标准化特征
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    # 训练随机森林模型
-    print("正在训练模型...")
-    model = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=8,
-        min_samples_split=20,
-        min_samples_leaf=10,
-        max_features='sqrt',
-        random_state=42
-    )
-    model.fit(X_train_scaled, y_train)
-    
-    # 评估模型
-    train_score = model.score(X_train_scaled, y_train)
-    test_score = model.score(X_test_scaled, y_test)
-    print(f"模型训练集准确率: {train_score:.4f}")
-    print(f"模型测试集准确率: {test_score:.4f}")
-    
+
+    X_train_scaled, y_train, w_train = features.X_train, features.y_train, features.w_train
+    X_test_scaled, y_test, w_test = features.X_test, features.y_test, features.w_test
+    scaler = features.scaler
+
+    candidates = build_candidates(families)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(X_train_scaled, y_train))
+    print(f"正在搜索 {len(candidates)} 个候选模型（{folds} 折交叉验证，{workers or os.cpu_count()} 个进程）...")
+
+    search_start = time.perf_counter()
+    # worker 直接以内存映射方式打开缓存目录中的训练矩阵
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features.path,)) as pool:
+        # 交叉验证：每个 (候选, 折) 一个任务，第一折的模型返回主进程用于测量测试集指标和推理延迟
+        fold_futures = {
+            pool.submit(_evaluate_fold, family, params, train_index, val_index, keep_model=fold == 0): name
+            for name, family, params in candidates
+            for fold, (train_index, val_index) in enumerate(splits)
+        }
+
+        fold_results = {name: [] for name, _, _ in candidates}
+        fold_models = {}
+        for future in as_completed(fold_futures):
+            name = fold_futures[future]
+            result = future.result()
+            if 'model' in result:
+                fold_models[name] = result.pop('model')
+            fold_results[name].append(result)
+    search_seconds = time.perf_counter() - search_start
+
+    # 在主进程中依次测量推理延迟，避免与训练任务争用 CPU
+    results = []
+    for name, family, params in candidates:
+        model = fold_models[name]
+        folds_metrics = fold_results[name]
+        cv = {metric: float(np.mean([m[metric] for m in folds_metrics]))
+              for metric in ('roc_auc', 'log_loss', 'accuracy', 'f1')}
+        test_prob = model.predict_proba(X_test_scaled)[:, 1]
+        results.append({
+            'name': name,
+            'family': family,
+            'params': params,
+            'servable': family in SERVABLE_FAMILIES,
+            'cv': cv,
+            'test': {
+                'roc_auc': float(roc_auc_score(y_test, test_prob, sample_weight=w_test)),
+                'accuracy': float(accuracy_score(y_test, test_prob >= 0.5, sample_weight=w_test)),
+            },
+            'cv_fit_seconds': float(sum(m['fit_seconds'] for m in folds_metrics)),
+            'latency': measure_latency(serving_predictor(family, model), X_test_scaled),
+            'model': model,
+        })
+
+    print(f"\n搜索耗时 {search_seconds:.1f}s")
+    print(f"{'候选模型':<60} {'CV AUC':>7} {'测试AUC':>7} {'训练s':>7} {'p99ms':>7} {'批量条/秒':>10}")
+    for r in sorted(results, key=lambda r: -r['cv']['roc_auc']):
+        print(f"{r['name']:<60} {r['cv']['roc_auc']:>7.4f} {r['test']['roc_auc']:>7.4f} "
+              f"{r['cv_fit_seconds']:>7.2f} {r['latency']['single_p99_ms']:>7.3f} "
+              f"{r['latency']['batch_rows_per_second']:>10.0f}")
+
+    best = select_model(results, latency_budget_ms)
+    print(f"\n选中模型: {best['name']}（延迟预算 p99 <= {latency_budget_ms}ms），正在完整训练集上重新训练...")
+    model, full_fit_seconds = fit_full(best['family'], best['params'], X_train_scaled, y_train, w_train)
+    test_prob = model.predict_proba(X_test_scaled)[:, 1]
+    selected_test = {
+        'roc_auc': float(roc_auc_score(y_test, test_prob, sample_weight=w_test)),
+        'accuracy': float(accuracy_score(y_test, test_prob >= 0.5, sample_weight=w_test)),
+    }
+    print(f"重新训练耗时 {full_fit_seconds:.2f}s，测试集 ROC AUC {selected_test['roc_auc']:.4f}")
+    print(classification_report(y_test, model.predict(X_test_scaled)))
+
+    with open(report_path, 'w') as f:
+        json.dump({
+            'search_seconds': search_seconds,
+            'folds': folds,
+            'latency_budget_ms': latency_budget_ms,
+            'selected': best['name'],
+            'selected_full_fit_seconds': full_fit_seconds,
+            'selected_test': selected_test,
+            'candidates': [{k: v for k, v in r.items() if k != 'model'} for r in results],
+        }, f, indent=2, ensure_ascii=False)
+    print(f"训练报告已写入 {report_path}")
+
     # 保存特征名称
-    model.feature_names_in_ = X.columns
-    
+    model.feature_names_in_ = np.array(feature_names, dtype=object)
+
     # 保存模型和标准化器
     print("正在保存模型...")
     with open('risk_assessment_model.pkl', 'wb') as f:
         pickle.dump(model, f)
-    
+
     with open('risk_assessment_scaler.pkl', 'wb') as f:
         pickle.dump(scaler, f)
-    
+
     print("模型和标准化器已保存")
-    
+
+    # 导出可内存映射的单文件模型并发布到版本化模型目录（不切换生效版本），确认后用 model_registry.py activate 上线
+    model_version = publish_model(best['family'], model, scaler)
+    print(f"已发布到模型目录 {REGISTRY_DIR}，版本: {model_version}，"
+          f"上线: python model_registry.py activate {model_version}")
+
     return model, scaler, feature_names
 
+def iter_training_chunks(data_path, chunk_size):
+    """按块读取训练数据：目录视为按列存储的数据集（synthetic_data / loan_data_store 的输出），否则视为 CSV"""
+    if os.path.exists(os.path.join(data_path, MANIFEST)):
+        yield from open_dataset(data_path).iter_chunks(chunk_size)
+    else:
+        yield from pd.read_csv(data_path, chunksize=chunk_size)
+
+
+class ChunkEncoder:
+    """把一块原始数据编码为特征矩阵，列顺序与批量训练时 pd.get_dummies 的结果相同
+
+    分类列的取值集合固定（feature_layout.CATEGORICAL_FEATURES），某一块缺少某个取值时独热列仍然存在。
+    """
+
+    def __init__(self, columns, spec=FEATURE_SPEC):
+        self.spec = spec
+        categorical = spec['categorical_features']
+        self.numeric_columns = [c for c in columns if c not in spec['drop'] and c not in categorical]
+        self.categories = {field: sorted(CATEGORICAL_FEATURES[field]) for field in categorical}
+        self.feature_names = list(self.numeric_columns)
+        for field, values in self.categories.items():
+            self.feature_names.extend(f'{field}_{v}' for v in values)
+
+    def transform(self, chunk):
+        """返回 (X, y, w)：特征矩阵、标签和样本权重"""
+        n = len(chunk)
+        X = np.zeros((n, len(self.feature_names)), dtype=np.float64)
+        for i, name in enumerate(self.numeric_columns):
+            X[:, i] = chunk[name].to_numpy(dtype=np.float64)
+        offset = len(self.numeric_columns)
+        rows = np.arange(n)
+        for field, values in self.categories.items():
+            codes = pd.Categorical(np.asarray(chunk[field], dtype=object), categories=values).codes
+            known = codes >= 0
+            X[rows[known], offset + codes[known]] = 1.0
+            offset += len(values)
+
+        rule = self.spec['weight_rule']
+        w = np.ones(n)
+        w[chunk[rule['column']].to_numpy() > rule['threshold']] *= rule['factor']
+        y = chunk[self.spec['target']].to_numpy(dtype=np.int64)
+        return X, y, w
+
+
+def holdout_mask(chunk_index, n, spec=FEATURE_SPEC):
+    """按块确定留出的测试样本，同一块在每一遍读取中得到相同的划分"""
+    rng = np.random.default_rng([spec['random_state'], chunk_index])
+    return rng.random(n) < spec['test_size']
+
+
+class StreamingMetrics:
+    """逐块累计加权的评估指标，内存占用与样本数无关"""
+
+    def __init__(self, bins=AUC_BINS):
+        self.bins = bins
+        self.positive = np.zeros(bins)
+        self.negative = np.zeros(bins)
+        self.log_loss_sum = 0.0
+        self.correct = 0.0
+        self.weight = 0.0
+
+    def update(self, y, prob, w):
+        index = np.minimum((prob * self.bins).astype(int), self.bins - 1)
+        self.positive += np.bincount(index, weights=w * (y == 1), minlength=self.bins)
+        self.negative += np.bincount(index, weights=w * (y == 0), minlength=self.bins)
+        clipped = np.clip(prob, 1e-15, 1 - 1e-15)
+        self.log_loss_sum -= float(np.sum(w * np.where(y == 1, np.log(clipped), np.log(1 - clipped))))
+        self.correct += float(np.sum(w * ((prob >= 0.5) == (y == 1))))
+        self.weight += float(np.sum(w))
+
+    def roc_auc(self):
+        """分桶近似的 ROC AUC：同一桶内的正负样本按各占一半计"""
+        total_pos, total_neg = self.positive.sum(), self.negative.sum()
+        if total_pos == 0 or total_neg == 0:
+            return float('nan')
+        positive_above = np.cumsum(self.positive[::-1])[::-1] - self.positive
+        return float(np.sum(self.negative * (positive_above + 0.5 * self.positive)) / (total_pos * total_neg))
+
+    def summary(self):
+        return {
+            'roc_auc': self.roc_auc(),
+            'log_loss': self.log_loss_sum / self.weight if self.weight else float('nan'),
+            'accuracy': self.correct / self.weight if self.weight else float('nan'),
+            'weight': self.weight,
+        }
+
+
+def peak_memory_mb():
+    """当前进程的峰值常驻内存（MB）"""
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def train_streaming(data_path, chunk_size=STREAMING_CHUNK_SIZE, epochs=STREAMING_EPOCHS,
+                    report_path=REPORT_PATH, activate=False):
+    """流式训练：逐块读取数据，内存占用只取决于块大小，与数据集大小无关
+
+    第一遍用 StandardScaler.partial_fit 逐块累计均值和方差；之后每一遍把各块标准化后打乱，
+    用 SGDClassifier.partial_fit（逻辑回归损失）逐块训练，训练时传入 sample_weights；
+    最后一遍结束后在留出的测试块上累计评估指标。线性模型只发布到模型目录，
+    用 model_registry.py activate（或 --activate）切换为生效版本后才由 RiskAssessmentService 加载。
+    """
+    start = time.perf_counter()
+    encoder = None
+    scaler = StandardScaler()
+    train_rows = test_rows = 0
+
+    print(f"第 1 遍：累计标准化统计量（{data_path}，每块 {chunk_size} 行）...")
+    for chunk_index, chunk in enumerate(iter_training_chunks(data_path, chunk_size)):
+        if encoder is None:
+            encoder = ChunkEncoder(chunk.columns)
+        X, _, _ = encoder.transform(chunk)
+        test = holdout_mask(chunk_index, len(X))
+        scaler.partial_fit(X[~test])
+        train_rows += int((~test).sum())
+        test_rows += int(test.sum())
+    if encoder is None or train_rows == 0:
+        raise ValueError(f"训练数据为空: {data_path}")
+    feature_names = encoder.feature_names
+    print(f"训练样本 {train_rows} 条，测试样本 {test_rows} 条，特征 {len(feature_names)} 个")
+
+    model = SGDClassifier(**STREAMING_SGD_PARAMS)
+    classes = np.array([0, 1])
+    rng = np.random.default_rng(FEATURE_SPEC['random_state'])
+    for epoch in range(epochs):
+        epoch_start = time.perf_counter()
+        for chunk_index, chunk in enumerate(iter_training_chunks(data_path, chunk_size)):
+            X, y, w = encoder.transform(chunk)
+            train = ~holdout_mask(chunk_index, len(X))
+            order = rng.permutation(np.flatnonzero(train))
+            model.partial_fit(scaler.transform(X[order]), y[order], classes=classes, sample_weight=w[order])
+        print(f"第 {epoch + 2} 遍：训练完成，耗时 {time.perf_counter() - epoch_start:.1f}s")
+
+    metrics = StreamingMetrics()
+    for chunk_index, chunk in enumerate(iter_training_chunks(data_path, chunk_size)):
+        X, y, w = encoder.transform(chunk)
+        test = holdout_mask(chunk_index, len(X))
+        if test.any():
+            metrics.update(y[test], model.predict_proba(scaler.transform(X[test]))[:, 1], w[test])
+    test_metrics = metrics.summary()
+    train_seconds = time.perf_counter() - start
+    print(f"测试集 ROC AUC {test_metrics['roc_auc']:.4f}，log loss {test_metrics['log_loss']:.4f}，"
+          f"准确率 {test_metrics['accuracy']:.4f}")
+    print(f"总耗时 {train_seconds:.1f}s，峰值内存 {peak_memory_mb():.0f}MB")
+
+    model.feature_names_in_ = np.array(feature_names, dtype=object)
+    # 只发布到模型目录，不覆盖服务端直接加载的模型文件；activate 为 True 时才切换生效版本
+    model_version = ModelRegistry().publish(LinearEngine.from_sklearn(model), scaler, activate=activate)
+    print(f"已发布到模型目录 {REGISTRY_DIR}，版本: {model_version}" +
+          ('' if activate else f"，上线: python model_registry.py activate {model_version}"))
+
+    with open(report_path, 'w') as f:
+        json.dump({
+            'mode': 'streaming',
+            'data_path': data_path,
+            'chunk_size': chunk_size,
+            'epochs': epochs,
+            'train_rows': train_rows,
+            'test_rows': test_rows,
+            'model': {'family': 'sgd_logistic', 'params': STREAMING_SGD_PARAMS},
+            'model_version': model_version,
+            'test': test_metrics,
+            'train_seconds': train_seconds,
+            'peak_memory_mb': peak_memory_mb(),
+        }, f, indent=2, ensure_ascii=False)
+    print(f"训练报告已写入 {report_path}")
+
+    return model, scaler, feature_names
+
+
 if __name__ == "__main__":
-    # 训练模型
-    model, scaler, feature_names = train_and_evaluate_model() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='训练风险评估模型')
+    parser.add_argument('--workers', type=int, help='并行进程数，默认等于 CPU 核数')
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS, help='交叉验证折数')
+    parser.add_argument('--latency-budget-ms', type=float, default=DEFAULT_LATENCY_BUDGET_MS,
+                        help='单条推理 p99 延迟预算（毫秒）')
+    parser.add_argument('--families', nargs='+', choices=list(SEARCH_SPACE), help='只搜索指定的模型族')
+    parser.add_argument('--report', default=REPORT_PATH, help='训练报告输出文件')
+    parser.add_argument('--streaming', metavar='DATA_PATH',
+                        help='流式训练：逐块读取 CSV 或按列存储的数据集目录，适用于超出内存的数据集')
+    parser.add_argument('--chunk-size', type=int, default=STREAMING_CHUNK_SIZE, help='流式训练每块行数')
+    parser.add_argument('--epochs', type=int, default=STREAMING_EPOCHS, help='流式训练遍历数据的轮数')
+    parser.add_argument('--activate', action='store_true', help='流式训练完成后直接切换为生效版本')
+    args = parser.parse_args()
+
+    if args.streaming:
+        model, scaler, feature_names = train_streaming(
+            args.streaming, chunk_size=args.chunk_size, epochs=args.epochs,
+            report_path=args.report, activate=args.activate)
+    else:
+        # 训练模型
+        model, scaler, feature_names = train_and_evaluate_model(
+            workers=args.workers, folds=args.folds, latency_budget_ms=args.latency_budget_ms,
+            families=args.families, report_path=args.report)
@@ -0,0 +1,166 @@
+import logging
+
+import numpy as np
+
+FOREST_PATH = 'risk_assessment_forest.npz'
+
+# sklearn 中叶子节点的子节点标记
+TREE_LEAF = -1
+
+
+class ScalerParams:
+    """标准化器参数，替代反序列化后的 StandardScaler，加载时无需导入 sklearn"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class ForestEngine:
+    """扁平数组表示的随机森林推理引擎
+
+    所有树的节点拼接为连续数组（特征下标、阈值、左右子节点、叶子概率），
+    叶子节点的左右子节点都指向自身，这样对一批样本可以同时推进所有树，
+    迭代 max_depth 次后每棵树都停在叶子上。结果与 RandomForestClassifier.predict_proba 一致。
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 classes, feature_names=None, chunk_size=1024, children=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        # 左右子节点交错存放，children[2 * i + go_right] 即为下一个节点
+        if children is None:
+            children = np.stack([np.asarray(left), np.asarray(right)], axis=1).ravel()
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+        self.left = self.children[0::2]
+        self.right = self.children[1::2]
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_estimators = len(self.roots)
+        self.chunk_size = chunk_size
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """把训练好的 RandomForestClassifier 导出为扁平数组"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == TREE_LEAF
+            own = np.arange(offset, offset + n, dtype=np.int32)
+
+            # 叶子节点指向自身，内部节点的子节点下标加上偏移量
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset))
+
+            # 叶子上的类别分布归一化为概率，与 DecisionTreeClassifier.predict_proba 相同
+            leaf_value = tree.value[:, 0, :]
+            normalizer = leaf_value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(leaf_value / normalizer)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots),
+            max_depth=max_depth,
+            classes=model.classes_,
+            feature_names=getattr(model, 'feature_names_in_', None)
+        )
+
+    def apply(self, X):
+        """返回每个样本在每棵树上到达的叶子节点，形状为 (n_samples, n_estimators)"""
+        # 与 sklearn 一致，先把输入转换为 float32 再和阈值比较
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_samples) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_samples, self.n_estimators)).copy()
+        for _ in range(self.max_depth):
+            go_right = flat_X.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(nodes * 2 + go_right)
+        return nodes
+
+    def predict_proba(self, X):
+        """预测各类别概率，按块处理以限制中间数组大小"""
+        X = np.asarray(X)
+        proba = np.empty((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], self.chunk_size):
+            leaves = self.apply(X[start:start + self.chunk_size])
+            # 沿树的维度依次累加，与 sklearn 的累加顺序相同
+            proba[start:start + self.chunk_size] = self.value[leaves].sum(axis=1) / self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def save_forest(engine, path=FOREST_PATH, scaler=None):
+    """把森林数组（以及可选的标准化器参数）保存为 npz 文件"""
+    arrays = {
+        'feature': engine.feature,
+        'threshold': engine.threshold,
+        'left': engine.left,
+        'right': engine.right,
+        'value': engine.value,
+        'roots': engine.roots,
+        'max_depth': np.array(engine.max_depth),
+        'classes': engine.classes_,
+    }
+    if hasattr(engine, 'feature_names_in_'):
+        arrays['feature_names'] = np.asarray(engine.feature_names_in_, dtype=str)
+    if scaler is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+    np.savez(path, **arrays)
+
+
+def load_forest(path=FOREST_PATH):
+    """加载 npz 格式的森林，返回 (engine, scaler)，文件中没有标准化器参数时 scaler 为 None"""
+    with np.load(path, allow_pickle=False) as data:
+        engine = ForestEngine(
+            feature=data['feature'],
+            threshold=data['threshold'],
+            left=data['left'],
+            right=data['right'],
+            value=data['value'],
+            roots=data['roots'],
+            max_depth=data['max_depth'],
+            classes=data['classes'],
+            feature_names=data['feature_names'].tolist() if 'feature_names' in data else None
+        )
+        scaler = None
+        if 'scaler_mean' in data and 'scaler_scale' in data:
+            scaler = ScalerParams(data['scaler_mean'], data['scaler_scale'])
+    return engine, scaler
+
+
+if __name__ == "__main__":
+    # 从现有的 pickle 模型导出森林数组
+    import pickle
+
+    logging.basicConfig(level=logging.INFO)
+    with open('risk_assessment_model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    with open('risk_assessment_scaler.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+    save_forest(ForestEngine.from_sklearn(model), FOREST_PATH, scaler)
+    logging.getLogger(__name__).info(f"森林已导出到 {FOREST_PATH}")